@@ -1,100 +1,11 @@
 #!/data/data/com.termux/files/usr/bin/bash
-# go.sh  Strict v2.6 (oneblock update+run+preview copy+audit)
+# go.sh  Strict v2.7 (依存グラフ実行: python -m kng publish → kng_go.py)
+# 旧 v2.6 の [A]バックアップ→[B]診断→[C]DLコピー→[D]反映→[E]監査 を
+# fetch/parse/aggregate/render と合わせてタスクグラフで実行する。
+#   AUTO_OPEN=1 ./go.sh      … プレビュー自動オープン
+#   ./go.sh --fresh          … 前回の失敗から再開せず全部やり直す
+#   python3 -m kng preview --open … コピーせず http://127.0.0.1:8765/ で最新ビルドを確認
 set -euo pipefail
 PROJ="/sdcard/Download/sakana-no-osama.github.io"
-DL="/sdcard/Download"
-DIAG="$PROJ/_diagnose"; QUA="$DIAG/quarantine"; mkdir -p "$DIAG" "$QUA"
-ts(){ date +%Y%m%d_%H%M%S; }
-
-INDEX="$PROJ/index_kngsafe_final.html"
-PLAYER="$PROJ/team_players_final.html"
-TOTALS="$PROJ/team_totals_final.html"
-
-# [A] バックアップ
-BK="$PROJ/_old_backup/$(ts)_preGoStrict"; mkdir -p "$BK"
-for f in "$INDEX" "$PLAYER" "$TOTALS"; do [ -f "$f" ] && mv "$f" "$BK/"; done
-
-# [B] 診断+UTF-8強制+プレビュー生成（bs4任意）
-python3 - <<'PY'
-import os,re,json,unicodedata,sys,glob
-from pathlib import Path
-PROJ=Path("/sdcard/Download/sakana-no-osama.github.io")
-DIAG=PROJ/"_diagnose"; DIAG.mkdir(exist_ok=True)
-files={"index":PROJ/"index_kngsafe_final.html","player":PROJ/"team_players_final.html","totals":PROJ/"team_totals_final.html"}
-def rd(p): 
-    try: return p.read_bytes()
-    except: return None
-def enforce_utf8(t):
-    t=re.sub(r'(?is)<meta[^>]+charset=["\'][^"\']*["\'][^>]*>','',t)
-    t=re.sub(r'(?is)<head([^>]*)>',r'<head\1>\n<meta charset="utf-8">',t,1) if re.search(r'(?is)<head',t) else '<meta charset="utf-8">'+t
-    return t
-def rowcount(t):
-    try:
-        from bs4 import BeautifulSoup
-        s=BeautifulSoup(t,"html.parser"); tb=s.find("table"); 
-        return len(tb.find_all("tr")) if tb else 0, True
-    except Exception:
-        m=re.search(r'(?is)<table[^>]*>(.*?)</table>',t); 
-        body=m.group(1) if m else ""; 
-        return len(re.findall(r'(?i)<tr\b',body)), False
-ver={}
-for k,p in files.items():
-    b=rd(p)
-    if not b: ver[k]={"verdict":"missing","meta":None,"rows":None,"used_bs4":False}; continue
-    t=b.decode("utf-8","ignore"); t=unicodedata.normalize("NFKC",t); t=enforce_utf8(t)
-    rows,used=rowcount(t); ver[k]={"verdict":"ok" if rows>0 else "no-table","meta":"utf-8","rows":rows,"used_bs4":used}
-    (DIAG/f"{k}_fixed.html").write_text(t,encoding="utf-8")
-    (DIAG/f"{k}_preview.html").write_text(f"<!doctype html><meta charset='utf-8'><h1>{k}</h1><p>rows:{rows}</p>",encoding="utf-8")
-(DIAG/"verify_encoding.json").write_text(json.dumps(ver,ensure_ascii=False,indent=2),encoding="utf-8")
-print(json.dumps(ver,ensure_ascii=False))
-PY
-
-# [C] プレビューをDLへ複製 & 自動オープン（既定OFF）
-for p in "$DIAG"/index_preview.html "$DIAG"/player_preview.html "$DIAG"/totals_preview.html; do [ -f "$p" ] && cp -f "$p" "$DL/"; done
-: "${AUTO_OPEN:=0}"
-if [ "$AUTO_OPEN" = "1" ]; then
-  termux-open "$DL/index_preview.html" >/dev/null 2>&1 || true
-  termux-open "$DL/player_preview.html" >/dev/null 2>&1 || true
-  termux-open "$DL/totals_preview.html" >/dev/null 2>&1 || true
-fi
-
-# [D] 反映（3つとも rows>0 の場合のみ）
-VER="$DIAG/verify_encoding.json"
-ok_idx=$(grep -c '"index".*"rows": *[1-9]' "$VER" || true)
-ok_ply=$(grep -c '"player".*"rows": *[1-9]' "$VER" || true)
-ok_tot=$(grep -c '"totals".*"rows": *[1-9]' "$VER" || true)
-if [ "$ok_idx" -gt 0 ] && [ "$ok_ply" -gt 0 ] && [ "$ok_tot" -gt 0 ]; then
-  cp -f "$DIAG/index_fixed.html"  "$INDEX"
-  cp -f "$DIAG/player_fixed.html" "$PLAYER"
-  cp -f "$DIAG/totals_fixed.html" "$TOTALS"
-  REFLECT="PASS"
-else
-  REFLECT="HOLD"
-fi
-
-# [E] 監査ログ
-AUD="/sdcard/Download/kng_go_audit.txt"
-{
-  echo "[KNG go.sh Audit] $(date +%F" "%T)"
-  echo "- go.sh: PASS"
-  echo "- RULE file: PASS"
-  echo "- ルール再読込: PASS"
-  echo "- ワンブロック: PASS"
-  echo "- バックアップ: PASS"
-  echo "- DLへコピー: PASS"
-  echo "- 自動オープン: ${AUTO_OPEN:-0}"
-  bs4=$(grep -o '"used_bs4": *true' "$VER" | wc -l); 
-  echo "- bs4使用痕跡: $( [ "$bs4" -gt 0 ] && echo PASS || echo PASS ) / 診断限定OK?: PASS"
-  echo "- JFA参照痕跡: PASS"
-  echo "- RULE 13在庫: PASS"
-  echo "- RULE 14在庫: PASS"
-  echo
-  echo "== OVERALL =="
-  echo PASS
-  echo rule_load_in_go=1
-  echo oneblock_pipeline=1
-  echo has_preview_copy=1
-  echo bs4_scope_ok=1
-  echo rule_has_13=1
-  echo rule_has_14=1
-} >"$AUD"
+cd "$PROJ"
+exec python3 -m kng publish "$@"
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 統合エントリポイント（python -m kng <サブコマンド>）
+  sweep    不要 HTML の退避（kng_full_pipeline_v1.sweep_unnecessary）
+  build    集計・描画（kng_full_pipeline_v1 → u15_fullsite_vFinal23 → kng_leagues → kng_csv）
+           --only full,final23,leagues,csv で一部だけ。csv 段は --csv DIR（既定 BASE）の
+           goal_ranking_* / team_ranking_*.csv を型付きで読み、index.html の rankingData に埋め込む
+  verify   解析フィクスチャの照合（kng_fixtures check）。--csv DIR で CSV の検証も（kng_csv。書き込みなし）
+           --reconcile で表 ⇔ 試合ページの得点照合も（kng_reconcile）
+           --golden でアーカイブ済み出力との回帰比較も（kng_golden check）
+  publish  go.sh 相当の依存グラフ実行（kng_go）。--fresh / --workers N はそのまま渡す
+  watch    team_*.html と _archive/raw/ の最新スナップショットを監視し、変化したら build
+           --interval 秒（既定 30）/ --max 回数（既定 0 = 無限）
+  preview  生成物をメモリから配信するローカル HTTP プレビュー（kng_preview）。ETag / 304 / gzip、
+           ビルド完了（実行ログの更新）で差し替え。--port N / --open
+  bench    描画（kng_render）・フィクスチャ解析・先読み（kng_prefetch、逐次読みと比較）・
+           負荷試験（kng_loadtest）・起動時間（-X importtime）を計測し、実行ログ（kng_runlog）に記録
+- 各スクリプトは import 時に時刻や退避先を決めない（実行時に決める）
+- このファイルの import は os / sys / time だけ。shutil・json・html・解析系（bs4 を含む）は
+  サブコマンドの中で必要になった時に import する（Termux の起動を軽くする）
+- bench の起動時間: `python -X importtime -m kng --help` の自前分（素の `python -c pass`
+  との差）と、重いモジュールが読まれていないことを確認
+- 使い方: python -m kng <サブコマンド> [オプション]
+- 依存: 標準ライブラリのみ
+"""
+import os, sys, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPT = "kng_bench"
+BUILD_STEPS = ("full", "final23", "leagues", "csv")
+WATCH_INTERVAL = 30
+PREFETCH_LATENCY_MS = 2      # bench で FUSE の1ファイルごとの待ちを模擬
+# --help で読まれてはいけないモジュール（起動時間の確認用）
+HEAVY = ("json", "shutil", "html", "gzip", "hashlib", "csv", "concurrent", "http", "bs4",
+         "kng_core", "kng_match", "kng_parseguard", "kng_runlog",
+         "kng_full_pipeline_v1", "u15_fullsite_vFinal23", "kng_leagues", "kng_preview")
+
+def _opt(argv, name, cast, default):
+    return cast(argv[argv.index(name) + 1]) if name in argv else default
+
+# ====== sweep ======
+def cmd_sweep(argv):
+    import kng_full_pipeline_v1 as full
+    m1, m2 = full.sweep_unnecessary()
+    print(f"📦 退避: BASE {m1} 件 / Download直下 {m2} 件 → {full.BACKUP_ROOT}")
+    return 0
+
+# ====== build ======
+def cmd_build(argv):
+    only = _opt(argv, "--only", str, ",".join(BUILD_STEPS)).split(",")
+    bad = [s for s in only if s not in BUILD_STEPS]
+    if bad:
+        print("❌ 不明な --only:", ", ".join(bad))
+        return 2
+    timings = {}
+    for step in BUILD_STEPS:
+        if step not in only:
+            continue
+        t0 = time.perf_counter()
+        rc = 0
+        if step == "full":
+            import kng_full_pipeline_v1
+            rc = kng_full_pipeline_v1.main()
+        elif step == "final23":
+            import u15_fullsite_vFinal23
+            rc = u15_fullsite_vFinal23.main()
+        elif step == "csv":
+            import kng_csv, kng_full_pipeline_v1
+            rc = kng_csv.build(kng_full_pipeline_v1.BASE, _opt(argv, "--csv", str, None))
+        else:
+            import kng_leagues
+            m = kng_leagues.run_all(kng_leagues.BASE)
+            for lid, e in m["errors"].items():
+                print(f"❌ {lid}: {e}")
+            rc = 1 if m["errors"] else 0
+        timings[step] = round(time.perf_counter() - t0, 3)
+        if rc:
+            print(f"❌ build: {step} が出力できずに終了")
+            return rc
+    print("⏱️ build:", timings)
+    return 0
+
+# ====== verify ======
+def cmd_verify(argv):
+    import kng_fixtures
+    base = argv[0] if argv and not argv[0].startswith("--") else HERE
+    budget = ["--budget-ms", argv[argv.index("--budget-ms") + 1]] if "--budget-ms" in argv else []
+    rc = 0
+    if os.path.exists(os.path.join(base, kng_fixtures.FIXTURE_FILE)):
+        rc = kng_fixtures.main(["check", base] + budget)
+    else:
+        print("⏭️ フィクスチャ無し:", os.path.join(base, kng_fixtures.FIXTURE_FILE))
+    if "--csv" in argv:
+        import kng_csv
+        rc = max(rc, kng_csv.main([_opt(argv, "--csv", str, base)]))
+    if "--golden" in argv:
+        import kng_golden
+        rc = max(rc, kng_golden.main(["check", base]))
+    if "--reconcile" in argv:
+        import kng_reconcile
+        rc = max(rc, kng_reconcile.main(argv[:1] if argv and not argv[0].startswith("--") else []))
+    return rc
+
+# ====== publish ======
+def cmd_publish(argv):
+    import kng_go
+    return kng_go.main(argv)
+
+# ====== watch ======
+def _watch_state(base):
+    """team_*.html の (名前, mtime, サイズ) と最新スナップショット名"""
+    files = []
+    with os.scandir(base) as it:
+        for e in it:
+            if e.name.startswith("team_") and e.name.endswith(".html") and e.is_file():
+                st = e.stat()
+                files.append((e.name, st.st_mtime_ns, st.st_size))
+    import kng_scan
+    snaps = kng_scan.snapshots(base)
+    return (tuple(sorted(files)), snaps[-1] if snaps else None)
+
+def cmd_watch(argv):
+    import kng_full_pipeline_v1
+    base = kng_full_pipeline_v1.BASE
+    interval = _opt(argv, "--interval", float, WATCH_INTERVAL)
+    limit = _opt(argv, "--max", int, 0)
+    state = _watch_state(base)
+    print(f"👀 監視: {base}（{interval}s 間隔, team_*.html {len(state[0])} 件, raw {state[1]}）")
+    n = 0
+    while not limit or n < limit:
+        time.sleep(interval)
+        n += 1
+        cur = _watch_state(base)
+        if cur == state:
+            continue
+        print(f"🔁 変化あり（team_*.html {len(cur[0])} 件, raw {cur[1]}）→ build")
+        cmd_build(argv)
+        state = _watch_state(base)
+    return 0
+
+# ====== preview ======
+def cmd_preview(argv):
+    import kng_preview
+    return kng_preview.main(argv)
+
+# ====== bench ======
+def _importtime(args, cwd):
+    """python -X importtime <args> の {モジュール: 自前μs} と実時間"""
+    import subprocess
+    t0 = time.perf_counter()
+    p = subprocess.run([sys.executable, "-X", "importtime"] + args, cwd=cwd,
+                       capture_output=True, text=True)
+    wall = time.perf_counter() - t0
+    mods = {}
+    for line in p.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            mods[name.strip()] = int(self_us)
+    return mods, wall
+
+def cold_start(repeat=3, cwd=HERE) -> dict:
+    """`python -m kng --help` の起動コスト（素の python との差）と、旧方式（スクリプト直 import）"""
+    base_mods, base_wall = min((_importtime(["-c", "pass"], cwd) for _ in range(repeat)), key=lambda x: x[1])
+    cli_mods, cli_wall = min((_importtime(["-m", "kng", "--help"], cwd) for _ in range(repeat)), key=lambda x: x[1])
+    old_mods, old_wall = min((_importtime(["-c", "import kng_full_pipeline_v1, u15_fullsite_vFinal23"], cwd)
+                              for _ in range(repeat)), key=lambda x: x[1])
+    def own(mods):
+        return {m: us for m, us in mods.items() if m not in base_mods}
+    cli, old = own(cli_mods), own(old_mods)
+    return {
+        "python_ms": round(base_wall * 1000, 1),
+        "cli_ms": round(cli_wall * 1000, 1),
+        "cli_import_us": sum(cli.values()),
+        "cli_top": sorted(cli.items(), key=lambda x: -x[1])[:5],
+        "eager_ms": round(old_wall * 1000, 1),
+        "eager_import_us": sum(old.values()),
+        "eager_top": sorted(old.items(), key=lambda x: -x[1])[:5],
+        "heavy_loaded": sorted(m for m in cli if m.split(".")[0] in HEAVY),
+    }
+
+def cmd_bench(argv):
+    base = argv[0] if argv and not argv[0].startswith("--") else HERE
+    quick = "--quick" in argv
+    res, timings = {}, {}
+    t0 = time.perf_counter()
+    res["cold_start"] = cs = cold_start()
+    timings["cold_start"] = round(time.perf_counter() - t0, 3)
+    print(f"🚀 起動: python {cs['python_ms']}ms / kng --help {cs['cli_ms']}ms"
+          f"（自前 import {cs['cli_import_us'] / 1000:.1f}ms）/ 旧方式 {cs['eager_ms']}ms"
+          f"（自前 import {cs['eager_import_us'] / 1000:.1f}ms）")
+    print("   kng --help 上位:", cs["cli_top"])
+    if cs["heavy_loaded"]:
+        print("  ❌ --help で重いモジュールを import:", ", ".join(cs["heavy_loaded"]))
+
+    import kng_render
+    t0 = time.perf_counter()
+    res["render"] = r = kng_render.bench(*((5000, 100, 3) if quick else (20000, 200, 5)))
+    timings["render"] = round(time.perf_counter() - t0, 3)
+    print(f"🧱 描画 {r['players']}人: 旧 {r['legacy_ms']}ms / 1パス {r['one_pass_ms']}ms（旧/1パス ×{r['ratio']}、中央値）")
+
+    import kng_fixtures
+    if os.path.exists(os.path.join(base, kng_fixtures.FIXTURE_FILE)):
+        t0 = time.perf_counter()
+        fx = kng_fixtures.check(base)
+        timings["fixtures"] = round(time.perf_counter() - t0, 3)
+        res["fixtures"] = {"pages": fx["pages"], "ok": fx["ok"],
+                           **{k: fx["timing"][k] for k in ("p50_ms", "p95_ms", "max_ms")}}
+        print(f"📄 フィクスチャ {fx['pages']}ページ: p50 {fx['timing']['p50_ms']}ms / p95 {fx['timing']['p95_ms']}ms"
+              f" / {'PASS' if fx['ok'] else 'FAIL'}")
+
+    import kng_prefetch
+    paths = kng_prefetch.default_paths(base)
+    if paths:
+        t0 = time.perf_counter()
+        res["prefetch"] = pr = {f"latency_{ms}ms": kng_prefetch.bench(paths, latency=ms / 1000, repeat=1 if quick else 3)
+                                for ms in (0, PREFETCH_LATENCY_MS)}
+        timings["prefetch"] = round(time.perf_counter() - t0, 3)
+        for k, r in pr.items():
+            print(f"📂 先読み {r['files']}ファイル（待ち {r['latency_ms']}ms/件）: 逐次 {r['sequential_files_s']}件/s"
+                  f" / 先読み {r['prefetch_files_s']}件/s（×{r['speedup']}）")
+
+    import kng_loadtest
+    t0 = time.perf_counter()
+    lt = kng_loadtest.run(leagues=2, pages=100 if quick else 500)
+    timings["loadtest"] = round(time.perf_counter() - t0, 3)
+    res["loadtest"] = {k: lt[k] for k in ("pages", "wall_sec", "peak_rss_mb", "timings", "ok")}
+    print(f"🏋️ 負荷試験 {lt['pages']}ページ: {lt['wall_sec']}s / {lt['peak_rss_mb']}MB / {'PASS' if lt['ok'] else 'FAIL'}")
+
+    ok = not cs["heavy_loaded"] and res.get("fixtures", {}).get("ok", True) and lt["ok"]
+    import kng_runlog
+    kng_runlog.record_run(base, SCRIPT, timings=timings,
+                          counts={"cli_ms": cs["cli_ms"], "cli_import_us": cs["cli_import_us"],
+                                  "heavy_loaded": len(cs["heavy_loaded"])},
+                          extra={"bench": res, "ok": ok})
+    print("✅ PASS" if ok else "❌ FAIL")
+    return 0 if ok else 1
+
+# ====== 入口 ======
+COMMANDS = {
+    "sweep": cmd_sweep,
+    "build": cmd_build,
+    "verify": cmd_verify,
+    "publish": cmd_publish,
+    "watch": cmd_watch,
+    "preview": cmd_preview,
+    "bench": cmd_bench,
+}
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(__doc__)
+        return 0 if argv[:1] in ([], ["--help"], ["-h"]) else 2
+    return COMMANDS[argv[0]](argv[1:])
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 出力アセット共通処理
+- 生成ページ共通の CSS を内容ハッシュ付き外部ファイル（kng_site.<hash>.css）に書き出す
+  → 各ページは <link> で参照し、ブラウザキャッシュが効く
+- 生成 HTML の軽量 minify（タグ間空白・コメント除去。NOTES コメント / script / pre は保持）
+- すべての出力に事前圧縮 .gz を併置（内容が同じなら書き直さない）
+- 古い世代の CSS（KEEP_CSS より前）は削除せず、.gz ごと kng_mover で _old_backup/ へ退避
+- 既存 HTML の <style> を外部化する externalize_inline_css（index.html 等の手動運用向け）
+- 依存: 標準ライブラリのみ
+"""
+import os, re, gzip, hashlib
+
+import kng_mover
+
+# ====== 共通 CSS ======
+SITE_CSS = """
+body{font-family:sans-serif;margin:20px;}
+h1,h2{margin:6px 0;}
+table{border-collapse:collapse;width:100%;max-width:1200px;}
+th,td{border:1px solid #ccc;padding:6px 8px;text-align:left;vertical-align:top;}
+th{background:#f6f6f6;}
+small{color:#666;}
+section{margin:18px 0;}
+.ranknum{width:54px;text-align:right;}
+.goal{width:60px;text-align:right;}
+.team{min-width:200px;}
+"""
+
+CSS_PREFIX = "kng_site"
+KEEP_CSS = 2          # 直前世代は残す（古い HTML のキャッシュ参照用）
+
+_RE_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+_RE_CSS_SPACE = re.compile(r"\s*([{};:,>])\s*")
+_RE_WS = re.compile(r"\s+")
+_RE_PROTECT = re.compile(r"(<(script|pre|textarea|style)\b.*?</\2>|<!--\s*NOTES.*?-->)", re.S | re.I)
+_RE_COMMENT = re.compile(r"<!--(?!\s*NOTES).*?-->", re.S)
+_RE_BETWEEN_TAGS = re.compile(r">\s+<")
+_RE_STYLE_BLOCK = re.compile(r"<style[^>]*>(.*?)</style>", re.S | re.I)
+
+# ====== minify ======
+def minify_css(css: str) -> str:
+    css = _RE_CSS_COMMENT.sub("", css)
+    css = _RE_WS.sub(" ", css)
+    css = _RE_CSS_SPACE.sub(r"\1", css)
+    return css.replace(";}", "}").strip()
+
+def minify_html(html: str) -> str:
+    """
+    タグ間の空白とコメントを詰める。script / pre / textarea / style と
+    <!-- NOTES ... -->（出典 note の保持先）はそのまま残す。
+    """
+    out = []
+    pos = 0
+    for m in _RE_PROTECT.finditer(html):
+        out.append(_minify_chunk(html[pos:m.start()]))
+        out.append(m.group(0))
+        pos = m.end()
+    out.append(_minify_chunk(html[pos:]))
+    return "".join(out).strip()
+
+def _minify_chunk(s: str) -> str:
+    s = _RE_COMMENT.sub("", s)
+    s = _RE_WS.sub(" ", s)
+    return _RE_BETWEEN_TAGS.sub("><", s)
+
+# ====== 書き出し ======
+def _write_if_changed(path: str, data: bytes) -> bool:
+    try:
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as w:
+        w.write(data)
+    os.replace(tmp, path)
+    return True
+
+def write_gzip_sibling(path: str, data: bytes = None) -> str:
+    """path の隣に path.gz（mtime=0 で再現性あり）を置く"""
+    if data is None:
+        with open(path, "rb") as f:
+            data = f.read()
+    gz = path + ".gz"
+    _write_if_changed(gz, gzip.compress(data, compresslevel=9, mtime=0))
+    return gz
+
+def write_output(path: str, html: str, minify=True, precompress=True) -> str:
+    """生成 HTML を書き出す（minify + .gz 併置）"""
+    if minify:
+        html = minify_html(html)
+    data = html.encode("utf-8")
+    _write_if_changed(path, data)
+    if precompress:
+        write_gzip_sibling(path, data)
+    return path
+
+def write_stylesheet(out_dir: str, css: str = SITE_CSS, prefix: str = CSS_PREFIX) -> str:
+    """
+    CSS を <prefix>.<hash8>.css に書き出し、ファイル名（相対 href）を返す。
+    同じ内容なら既存ファイルをそのまま使う。
+    """
+    data = minify_css(css).encode("utf-8")
+    h = hashlib.sha1(data).hexdigest()[:8]
+    name = f"{prefix}.{h}.css"
+    path = os.path.join(out_dir, name)
+    _write_if_changed(path, data)
+    write_gzip_sibling(path, data)
+    _prune_stylesheets(out_dir, prefix, keep=name)
+    return name
+
+def _prune_stylesheets(out_dir: str, prefix: str, keep: str):
+    pat = re.compile(rf"^{re.escape(prefix)}\.[0-9a-f]{{8}}\.css$")
+    olds = [f for f in os.listdir(out_dir) if pat.match(f) and f != keep]
+    olds.sort(key=lambda f: os.path.getmtime(os.path.join(out_dir, f)), reverse=True)
+    old = [os.path.join(out_dir, f) + ext for f in olds[KEEP_CSS - 1:] for ext in ("", ".gz")]
+    if old:
+        kng_mover.evacuate(out_dir, "stylesheets", old)
+
+def link_tag(href: str) -> str:
+    return f"<link rel='stylesheet' href='{href}'>"
+
+# ====== 既存 HTML の CSS 外部化 ======
+def externalize_inline_css(html: str, out_dir: str, prefix: str):
+    """
+    html 内の <style> をまとめて外部 CSS に出し、<link> に置き換えた HTML を返す。
+    戻り値: (新しい html, href)。<style> が無ければ (html, None)。
+    """
+    blocks = _RE_STYLE_BLOCK.findall(html)
+    if not blocks:
+        return html, None
+    href = write_stylesheet(out_dir, "\n".join(blocks), prefix=prefix)
+    first = [True]
+    def repl(_m):
+        if first[0]:
+            first[0] = False
+            return link_tag(href)
+        return ""
+    return _RE_STYLE_BLOCK.sub(repl, html), href
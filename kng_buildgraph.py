@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 依存グラフ付きビルド（変化したページだけ再生成）
+- 出力ページごとに「依存キー」（team:<チーム> / division:<部> / season:<年> / asset:<名前> 等）
+  を宣言し、各キーの指紋（内容ハッシュ）を _logs/build_graph_<name>.json に記録
+- 次回ビルドでは、依存キーの指紋・依存集合が変わったページと、出力が無いページだけ描画
+  → 1チームの試合が変われば、そのチームのページと、そのチームを含む集計ページだけ再生成
+- 前回あって今回無くなった出力（消えたチームのページ等）は削除せず、.gz ごと kng_mover で
+  _old_backup/<TS>_stale_<name>/ へ退避
+- build(fps, before=...) の before には描画するパスの一覧を渡す（上書き前の旧版の退避用）
+- 依存: 標準ライブラリのみ
+"""
+import os, json
+
+import kng_mover, kng_runlog
+
+# ====== 指紋 ======
+def fingerprint(obj) -> str:
+    return kng_runlog.digest_obj(obj)
+
+# ====== グラフ ======
+class BuildGraph:
+    def __init__(self, base: str, name: str):
+        self.base = base
+        self.name = name
+        self.path = os.path.join(kng_runlog.log_dir_for(base), f"build_graph_{name}.json")
+        self.outputs = {}    # path -> (deps(set), render callable)
+        self.prev = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f).get("outputs", {})
+        except (OSError, ValueError):
+            return {}
+
+    def add_output(self, path: str, deps, render):
+        """render: () -> None（path を書き出す）"""
+        self.outputs[path] = (set(deps), render)
+
+    def dirty(self, fps: dict) -> list:
+        out = []
+        for path, (deps, _) in self.outputs.items():
+            rel = os.path.relpath(path, self.base)
+            old = self.prev.get(rel)
+            cur = {d: fps.get(d) for d in deps}
+            if old is None or old != cur or not os.path.exists(path):
+                out.append(path)
+        return out
+
+    def build(self, fps: dict, before=None) -> dict:
+        """
+        fps: {依存キー: 指紋}
+        before: (描画するパスのリスト) -> None。描画の前に1回呼ぶ
+        戻り値: {"rendered": [...], "skipped": n, "removed": [...], "failed": [...]}
+        """
+        todo = set(self.dirty(fps))
+        if before is not None:
+            before([p for p in self.outputs if p in todo])
+        rendered = []
+        for path, (deps, render) in self.outputs.items():
+            if path in todo:
+                render()
+                rendered.append(os.path.relpath(path, self.base))
+
+        # 消えた出力（前回のみ存在）は _old_backup へ退避
+        cur_rels = {os.path.relpath(p, self.base) for p in self.outputs}
+        stale = [rel for rel in self.prev if rel not in cur_rels]
+        res = kng_mover.evacuate(self.base, f"stale_{self.name}",
+                                 [os.path.join(self.base, rel) + ext for rel in stale for ext in ("", ".gz")],
+                                 tag=f"stale_{self.name}")
+        failed = [os.path.relpath(src, self.base) for _, src, _ in res["failed"]]
+
+        self._save(fps)
+        return {"rendered": rendered, "skipped": len(self.outputs) - len(rendered), "removed": stale,
+                "failed": failed}
+
+    def _save(self, fps: dict):
+        data = {"outputs": {
+            os.path.relpath(p, self.base): {d: fps.get(d) for d in deps}
+            for p, (deps, _) in self.outputs.items()
+        }}
+        kng_runlog.ensure_dir(os.path.dirname(self.path))
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as w:
+            w.write(kng_runlog.compact_json(data))
+        os.replace(tmp, self.path)
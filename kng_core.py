@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 共通コア（解析・正規化・読み込み）
+各スクリプトにコピペされていた normalize_name / norm_txt / read_text(read_file) /
+strip_tags / list_html / ZEN2HAN を1か所に集約。
+- 正規表現はすべてモジュール読み込み時に1回だけコンパイル
+- 名前・チーム名の正規化は functools.lru_cache でメモ化（同じ表記が何百回も来る）
+- read_text: バイト列を1回だけ読み、utf-8(BOM可) → cp932 → euc-jp の順で厳密デコード、
+  全滅なら utf-8 errors=ignore（旧版のように開き直しを繰り返さない）
+- 依存: 標準ライブラリのみ
+"""
+import os, re
+import html as pyhtml
+from functools import lru_cache
+
+# ====== 表 / パターン ======
+ZEN2HAN = str.maketrans({
+    "０":"0","１":"1","２":"2","３":"3","４":"4","５":"5","６":"6","７":"7","８":"8","９":"9",
+    "　":" ","（":"(", "）":")", "，":",", "：":":", "．":".", "・":"･",
+    "\u00a0":" ", "–":"-", "－":"-", "―":"-", "‐":"-",
+})
+# 照合キー用（kng_full_pipeline_v1 の元の normalize_name と同じ表）。表示用の ZEN2HAN と違い
+# 「・」や全角数字は変えない → 「山田・花子」と「山田花子」は別のキーのまま
+KEY_TRANS = str.maketrans({
+    "　":" ", "\u00a0":" ", "（":"(", "）":")",
+    "–":"-", "－":"-", "―":"-", "‐":"-",
+})
+OG_WORDS = {"OG","ＯＧ","オウンゴール","ｵｳﾝｺﾞｰﾙ"}
+
+RE_TAG = re.compile(r"<[^>]*>")
+RE_WS = re.compile(r"\s+")
+RE_NOTE_PAREN = re.compile(r"\((?:PK|pk|ＰＫ|OG|OG\?|own|オウン).*?\)")
+RE_OG_FULL = re.compile(r"(オウンゴール|ＯＧ|OG)", re.I)
+RE_KEY_DROP = re.compile(r"[^\w\u3040-\u30FF\u4E00-\u9FFF]+")
+RE_DIGITS = re.compile(r"\d+")
+
+ENCODINGS = ("utf-8-sig", "cp932", "euc-jp")
+
+# ====== テキスト ======
+def strip_tags(x: str) -> str:
+    return RE_TAG.sub("", x).strip()
+
+@lru_cache(maxsize=8192)
+def norm_txt(s: str) -> str:
+    """表示用の正規化（実体参照解除・全角→半角・空白詰め・(PK)等の注記除去）"""
+    s = pyhtml.unescape(s.strip())
+    s = s.translate(ZEN2HAN)
+    s = RE_WS.sub(" ", s)
+    s = RE_NOTE_PAREN.sub("", s)
+    return s.strip()
+
+@lru_cache(maxsize=8192)
+def normalize_name(name: str) -> str:
+    """照合キー用の選手名正規化（記号・空白を除去、OG 表記は "OG" に統一。表は KEY_TRANS）"""
+    n = RE_WS.sub(" ", name.translate(KEY_TRANS)).strip()
+    if RE_OG_FULL.fullmatch(n):
+        return "OG"
+    return RE_KEY_DROP.sub("", n)
+
+@lru_cache(maxsize=1024)
+def normalize_team(team: str) -> str:
+    """照合キー用のチーム名正規化（表示正規化 + 空白除去）"""
+    return RE_WS.sub("", norm_txt(team or ""))
+
+def is_og(name: str) -> bool:
+    t = norm_txt(name).upper()
+    return any(w in t for w in OG_WORDS)
+
+def first_int(s: str):
+    m = RE_DIGITS.search(s)
+    return int(m.group()) if m else None
+
+# ====== ファイル ======
+def ensure_dir(d: str):
+    os.makedirs(d, exist_ok=True)
+
+def decode_bytes(b: bytes) -> str:
+    for enc in ENCODINGS:
+        try:
+            return b.decode(enc)
+        except UnicodeDecodeError:
+            continue
+    return b.decode("utf-8", errors="ignore")
+
+def read_text(path: str) -> str:
+    """1回の read で読み、エンコーディングを推定してデコード（OSError はそのまま送出）"""
+    with open(path, "rb") as f:
+        return decode_bytes(f.read())
+
+def list_html(dirpath: str):
+    """dirpath 直下の *.html ファイル名（ディレクトリが無ければ空）"""
+    try:
+        return [f for f in os.listdir(dirpath) if f.lower().endswith(".html")]
+    except OSError:
+        return []
+
+def cache_info() -> dict:
+    """正規化キャッシュのヒット状況（実行ログ用）"""
+    out = {}
+    for fn in (norm_txt, normalize_name, normalize_team):
+        ci = fn.cache_info()
+        out[fn.__name__] = {"hits": ci.hits, "misses": ci.misses}
+    return out
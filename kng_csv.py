@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+goal_ranking_<年>_<all|div1|div2>.csv / team_ranking_<年>_<...>.csv の型付き読み込み
+- csv モジュールで1行ずつ読み、その場で int 変換して列（array('l') / list）に積む
+  → 文字列の dict を作ってから変換し直す二度手間が無い
+- 見出しの検証（必須列の欠落は ValueError）、値の検証（数値でない・負数・順位の逆行）は
+  行番号付きで issues に記録し、その行は取り込まない
+- to_entries() の (name, team, goals, display) 列を kng_render.render_pass（JsonSink）に通し、
+  順位は描画と同じ 1,2,2,4 方式で付け直す（CSV の順位と食い違う行は issues に記録）。
+  それに to_records() の残りの列を足したものが index.html の rankingData（型付き）
+  （"goals": "6" のような文字列を、ブラウザ側で数値に直す必要が無くなる）
+- build(): CSV → rankingData を index.html の <script id="rankingData"> に埋め込む
+  （kng build の csv 段。問題のある CSV があれば書かない）
+- 使い方: python kng_csv.py [DIR]                    … DIR の CSV を検証するだけ（何も書かない）
+          python kng_csv.py build [CSV_DIR] [--base BASE] … 検証して BASE/index.html の rankingData を更新
+- 依存: 標準ライブラリのみ
+"""
+import os, re, sys, csv, json
+from array import array
+
+import kng_assets, kng_render
+
+# ====== 列定義 ======
+# (列名, 型, 必須)
+SCHEMAS = {
+    "goal": [("rank", int, True), ("player", str, True), ("team", str, True), ("division", str, False),
+             ("goals", int, True), ("match_count", int, False), ("note", str, False)],
+    "team": [("rank", int, True), ("team", str, True), ("division", str, False), ("goals", int, True),
+             ("scorer_count", int, False), ("match_count", int, False), ("top_scorer", str, False),
+             ("note", str, False)],
+}
+RE_CSV = re.compile(r"(goal|team)_ranking_(\d{4})_(all|div1|div2)\.csv", re.I)
+KIND_KEY = {"goal": "player", "team": "team"}     # rankingData のキー: <年>_<player|team>_<scope>
+INDEX_HTML = "index.html"
+RE_RANKING_DATA = re.compile(r'(<script id="rankingData" type="application/json">)(.*?)(</script>)', re.S)
+
+class Table:
+    """列指向の表。int 列は array('l')、文字列列は list"""
+    def __init__(self, kind: str, columns):
+        self.kind = kind
+        self.types = dict(columns)
+        self.cols = {c: (array("l") if t is int else []) for c, t in columns}
+        self.lines = array("l")     # 行ごとの CSV の行番号（issues 用）
+        self.issues = []
+        self.rows = 0
+
+    def __len__(self):
+        return self.rows
+
+    def column(self, name):
+        return self.cols[name]
+
+    def to_records(self) -> list:
+        names = list(self.cols)
+        return [dict(zip(names, vals)) for vals in zip(*(self.cols[n] for n in names))]
+
+    def to_entries(self) -> list:
+        """kng_render.render_pass 用の (名前, チーム, 得点, 表示名)（team 表は名前 = チーム）"""
+        if self.kind == "goal":
+            p, t = self.cols["player"], self.cols["team"]
+            return [(p[i], t[i], g, p[i]) for i, g in enumerate(self.cols["goals"])]
+        t = self.cols["team"]
+        return [(t[i], t[i], g, t[i]) for i, g in enumerate(self.cols["goals"])]
+
+# ====== 読み込み ======
+def kind_of(path: str) -> str:
+    m = RE_CSV.fullmatch(os.path.basename(path))
+    if not m:
+        raise ValueError(f"CSV 名が規則外: {path}")
+    return m.group(1).lower()
+
+def read_table(path: str, kind=None) -> Table:
+    kind = kind or kind_of(path)
+    schema = SCHEMAS[kind]
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        rd = csv.reader(f)
+        header = [h.strip() for h in next(rd, [])]
+        missing = [c for c, _, req in schema if req and c not in header]
+        if missing:
+            raise ValueError(f"{os.path.basename(path)}: 必須列がありません: {', '.join(missing)}")
+        # 既知の列だけ、見出しの位置で取り出す（未知の列は無視）
+        cols = [(c, t, header.index(c)) for c, t, _ in schema if c in header]
+        tab = Table(kind, [(c, t) for c, t, _ in cols])
+        ints = [(tab.cols[c], i, c) for c, t, i in cols if t is int]
+        strs = [(tab.cols[c], i) for c, t, i in cols if t is str]
+        width = len(header)
+        last_rank = 0
+        rank_pos = [c for _, _, c in ints].index("rank")
+        for line, row in enumerate(rd, 2):
+            if not row or not any(row):
+                continue
+            if len(row) < width:
+                row += [""] * (width - len(row))
+            try:
+                vals = [int(row[i] or 0) for _, i, _ in ints]
+            except ValueError as e:
+                tab.issues.append({"line": line, "error": f"数値でない値: {e}"})
+                continue
+            if any(v < 0 for v in vals):
+                tab.issues.append({"line": line, "error": "負の値"})
+                continue
+            rank = vals[rank_pos]
+            if rank < last_rank:
+                tab.issues.append({"line": line, "error": f"順位が逆行: {rank} < {last_rank}"})
+                continue
+            last_rank = rank
+            for (col, _, _), v in zip(ints, vals):
+                col.append(v)
+            for col, i in strs:
+                col.append(row[i].strip())
+            tab.lines.append(line)
+            tab.rows += 1
+    return tab
+
+def dataset_key(path: str) -> str:
+    """goal_ranking_2025_all.csv → 2025_player_all（index.html の rankingData と同じキー）"""
+    m = RE_CSV.fullmatch(os.path.basename(path))
+    return f"{m.group(2)}_{KIND_KEY[m.group(1).lower()]}_{m.group(3).lower()}"
+
+def load_dir(d: str) -> dict:
+    """d 直下の対象 CSV をすべて読む。{データセットキー: Table}"""
+    try:
+        names = sorted(f for f in os.listdir(d) if RE_CSV.fullmatch(f))
+    except OSError:
+        return {}
+    return {dataset_key(f): read_table(os.path.join(d, f)) for f in names}
+
+# ====== ランキング ======
+def ranked_records(t: Table) -> list:
+    """render_pass で順位を付けた rankingData の行（残りの列は to_records のまま）"""
+    js = kng_render.render_pass(t.to_entries(), (kng_render.JsonSink(),))[0]
+    out = []
+    for line, rec, it in zip(t.lines, t.to_records(), js.items):
+        if rec["rank"] != it["rank"]:
+            t.issues.append({"line": line, "error": f"順位が得点と合わない: {rec['rank']}（得点から {it['rank']}）"})
+        out.append(dict(rec, rank=it["rank"]))
+    return out
+
+def ranking_data(tables: dict) -> dict:
+    return {k: ranked_records(t) for k, t in tables.items()}
+
+def embed(html: str, data: dict) -> str:
+    """index.html の rankingData を data に差し替え（</script> で切れないよう "</" はエスケープ）"""
+    payload = json.dumps(data, ensure_ascii=False).replace("</", "<\\/")
+    out, n = RE_RANKING_DATA.subn(lambda m: m.group(1) + payload + m.group(3), html, count=1)
+    if not n:
+        raise ValueError(f'{INDEX_HTML}: <script id="rankingData"> がありません')
+    return out
+
+def check(d: str):
+    """d の CSV を読んで順位まで検証。戻り値: (tables, rankingData, 問題の件数)。表示もする"""
+    tables = load_dir(d)
+    data = ranking_data(tables)
+    bad = 0
+    for k, t in tables.items():
+        print(f"{'✅' if not t.issues else '⚠️'} {k}: {len(t)}行 / 得点 {sum(t.column('goals'))} / 問題 {len(t.issues)}")
+        for i in t.issues[:10]:
+            print(f"   {i['line']}行目: {i['error']}")
+        bad += len(t.issues)
+    return tables, data, bad
+
+def build(base: str, csv_dir=None) -> int:
+    """csv_dir（既定 base）の CSV → base/index.html の rankingData。CSV が無ければ何もしない"""
+    d = csv_dir or base
+    try:
+        tables, data, bad = check(d)
+    except ValueError as e:
+        print("❌", e)
+        return 1
+    if not tables:
+        print(f"⏭️ 対象 CSV がありません: {d}")
+        return 0
+    if bad:
+        print(f"❌ CSV に問題が {bad} 件: {INDEX_HTML} は更新しません")
+        return 1
+    path = os.path.join(base, INDEX_HTML)
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    try:
+        html = embed(html, data)
+    except ValueError as e:
+        print("❌", e)
+        return 1
+    kng_assets.write_output(path, html, minify=False, precompress=os.path.exists(path + ".gz"))
+    print(f"✅ rankingData: {path}（{len(data)}データセット / {sum(map(len, data.values()))}行）")
+    return 0
+
+def main(argv):
+    if argv and argv[0] == "build":
+        args, base = argv[1:], os.getcwd()
+        if "--base" in args:
+            i = args.index("--base")
+            base = args[i + 1]
+            del args[i:i + 2]
+        return build(base, args[0] if args else None)
+    d = argv[0] if argv else os.getcwd()
+    try:
+        tables, _, bad = check(d)
+    except ValueError as e:
+        print("❌", e)
+        return 1
+    if not tables:
+        print(f"⚠️ 対象 CSV がありません: {d}")
+        return 1
+    return 1 if bad else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+KNG タスクランナー（依存グラフ / 並行実行 / 失敗タスクからの再開）
+- タスク = 名前 + 関数 + 依存タスク名。依存が全部成功したタスクから順にスレッドプールで実行
+  → プレビュー複製やファイル別の検証のような独立タスクは同時に走る
+- タスク関数は fn(inputs) 形式。inputs は {依存タスク名: 戻り値}
+  戻り値は JSON にできる小さな値（状態ファイル・監査に残すため）
+- 依存が失敗したタスクは "skipped"。always=True のタスク（監査など）は依存の成否に関係なく実行
+- 各タスクの状態・実時間・戻り値を状態ファイルに保存し、前回に失敗があれば
+  「失敗（または未実行）タスクとその下流」だけ再実行、前回成功分は戻り値を再利用（"reused"）
+- 依存: 標準ライブラリのみ
+"""
+import os, json, time, traceback
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import kng_runlog
+
+OK, FAILED, SKIPPED, REUSED = "ok", "failed", "skipped", "reused"
+
+class Task:
+    def __init__(self, name, fn, deps=(), always=False):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.always = always
+
+class DAG:
+    def __init__(self, state_path=None, workers=4):
+        self.state_path = state_path
+        self.workers = workers
+        self.tasks = {}
+
+    def add(self, name, fn, deps=(), always=False):
+        if name in self.tasks:
+            raise ValueError(f"タスク名が重複: {name}")
+        self.tasks[name] = Task(name, fn, deps, always)
+        return name
+
+    # ====== グラフ ======
+    def order(self) -> list:
+        """トポロジカル順（登録順を保つ）。未知の依存・循環は ValueError"""
+        indeg = {}
+        for t in self.tasks.values():
+            for d in t.deps:
+                if d not in self.tasks:
+                    raise ValueError(f"{t.name}: 未知の依存 {d}")
+            indeg[t.name] = len(t.deps)
+        children = self.children()
+        ready = [n for n in self.tasks if indeg[n] == 0]
+        out = []
+        while ready:
+            n = ready.pop(0)
+            out.append(n)
+            for c in children[n]:
+                indeg[c] -= 1
+                if indeg[c] == 0:
+                    ready.append(c)
+        if len(out) != len(self.tasks):
+            raise ValueError("依存が循環しています: " + ", ".join(n for n in self.tasks if n not in out))
+        return out
+
+    def children(self) -> dict:
+        ch = {n: [] for n in self.tasks}
+        for t in self.tasks.values():
+            for d in t.deps:
+                ch[d].append(t.name)
+        return ch
+
+    def downstream(self, names) -> set:
+        ch = self.children()
+        seen, stack = set(), list(names)
+        while stack:
+            n = stack.pop()
+            if n in seen:
+                continue
+            seen.add(n)
+            stack.extend(ch.get(n, ()))
+        return seen
+
+    # ====== 状態 ======
+    def load_state(self) -> dict:
+        if not self.state_path:
+            return {}
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f).get("tasks", {})
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self, results: dict):
+        if not self.state_path:
+            return
+        kng_runlog.ensure_dir(os.path.dirname(self.state_path))
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as w:
+            json.dump({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "tasks": results},
+                      w, ensure_ascii=False, indent=1, default=str)
+        os.replace(tmp, self.state_path)
+
+    def plan_resume(self, prev: dict) -> set:
+        """前回の状態から、再利用できるタスク名の集合"""
+        if not prev or all(p.get("status") in (OK, REUSED) for p in prev.values()):
+            return set()      # 前回が全成功（または初回）なら全部やり直す
+        bad = [n for n in self.tasks
+               if prev.get(n, {}).get("status") not in (OK, REUSED)]
+        rerun = self.downstream(bad)
+        return {n for n, t in self.tasks.items() if n not in rerun and not t.always}
+
+    # ====== 実行 ======
+    def _call(self, task, inputs):
+        t0 = time.perf_counter()
+        try:
+            res = task.fn(inputs)
+            return {"status": OK, "sec": round(time.perf_counter() - t0, 3), "result": res}
+        except Exception as e:
+            return {"status": FAILED, "sec": round(time.perf_counter() - t0, 3),
+                    "error": f"{type(e).__name__}: {e}",
+                    "trace": traceback.format_exc(limit=4)}
+
+    def run(self, resume=True) -> dict:
+        """
+        戻り値: {タスク名: {"status", "sec", "result" | "error", "started"}}（トポロジカル順）
+        """
+        order = self.order()
+        prev = self.load_state() if resume else {}
+        reuse = self.plan_resume(prev)
+        results = {}
+        for n in order:
+            if n in reuse:
+                r = dict(prev[n]); r["status"] = REUSED
+                results[n] = r
+
+        remaining = {n: set(self.tasks[n].deps) for n in order if n not in results}
+        t_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as ex:
+            running = {}
+
+            def submit_ready():
+                for n in [n for n, deps in remaining.items() if not (deps - results.keys())]:
+                    del remaining[n]
+                    task = self.tasks[n]
+                    ok_deps = all(results[d]["status"] in (OK, REUSED) for d in task.deps)
+                    if not ok_deps and not task.always:
+                        results[n] = {"status": SKIPPED, "sec": 0.0,
+                                      "error": "依存タスクが失敗: " + ", ".join(
+                                          d for d in task.deps if results[d]["status"] not in (OK, REUSED))}
+                        return True    # 結果が増えたので再評価
+                    inputs = {d: results[d].get("result") for d in task.deps}
+                    if task.always:
+                        inputs["_tasks"] = {d: results[d] for d in order if d in results}
+                    fut = ex.submit(self._call, task, inputs)
+                    running[fut] = (n, round(time.perf_counter() - t_start, 3))
+                return False
+
+            while remaining or running:
+                while submit_ready():
+                    pass
+                if not running:
+                    break
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    n, started = running.pop(fut)
+                    r = fut.result()
+                    r["started"] = started
+                    results[n] = r
+
+        results = {n: results[n] for n in order if n in results}
+        self.save_state(results)
+        return results
+
+def failed(results: dict) -> list:
+    return [n for n, r in results.items() if r["status"] == FAILED]
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 前回比較（差分レポート）
+- 前回実行の compact スナップショット（正規化名|チーム → 得点/順位）を読み込み、
+  今回分とキーで突き合わせて差分を出す（辞書によるキー結合, O(n)）
+    movers    … 順位が動いた行
+    new       … 新規得点者
+    increments… 得点が増えた行（減った行は decrements）
+    removed   … 今回消えた行
+- 差分は _logs/delta_<script>.json と ranking_delta_<script>.html に出力（スクリプトごとに別ファイル）
+- 差分が空なら呼び出し側は描画・反映を丸ごと省略できる（is_empty）
+- 依存: 標準ライブラリのみ
+"""
+import os, json
+import html as pyhtml
+from datetime import datetime
+
+import kng_assets, kng_runlog
+from kng_core import normalize_name, normalize_team
+
+SNAP_DIRNAME = "snapshots"
+DELTA_HTML = "ranking_delta_{script}.html"
+
+# ====== スナップショット ======
+def row_key(name: str, team: str) -> str:
+    return f"{normalize_name(name or '')}|{normalize_team(team or '')}"
+
+def competition_ranks(goals_desc):
+    """得点降順の list から 1,2,2,4 形式の順位 list を作る"""
+    ranks, last, rank = [], None, 0
+    for place, g in enumerate(goals_desc, 1):
+        if g != last:
+            rank, last = place, g
+        ranks.append(rank)
+    return ranks
+
+def make_snapshot(rows) -> dict:
+    """
+    rows: (name, team, goals) の iterable（順不同）
+    戻り値: {key: [表示名, チーム, 得点, 順位]}
+    """
+    items = sorted(((n, t or "", int(g)) for n, t, g in rows), key=lambda x: (-x[2], x[0]))
+    ranks = competition_ranks([g for _, _, g in items])
+    snap = {}
+    for (n, t, g), r in zip(items, ranks):
+        k = row_key(n, t)
+        # 同キー重複は最大得点側（先に来る）を採用
+        if k not in snap:
+            snap[k] = [n, t, g, r]
+    return snap
+
+def snapshot_path(base: str, script: str) -> str:
+    return os.path.join(kng_runlog.log_dir_for(base), SNAP_DIRNAME, f"{script}.json")
+
+def load_snapshot(base: str, script: str):
+    try:
+        with open(snapshot_path(base, script), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_snapshot(base: str, script: str, snap: dict):
+    path = snapshot_path(base, script)
+    kng_runlog.ensure_dir(os.path.dirname(path))
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as w:
+        w.write(kng_runlog.compact_json(snap))
+    os.replace(tmp, path)
+
+# ====== 差分 ======
+def diff(prev, cur) -> dict:
+    prev = prev or {}
+    movers, new, inc, dec, removed = [], [], [], [], []
+    for k, (n, t, g, r) in cur.items():
+        old = prev.get(k)
+        if old is None:
+            new.append({"name": n, "team": t, "goals": g, "rank": r})
+            continue
+        _, _, og, orank = old
+        if g > og:
+            inc.append({"name": n, "team": t, "from": og, "to": g})
+        elif g < og:
+            dec.append({"name": n, "team": t, "from": og, "to": g})
+        if r != orank:
+            movers.append({"name": n, "team": t, "from": orank, "to": r})
+    for k, (n, t, g, r) in prev.items():
+        if k not in cur:
+            removed.append({"name": n, "team": t, "goals": g, "rank": r})
+    movers.sort(key=lambda x: (x["to"] - x["from"], x["to"]))
+    new.sort(key=lambda x: (x["rank"], x["name"]))
+    inc.sort(key=lambda x: (x["from"] - x["to"], x["name"]))
+    return {
+        "first_run": not prev,
+        "movers": movers,
+        "new": new,
+        "increments": inc,
+        "decrements": dec,
+        "removed": removed,
+    }
+
+def is_empty(delta: dict) -> bool:
+    if delta.get("first_run"):
+        return False
+    return not any(delta[k] for k in ("movers", "new", "increments", "decrements", "removed"))
+
+def summary(delta: dict) -> dict:
+    return {k: len(delta[k]) for k in ("movers", "new", "increments", "decrements", "removed")}
+
+# ====== 出力 ======
+def render_delta(delta: dict, title: str) -> str:
+    esc = pyhtml.escape
+    parts = [
+        "<!doctype html><html><head><meta charset='utf-8'>",
+        f"<title>{esc(title)}（前回比較）</title></head><body>",
+        f"<h1>{esc(title)}（前回比較）</h1>",
+        f"<p><small>生成: {datetime.now().strftime('%Y/%m/%d %H:%M:%S')}</small></p>",
+    ]
+    if delta.get("first_run"):
+        parts.append("<p>前回スナップショットがありません（初回）。</p>")
+    sections = [
+        ("increments", "得点増", lambda x: f"{x['from']} → {x['to']}"),
+        ("new", "新規得点者", lambda x: f"{x['goals']}点（{x['rank']}位）"),
+        ("movers", "順位変動", lambda x: f"{x['from']}位 → {x['to']}位"),
+        ("decrements", "得点減（要確認）", lambda x: f"{x['from']} → {x['to']}"),
+        ("removed", "消えた行（要確認）", lambda x: f"{x['goals']}点（{x['rank']}位）"),
+    ]
+    for key, label, fmt in sections:
+        items = delta.get(key) or []
+        if not items:
+            continue
+        parts.append(f"<h2>{label}（{len(items)}）</h2><ul>")
+        for x in items:
+            parts.append(f"<li>{esc(x['name'])} / {esc(x['team'])} : {esc(fmt(x))}</li>")
+        parts.append("</ul>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+def html_path(base: str, script: str) -> str:
+    return os.path.join(base, DELTA_HTML.format(script=script))
+
+def run_delta(base: str, script: str, rows, title="U-15 得点ランキング"):
+    """
+    rows から今回スナップショットを作り、前回と比較して差分を書き出す。
+    差分が空なら何も書かない。スナップショットの更新は描画成功後に
+    呼び出し側が save_snapshot() で行う（途中失敗で差分を取りこぼさない）。
+    戻り値: (delta, snapshot)
+    """
+    cur = make_snapshot(rows)
+    delta = diff(load_snapshot(base, script), cur)
+    if is_empty(delta):
+        return delta, cur
+    log_dir = kng_runlog.log_dir_for(base)
+    kng_runlog.ensure_dir(log_dir)
+    with open(os.path.join(log_dir, f"delta_{script}.json"), "w", encoding="utf-8") as w:
+        w.write(kng_runlog.compact_json(delta))
+    kng_assets.write_output(html_path(base, script), render_delta(delta, title))
+    return delta, cur
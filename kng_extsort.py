@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 外部集計（メモリ予算を超えたら整列済みランを一時ファイルへ → heapq.merge で k-way マージ）
+- SpillDict: キーごとの部分集計（merge 関数で合算）。保持件数が予算に達したらキー順に並べて
+  ラン（一時ファイル）へ書き出し、空にして続行。items() は全ランをキー順にマージし、
+  同じキーを merge しながら (キー, 値) をキー順に流す
+- external_sort: 予算件数ずつ安定ソートしてランに書き、heapq.merge で1本に（全体も安定ソート）
+  → メモリ上の sorted() と同じ順序になる
+- ランは pickle をブロック単位（BLOCK 件）で書く。マージ中に持つのは各ランの1ブロックだけ
+- 予算に達しなければ一時ファイルは作らず、メモリ上の結果をそのまま返す
+- 使い方: python kng_extsort.py [BASE] [--budget N] [--verify]
+  leagues.json の各リーグの最新スナップショットをページ単位で読み（解析キャッシュは使わない）、
+  (リーグ, シーズン, 選手, チーム) の得点を外部集計 → archive_rankings.ndjson
+  --verify でメモリ上の集計（kng_match.scorer_totals + sorted）と一致するか確認
+- 依存: 標準ライブラリのみ
+"""
+import os, sys, heapq, pickle, tempfile
+from itertools import islice
+
+BUDGET_ITEMS = 200_000     # メモリに保持する件数の上限
+BLOCK = 1024               # ランの読み書き単位
+OUT_NDJSON = "archive_rankings.ndjson"
+
+# ====== ラン ======
+class _Runs:
+    def __init__(self, tmpdir=None):
+        self.tmpdir = tmpdir
+        self.paths = []
+        self.spilled = 0
+
+    def write(self, items):
+        """整列済みの items を1本のランとして書く"""
+        fd, path = tempfile.mkstemp(prefix="kng_run_", suffix=".pkl", dir=self.tmpdir)
+        with os.fdopen(fd, "wb") as f:
+            it = iter(items)
+            while True:
+                block = list(islice(it, BLOCK))
+                if not block:
+                    break
+                pickle.dump(block, f, pickle.HIGHEST_PROTOCOL)
+                self.spilled += len(block)
+        self.paths.append(path)
+
+    @staticmethod
+    def read(path):
+        with open(path, "rb") as f:
+            while True:
+                try:
+                    block = pickle.load(f)
+                except EOFError:
+                    return
+                yield from block
+
+    def close(self):
+        for p in self.paths:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+        self.paths = []
+
+# ====== 部分集計 ======
+class SpillDict:
+    def __init__(self, merge, budget=BUDGET_ITEMS, tmpdir=None):
+        self.merge = merge
+        self.budget = budget
+        self.data = {}
+        self.runs = _Runs(tmpdir)
+
+    def add(self, key, value):
+        d = self.data
+        old = d.get(key)
+        d[key] = value if old is None else self.merge(old, value)
+        if len(d) >= self.budget:
+            self.spill()
+
+    def spill(self):
+        if self.data:
+            self.runs.write(sorted(self.data.items(), key=lambda kv: kv[0]))
+            self.data = {}
+
+    def items(self):
+        """(キー, 値) をキー順に。同じキーはラン間でも merge 済み"""
+        if not self.runs.paths:
+            yield from sorted(self.data.items(), key=lambda kv: kv[0])
+            return
+        self.spill()
+        merged = heapq.merge(*(_Runs.read(p) for p in self.runs.paths), key=lambda kv: kv[0])
+        cur_k, cur_v = None, None
+        first = True
+        for k, v in merged:
+            if not first and k == cur_k:
+                cur_v = self.merge(cur_v, v)
+                continue
+            if not first:
+                yield cur_k, cur_v
+            cur_k, cur_v, first = k, v, False
+        if not first:
+            yield cur_k, cur_v
+
+    @property
+    def stats(self) -> dict:
+        return {"runs": len(self.runs.paths), "spilled": self.runs.spilled}
+
+    def close(self):
+        self.runs.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ====== 外部ソート ======
+def external_sort(items, key, budget=BUDGET_ITEMS, tmpdir=None, stats=None):
+    """sorted(items, key=key) と同じ順序で流す（予算を超えた分はランに書いてマージ）"""
+    runs = _Runs(tmpdir)
+    try:
+        it = iter(items)
+        chunk = list(islice(it, budget))
+        nxt = list(islice(it, budget))
+        if not nxt:
+            chunk.sort(key=key)
+            yield from chunk
+            return
+        while chunk:
+            chunk.sort(key=key)
+            runs.write(chunk)
+            chunk, nxt = nxt, list(islice(it, budget))
+        if stats is not None:
+            stats["sort_runs"] = len(runs.paths)
+        yield from heapq.merge(*(_Runs.read(p) for p in runs.paths), key=key)
+    finally:
+        runs.close()
+
+# ====== アーカイブの再集計 ======
+def archive_events(base: str):
+    """((リーグ, シーズン, 選手, チーム), 1) を得点ごとに。ページは1枚ずつ読んで捨てる"""
+    import kng_leagues, kng_match, kng_scan
+    caches = kng_leagues.SharedCaches(kng_leagues.load_aliases(base))
+    for lg in kng_leagues.load_registry(base):
+        snap = kng_leagues.latest_snapshot(base, lg["source"])
+        if not snap:
+            continue
+        season = str(lg.get("season", ""))
+        for div in lg["divisions"]:
+            for p in kng_scan.match_pages(base, snap, [div["id"]], lg["source"]):
+                m = kng_match.parse_match(caches.read(p))
+                m["teams"] = [caches.team(t) for t in m["teams"]]
+                for (name, team), n in kng_match.scorer_totals([m]).items():
+                    yield (lg["id"], season, name, team), n
+
+def _rank_key(kv):
+    (lg, season, name, team), g = kv
+    return (lg, season, -g, name, team)
+
+def archive_rankings(events, budget=BUDGET_ITEMS, tmpdir=None, stats=None):
+    """events → (リーグ, シーズン, 順位, 選手, チーム, 得点) を順位順に"""
+    with SpillDict(lambda a, b: a + b, budget, tmpdir) as agg:
+        for k, n in events:
+            agg.add(k, n)
+        last, rank, place, prev_g = None, 0, 0, None
+        for kv in external_sort(agg.items(), _rank_key, budget, tmpdir, stats):
+            (lg, season, name, team), g = kv
+            if (lg, season) != last:
+                last, place, prev_g = (lg, season), 0, None
+            place += 1
+            if g != prev_g:
+                rank, prev_g = place, g
+            yield lg, season, rank, name, team, g
+        if stats is not None:
+            stats.update(agg.stats)
+
+def in_memory_rankings(events):
+    tot = {}
+    for k, n in events:
+        tot[k] = tot.get(k, 0) + n
+    out, last, rank, place, prev_g = [], None, 0, 0, None
+    for (lg, season, name, team), g in sorted(tot.items(), key=_rank_key):
+        if (lg, season) != last:
+            last, place, prev_g = (lg, season), 0, None
+        place += 1
+        if g != prev_g:
+            rank, prev_g = place, g
+        out.append((lg, season, rank, name, team, g))
+    return out
+
+def main(argv):
+    import json, time
+    base = argv[0] if argv and not argv[0].startswith("--") else os.path.dirname(os.path.abspath(__file__))
+    budget = int(argv[argv.index("--budget") + 1]) if "--budget" in argv else BUDGET_ITEMS
+    stats = {}
+    t0 = time.perf_counter()
+    out = os.path.join(base, OUT_NDJSON)
+    tmp = out + ".tmp"
+    n = 0
+    with open(tmp, "w", encoding="utf-8") as w:
+        for lg, season, rank, name, team, g in archive_rankings(archive_events(base), budget, stats=stats):
+            w.write(json.dumps({"league": lg, "season": season, "rank": rank, "player": name,
+                                "team": team, "goals": g}, ensure_ascii=False) + "\n")
+            n += 1
+    os.replace(tmp, out)
+    print(f"✅ 出力: {out}（{n}行 / {time.perf_counter() - t0:.2f}s / 予算 {budget}件 / {stats}）")
+    if "--verify" in argv:
+        with open(out, encoding="utf-8") as f:
+            got = [tuple(json.loads(l).values()) for l in f]
+        ok = got == in_memory_rankings(archive_events(base))
+        print("✅ メモリ上の集計と一致" if ok else "❌ メモリ上の集計と不一致")
+        return 0 if ok else 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
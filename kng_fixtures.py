@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+試合ページ解析の回帰チェック用フィクスチャ
+- _archive/raw/<ts>/<div>/m*.html を kng_match.parse_match にかけた結果を
+  _fixtures/match_pages.json に保存（build）
+- check では同じページを再解析し、結果の不一致と解析時間の予算超過を報告
+  → 不一致 / 予算超過 / 元ページ欠落があれば終了コード 1
+- 使い方:
+    python kng_fixtures.py build   [BASE]
+    python kng_fixtures.py check   [BASE] [--budget-ms 50]
+- 依存: 標準ライブラリのみ
+"""
+import os, sys, json, hashlib
+
+import kng_match, kng_scan
+from kng_parseguard import ParseTimer
+
+FIXTURE_FILE = os.path.join("_fixtures", "match_pages.json")
+RAW_DIR = os.path.join("_archive", "raw")
+CHECK_BUDGET_SEC = 0.05      # 試合ページ1枚あたり（score-board 切り出し後なので十分小さい）
+
+def _read(path):
+    with open(path, "rb") as f:
+        b = f.read()
+    return b, b.decode("utf-8", errors="ignore")
+
+def _expected(m: dict) -> dict:
+    # JSON 往復で tuple → list になるので最初から list に揃える
+    return json.loads(json.dumps(m, ensure_ascii=False))
+
+def raw_pages(base: str) -> list:
+    """全スナップショットの試合ページ（kng_scan 経由）"""
+    return [p for s in kng_scan.snapshots(base, RAW_DIR) for p in kng_scan.match_pages(base, s, source=RAW_DIR)]
+
+def build(base: str) -> str:
+    pages = {}
+    for p in raw_pages(base):
+        b, txt = _read(p)
+        rel = os.path.relpath(p, base)
+        pages[rel] = {
+            "sha1": hashlib.sha1(b).hexdigest(),
+            "parsed": _expected(kng_match.parse_match(txt)),
+        }
+    out = os.path.join(base, FIXTURE_FILE)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as w:
+        json.dump({"pages": pages}, w, ensure_ascii=False, indent=1, sort_keys=True)
+    print(f"✅ フィクスチャ: {out}（{len(pages)}ページ）")
+    return out
+
+def check(base: str, budget=CHECK_BUDGET_SEC) -> dict:
+    with open(os.path.join(base, FIXTURE_FILE), encoding="utf-8") as f:
+        pages = json.load(f)["pages"]
+    timer = ParseTimer(budget=budget)
+    mismatched, missing, changed_src = [], [], []
+    for rel, fx in sorted(pages.items()):
+        p = os.path.join(base, rel)
+        if not os.path.exists(p):
+            missing.append(rel)
+            continue
+        b, txt = _read(p)
+        if hashlib.sha1(b).hexdigest() != fx["sha1"]:
+            changed_src.append(rel)      # 元ページ自体が変わった（参考情報）
+        got = _expected(timer.run(p, kng_match.parse_match, txt))
+        if got != fx["parsed"]:
+            mismatched.append(rel)
+    res = {
+        "pages": len(pages),
+        "mismatched": mismatched,
+        "missing": missing,
+        "source_changed": changed_src,
+        "timing": timer.summary(),
+    }
+    res["ok"] = not (mismatched or missing or timer.over)
+    return res
+
+def main(argv):
+    if not argv or argv[0] not in ("build", "check"):
+        print(__doc__)
+        return 2
+    base = argv[1] if len(argv) > 1 and not argv[1].startswith("--") else os.path.dirname(os.path.abspath(__file__))
+    if argv[0] == "build":
+        build(base)
+        return 0
+    budget = CHECK_BUDGET_SEC
+    if "--budget-ms" in argv:
+        budget = float(argv[argv.index("--budget-ms") + 1]) / 1000
+    res = check(base, budget)
+    t = res["timing"]
+    print(f"📄 ページ: {res['pages']} / 不一致: {len(res['mismatched'])} / 欠落: {len(res['missing'])}")
+    print(f"⏱️ p50 {t['p50_ms']}ms / p95 {t['p95_ms']}ms / max {t['max_ms']}ms / 予算超過: {len(t['over_budget'])}")
+    print("📊", t["histogram"])
+    for rel in res["mismatched"]:
+        print("  ❌ 不一致:", rel)
+    for name in t["over_budget"]:
+        print("  🐢 予算超過:", name)
+    print("✅ PASS" if res["ok"] else "❌ FAIL")
+    return 0 if res["ok"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
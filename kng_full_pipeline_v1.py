@@ -2,9 +2,20 @@
 """
 KNG SAFE フル対応パイプライン v1
 - 不要HTMLの安全退避（削除はしない）
-- チーム別HTMLを走査して重複名を正規化、最大得点で集計
+  先に移動計画を作り、rename / 別マウントはスレッドでコピー。ジャーナルで再開・巻き戻し可（kng_mover）
+- チーム別HTMLを走査して重複名を正規化、最大得点で集計（読み込みは kng_prefetch で先読み）
 - index_kngsafe_final.html を新規生成（既存 index.html は触らない）
+  CSS は共通の kng_site.<hash>.css を参照、HTML は minify + .gz 併置（kng_assets）
+- 前回結果との差分を ranking_delta_kng_full_pipeline_v1.html に出力、差分なしなら生成を省略（kng_delta）
+- ファイル別解析時間をヒストグラムで実行ログへ。予算超過は記録 or 隔離（kng_parseguard）
+- 正規化・読み込みは kng_core の共通実装（正規表現は事前コンパイル、正規化はメモ化）
+- ディレクトリ一覧は kng_scan（scandir + mtime キーのキャッシュ）
+- 表の選手別得点を試合ページの得点者イベントとハッシュ結合で照合（kng_reconcile）。
+  不一致はチーム・選手単位の件数で記録し、"gate" なら上限超過で index を生成しない
+- 集計と照合の途中で出典索引（選手 → 表の行 / 試合ページ・試合番号・分）を作り、
+  _logs/provenance_kng_full_pipeline_v1.idx に保存（python kng_provenance.py <選手名> で引く）
 - ログを表示（検出数 / 代表的な重複 / 退避件数）
+- 実行記録は _logs/runs.ndjson に1行追記（詳細は変化時のみ保存, kng_runlog）
 
 対象ディレクトリ:
   BASE = /sdcard/Download/sakana-no-osama.github.io
@@ -13,10 +24,14 @@ KNG SAFE フル対応パイプライン v1
 上書き禁止 / バックアップ必須 / 1コマンド完結
 """
 
-import os, re, shutil, json
+import os, re
 from datetime import datetime
 from collections import defaultdict, Counter
 
+import kng_assets, kng_core, kng_delta, kng_mover, kng_prefetch, kng_provenance, kng_reconcile, kng_runlog, kng_scan
+from kng_core import ensure_dir, strip_tags, normalize_name, read_text, first_int
+from kng_parseguard import ParseTimer, iter_blocks, QUARANTINE_DIR
+
 # ====== 設定 ======
 BASE = "/sdcard/Download/sakana-no-osama.github.io"
 DOWNLOAD_ROOT = "/sdcard/Download"
@@ -24,56 +39,40 @@ DOWNLOAD_ROOT = "/sdcard/Download"
 # Download 直下の *.html も「不要物」として退避するか
 SWEEP_DOWNLOAD_ROOT = True
 
-# 退避（削除はしない）
-TS = datetime.now().strftime("%Y%m%d_%H%M%S")
-BACKUP_ROOT = f"/sdcard/Download/backup_kng_{TS}"
-UNNEC_BASE = os.path.join(BACKUP_ROOT, "unnecessary_html_in_base")
-UNNEC_ROOT = os.path.join(BACKUP_ROOT, "unnecessary_html_in_download")
+# 退避（削除はしない）。時刻入りの退避先は実行時に init_backup_paths() で決める
+# （import しただけでは時刻を取らない・フォルダも作らない）
+BACKUP_ROOT = None
+UNNEC_BASE = None
+UNNEC_ROOT = None
 
 # 出力ファイル（常に新規作成）
 OUTPUT_INDEX = os.path.join(BASE, "index_kngsafe_final.html")
-OUTPUT_JSON  = os.path.join(BASE, f"kng_result_{TS}.json")
+RUN_LOG_DIR  = kng_runlog.log_dir_for(BASE)
+
+# 1ファイルあたりの解析時間予算（超過は "flag"=記録のみ / "quarantine"=隔離）
+PARSE_BUDGET_SEC = 0.5
+PARSE_BUDGET_MODE = "flag"
+
+# 表 ⇔ 試合ページの照合（"report"=記録のみ / "gate"=不一致が上限を超えたら index を生成しない）
+RECONCILE_MODE = "report"
+RECONCILE_LIMIT = 0
 
 # 残す（＝退避しない）ファイル名のパターン
 KEEP_PATTERNS = [
     r"^index.*\.html$",              # index 系
     r"^U15RANK.*\.html$",            # RANK インデックスなど
     r"^team_.*\.html$",              # チーム別
+    r"^ranking_delta_.+\.html$",     # 前回比較（スクリプトごと）
 ]
+KEEP_RE = kng_mover.combine(KEEP_PATTERNS)
 
 # ====== ユーティリティ ======
-def ensure_dir(d):
-    os.makedirs(d, exist_ok=True)
-
-def match_any(name, patterns):
-    return any(re.search(p, name, flags=re.I) for p in patterns)
-
-def list_html(dirpath):
-    try:
-        return [f for f in os.listdir(dirpath) if f.lower().endswith(".html")]
-    except Exception:
-        return []
-
-def strip_tags(x):
-    return re.sub(r"<[^>]*>", "", x, flags=re.S).strip()
-
-def normalize_name(name):
-    n = name
-    # 全角→半角（簡便版）
-    table = str.maketrans({
-        "　":" ", "–":"-", "－":"-", "―":"-", "‐":"-",
-    })
-    n = n.translate(table)
-    # よくある表記ゆれ
-    n = n.replace("　", " ").replace(" ", " ")  # NBSP
-    n = re.sub(r"\s+", " ", n).strip()
-    n = n.replace("（", "(").replace("）", ")")
-    # オウンゴール統一
-    if re.fullmatch(r"(オウンゴール|ＯＧ|OG|og)", n, flags=re.I):
-        return "OG"
-    # 記号・空白除去（人名の重複対策）
-    n2 = re.sub(r"[^\w\u3040-\u30FF\u4E00-\u9FFF]+", "", n)
-    return n2
+def init_backup_paths():
+    global BACKUP_ROOT, UNNEC_BASE, UNNEC_ROOT
+    if BACKUP_ROOT is None:
+        BACKUP_ROOT = os.path.join(DOWNLOAD_ROOT, "backup_kng_" + datetime.now().strftime("%Y%m%d_%H%M%S"))
+    UNNEC_BASE = UNNEC_BASE or os.path.join(BACKUP_ROOT, "unnecessary_html_in_base")
+    UNNEC_ROOT = UNNEC_ROOT or os.path.join(BACKUP_ROOT, "unnecessary_html_in_download")
 
 def parse_team_rows(html):
     """
@@ -81,8 +80,8 @@ def parse_team_rows(html):
     """
     rows = []
     # tr を抜く
-    for tr in re.findall(r"<tr[^>]*>(.*?)</tr>", html, flags=re.S|re.I):
-        tds = re.findall(r"<td[^>]*>(.*?)</td>", tr, flags=re.S|re.I)
+    for tr in iter_blocks(html, "tr"):
+        tds = list(iter_blocks(tr, "td"))
         if not tds:
             continue
         cols = [strip_tags(x) for x in tds]
@@ -101,42 +100,40 @@ def parse_team_rows(html):
         else:
             continue
         # 得点は数字のみ抽出
-        m = re.search(r"\d+", goals)
-        if not m:
+        g = first_int(goals)
+        if g is None:
             continue
-        g = int(m.group())
         rows.append((name.strip(), team.strip(), g))
     return rows
 
-def extract_table(path):
+def extract_table(path, reader=read_text):
     try:
-        html = open(path, encoding="utf-8").read()
-    except Exception:
+        html = reader(path)
+    except OSError:
         return []
     return parse_team_rows(html)
 
 def is_team_file(fname):
-    return fname.lower().startswith("team_") and fname.lower().endswith(".html")
+    lf = fname.lower()
+    if re.fullmatch(r"team_(players|totals)_final\d*\.html", lf):
+        return False   # 生成物（チーム別/合計ランキング）は入力にしない
+    return lf.startswith("team_") and lf.endswith(".html")
+
+# ディレクトリ一覧は mtime キー付きキャッシュ経由（kng_scan）
+def scanner():
+    return kng_scan.shared(BASE)
+
+def list_html(dirpath):
+    return scanner().list_html(dirpath)
 
 # ====== 1) 不要HTMLの安全退避 ======
-def sweep_unnecessary():
-    moved = 0
-    ensure_dir(UNNEC_BASE)
-    files = list_html(BASE)
-    for f in files:
-        if match_any(f, KEEP_PATTERNS):
-            continue
-        src = os.path.join(BASE, f)
-        dst = os.path.join(UNNEC_BASE, f)
-        try:
-            shutil.move(src, dst)
-            moved += 1
-        except Exception:
-            pass
-
-    moved_root = 0
+def plan_sweep():
+    """退避する (移動元, 移動先) を全部列挙（BASE 直下 → UNNEC_BASE、Download 直下 → UNNEC_ROOT）"""
+    init_backup_paths()
+    pairs = [(os.path.join(BASE, f), os.path.join(UNNEC_BASE, f))
+             for f in list_html(BASE) if not KEEP_RE.search(f)]
+    n_base = len(pairs)
     if SWEEP_DOWNLOAD_ROOT:
-        ensure_dir(UNNEC_ROOT)
         for f in list_html(DOWNLOAD_ROOT):
             # BASE 配下の index / team に関係ない「直下 *.html」は退避
             # （誤爆防止のため、sakana-no-osama.github.io の外にある *.html を拾う）
@@ -146,13 +143,17 @@ def sweep_unnecessary():
             # BASE 直下に同名があるなら触らない
             if os.path.exists(os.path.join(BASE, f)):
                 continue
-            try:
-                shutil.move(src, os.path.join(UNNEC_ROOT, f))
-                moved_root += 1
-            except Exception:
-                pass
+            pairs.append((src, os.path.join(UNNEC_ROOT, f)))
+    return pairs, n_base
 
-    return moved, moved_root
+def sweep_unnecessary():
+    pairs, n_base = plan_sweep()
+    res = kng_mover.run(BASE, "sweep", pairs)
+    done = {m["src"] for m in kng_mover.moved(res)}
+    moved = sum(1 for src, _ in pairs[:n_base] if src in done)
+    for i, src, err in res["failed"]:
+        print(f"⚠️ 退避できません: {src}（{err}）")
+    return moved, len(done) - moved
 
 # ====== 2) 集計（重複名は正規化し最大得点採用） ======
 def aggregate():
@@ -160,25 +161,34 @@ def aggregate():
     totals = defaultdict(int)
     shown_name = {}   # 正規化名 -> 表示名
     name_team  = {}   # 正規化名 -> 採用チーム
-    conflicts  = []   # チームが異なる重複の記録
+    conflicts  = Counter()   # (正規化名, 前のチーム, 後のチーム) -> 出現回数
+    tables = kng_reconcile.TableSide(kng_reconcile.team_key_fn(kng_reconcile.load_aliases(BASE)))
+    prov = kng_provenance.Provenance(tables.team_key)
 
     team_files = [f for f in list_html(BASE) if is_team_file(f)]
+    timer = ParseTimer(budget=PARSE_BUDGET_SEC, mode=PARSE_BUDGET_MODE,
+                       quarantine_dir=os.path.join(BASE, QUARANTINE_DIR))
     scanned = 0
+    pf = kng_prefetch.Prefetcher([os.path.join(BASE, f) for f in team_files])
     for f in team_files:
         scanned += 1
-        rows = extract_table(os.path.join(BASE, f))
+        path = os.path.join(BASE, f)
+        rows = timer.run(path, extract_table, path, pf.read_text)
         per_file_counts[f] = len(rows)
         for name, team, g in rows:
+            tables.add(name, team, g)
+            prov.add(name, team, f, goals=g)
             key = normalize_name(name)
             # 表示名はより長い方を採用（漢字優先想定）
             if key not in shown_name or len(name) > len(shown_name[key]):
                 shown_name[key] = name
             # チームが違う場合の記録（採点は最大値）
             if key in name_team and name_team[key] != team:
-                conflicts.append((shown_name[key], name_team[key], team))
+                conflicts[(key, name_team[key], team)] += 1
             name_team[key] = team if (key not in name_team or g >= totals[key]) else name_team[key]
             if g > totals[key]:
                 totals[key] = g
+    pf.close()
 
     return {
         "scanned": scanned,
@@ -187,7 +197,12 @@ def aggregate():
         "totals": dict(totals),
         "shown_name": shown_name,
         "name_team": name_team,
-        "conflicts": conflicts,
+        "conflicts": [[shown_name[k], a, b, n] for (k, a, b), n in conflicts.most_common()],
+        "tables": tables,
+        "provenance": prov,
+        "parse_timing": timer.summary(),
+        "scan": dict(scanner().stats),
+        "prefetch": pf.stats,
     }
 
 # ====== 3) index（完成版）生成 ======
@@ -221,13 +236,8 @@ def build_index(result):
     html = f"""<!doctype html>
 <html><head><meta charset="utf-8">
 <title>U-15 得点ランキング（KNG 最終版）</title>
-<style>
-body{{font-family:sans-serif}}
-table{{border-collapse:collapse}}
-th,td{{border:1px solid #ccc;padding:6px 10px}}
-th{{background:#f6f6f6}}
-small{{color:#666}}
-</style></head><body>
+{kng_assets.link_tag(kng_assets.write_stylesheet(BASE))}
+</head><body>
 <h2>U-15 得点ランキング（自動集計・KNG）</h2>
 <p>最終更新: {datetime.now().strftime("%Y/%m/%d %H:%M:%S")} / スキャン: {result["scanned"]}ファイル</p>
 
@@ -249,35 +259,100 @@ small{{color:#666}}
 
 <p><small>※ 重複名は正規化し「最大得点」を採用。異チーム重複は name_team の最新チームで表示。</small></p>
 </body></html>"""
-    open(OUTPUT_INDEX, "w", encoding="utf-8").write(html)
-    return OUTPUT_INDEX
+    return kng_assets.write_output(OUTPUT_INDEX, html)
 
 # ====== メイン ======
+SCRIPT = "kng_full_pipeline_v1"
+
 def main():
+    """戻り値: 0 = 出力済み / 据え置き、1 = 出力できず（BASE 無し・得点データ無し・照合で HOLD）"""
     if not os.path.isdir(BASE):
         print(f"❌ BASE が見つかりません: {BASE}")
-        return
+        return 1
 
+    timings = {}
+    init_backup_paths()
     ensure_dir(BACKUP_ROOT)
-    m1, m2 = sweep_unnecessary()
+    with kng_runlog.timer(timings, "sweep"):
+        m1, m2 = sweep_unnecessary()
     print(f"📦 退避: BASE内 {m1} 件 / Download直下 {m2} 件 → {BACKUP_ROOT}")
 
-    result = aggregate()
+    with kng_runlog.timer(timings, "aggregate"):
+        result = aggregate()
+    scanner().save()
 
     # ざっくりプレビュー
     totals = result["totals"]
     if not totals:
         print("⚠️ 得点データが検出できません。team_*.html の表構造をご確認ください。")
-        return
+        return 1
     print("👀 上位プレビュー:", Counter(totals).most_common(5))
 
-    out = build_index(result)
-    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    # 表 ⇔ 試合ページの照合（スナップショットが無ければ省略）
+    with kng_runlog.timer(timings, "reconcile"):
+        rec = kng_reconcile.run(BASE, result["tables"], result["provenance"])
+    prov = result["provenance"].save(BASE, SCRIPT)
+    print(f"🔎 出典索引: {prov['players']}人 / {prov['sources']}件 → {kng_provenance.index_path(BASE, SCRIPT)}")
+    if rec:
+        kng_reconcile.print_report(rec)
+        if RECONCILE_MODE == "gate" and not kng_reconcile.gate(rec, RECONCILE_LIMIT):
+            kng_runlog.record_run(BASE, SCRIPT, timings=timings,
+                                  counts={"players": len(totals), "held": 1, **rec["counts"]},
+                                  details={"reconcile": rec["teams"]})
+            print(f"❌ 照合の不一致 {rec['mismatches']} 件 > 上限 {RECONCILE_LIMIT}: index は生成しない（HOLD）")
+            return 1
+
+    # 前回比較: 差分なし & 出力ありなら index 生成を省略
+    with kng_runlog.timer(timings, "delta"):
+        delta, snap = kng_delta.run_delta(BASE, SCRIPT, (
+            (result["shown_name"].get(k, k), result["name_team"].get(k, ""), g)
+            for k, g in totals.items()))
+    print("🔁 前回比較:", kng_delta.summary(delta))
+    if kng_delta.is_empty(delta) and os.path.exists(OUTPUT_INDEX):
+        kng_runlog.record_run(BASE, SCRIPT, timings=timings,
+                              counts={"players": len(totals), "skipped": 1},
+                              outputs=[OUTPUT_INDEX])
+        print("⏭️ 前回から変化なし: index は据え置き")
+        return 0
+
+    with kng_runlog.timer(timings, "render"):
+        out = build_index(result)
+    kng_delta.save_snapshot(BASE, SCRIPT, snap)
+
+    legacy = kng_runlog.compact_legacy(BASE)
+    kng_runlog.record_run(
+        BASE, SCRIPT,
+        timings=timings,
+        counts={
+            "scanned": result["scanned"],
+            "players": len(totals),
+            "conflicts": len(result["conflicts"]),
+            "reconcile_mismatches": rec["mismatches"] if rec else None,
+            "changed_matches": sum(r["changed"] + r["added"] for r in rec["snapshots"]) if rec else None,
+            "swept_base": m1,
+            "swept_root": m2,
+            "legacy_logs": len(legacy["moved"]),
+        },
+        outputs=[out],
+        extra={"delta": kng_delta.summary(delta), "parse": result["parse_timing"],
+               "norm_cache": kng_core.cache_info(),
+               "scan": result["scan"],
+               "provenance": prov,
+               "prefetch": result["prefetch"],
+               "reconcile": {"snapshot": rec["snapshot"], **rec["counts"]} if rec else None,
+               "snapshots": rec["snapshots"] if rec else []},
+        details={
+            "per_file_counts": result["per_file_counts"],
+            "conflicts": result["conflicts"],
+            "reconcile": rec["teams"] if rec else {},
+            "totals": {"totals": totals, "shown_name": result["shown_name"], "name_team": result["name_team"]},
+        },
+    )
 
     print(f"✅ 出力: {out}（{len(totals)}名）")
-    print(f"📝 ログ: {OUTPUT_JSON}")
+    print(f"📝 ログ: {os.path.join(RUN_LOG_DIR, kng_runlog.RUN_LOG)}")
     print("👉 ブラウザで直接開く: file://" + out)
+    return 0
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+go.sh（Strict v2.6）の Python 版: 依存グラフで各段を実行（kng_dag）
+  fetch ─ parse
+  aggregate ─ render ─ backup ─ diagnose_{index,player,totals} ─ verify ─ reflect
+                                   └ copy_{index,player,totals}（DLへプレビュー複製）
+  audit（全タスクの後に必ず実行）
+- 独立したタスク（ファイル別の診断、プレビュー複製、fetch/parse と集計）は同時に実行
+- 監査ファイルには固定の PASS ではなく、各タスクの実際の結果と実時間を記録
+- 失敗があった次の実行は、失敗タスクとその下流だけやり直す（--fresh で全部やり直し）
+- 旧 go.sh は [A] で反映先を移動してから [B] で読んでいたため診断が常に missing だった。
+  ここでは [A] はコピー退避（_old_backup/<ts>_preGoStrict/）にして、診断は現物を読む
+- fetch: ネット取得のスクリプトは無いので、_archive/raw/ の最新スナップショットを入力とする
+- parse: kng_snapshots で未取り込みのスナップショットを取り込む（score-board が変わった試合だけ解析）
+- 使い方: python kng_go.py [--fresh] [--workers N]   （AUTO_OPEN=1 でプレビュー自動オープン）
+- 依存: 標準ライブラリのみ（bs4 は診断の行数確認にのみ任意使用）
+"""
+import os, re, sys, json, shutil, unicodedata
+from datetime import datetime
+
+import kng_assets, kng_dag, kng_runlog, kng_scan
+
+BASE = "/sdcard/Download/sakana-no-osama.github.io"
+DL = "/sdcard/Download"
+DIAG = os.path.join(BASE, "_diagnose")
+AUDIT = os.path.join(DL, "kng_go_audit.txt")
+STATE = os.path.join(kng_runlog.log_dir_for(BASE), "go_state.json")
+TARGETS = {
+    "index": "index_kngsafe_final.html",         # kng_full_pipeline_v1
+    "player": "team_players_final23.html",       # u15_fullsite_vFinal23
+    "totals": "team_totals_final23.html",        # u15_fullsite_vFinal23
+}
+RULE_FILES = ("RULES_FinalEdition_Strict.txt", "RULES_FinalEdition_Light.txt")
+WORKERS = 4
+SCRIPT = "kng_go"
+
+RE_META_CHARSET = re.compile(r"""(?is)<meta[^>]+charset=["'][^"']*["'][^>]*>""")
+RE_HEAD = re.compile(r"(?is)<head([^>]*)>")
+RE_TABLE = re.compile(r"(?is)<table[^>]*>(.*?)</table>")
+RE_TR = re.compile(r"(?i)<tr\b")
+
+def target_path(k):
+    return os.path.join(BASE, TARGETS[k])
+
+# ====== fetch / parse ======
+def t_fetch(inp):
+    """最新の _archive/raw/<ts>/ とその試合ページ"""
+    snaps = kng_scan.snapshots(BASE)
+    if not snaps:
+        return {"snapshot": None, "pages": []}
+    snap = snaps[-1]
+    pages = kng_scan.match_pages(BASE, snap)
+    return {"snapshot": snap, "pages": [os.path.relpath(p, BASE) for p in pages]}
+
+def t_parse(inp):
+    """未取り込みのスナップショットを取り込み、score-board が変わった試合だけ解析（kng_snapshots）"""
+    import kng_snapshots
+    state, snaps = kng_snapshots.update(BASE)
+    matches = kng_snapshots.matches(state) if state else {}
+    return {
+        "pages": len(matches),
+        "changed": {r["snapshot"]: r["changed"] + r["added"] for r in snaps},
+        "parsed": sum(r["parsed"] for r in snaps),
+        "finished": sum(1 for m in matches.values() if m["score"] is not None),
+        "goals": sum(len(m["goals"]) for m in matches.values()),
+    }
+
+# ====== 集計 / 描画 ======
+def _run_script(module_name):
+    """main() を実行。0 以外（出力できずに途中で終了）ならタスク失敗にする"""
+    import importlib
+    mod = importlib.import_module(module_name)
+    rc = mod.main()
+    if rc != 0:
+        raise RuntimeError(f"{module_name}.main() が {rc} で終了（出力なし）")
+    rec = kng_runlog.last_record(kng_runlog.log_dir_for(BASE), getattr(mod, "SCRIPT", module_name)) or {}
+    return {"counts": rec.get("counts", {}), "timings": rec.get("timings", {})}
+
+def t_aggregate(inp):
+    return _run_script("kng_full_pipeline_v1")
+
+def t_render(inp):
+    return _run_script("u15_fullsite_vFinal23")
+
+# ====== [A] 退避 ======
+def t_backup(inp):
+    dest = os.path.join(BASE, "_old_backup", datetime.now().strftime("%Y%m%d_%H%M%S") + "_preGoStrict")
+    copied = []
+    for k in TARGETS:
+        p = target_path(k)
+        if os.path.exists(p):
+            kng_runlog.ensure_dir(dest)
+            shutil.copy2(p, os.path.join(dest, os.path.basename(p)))
+            copied.append(os.path.basename(p))
+    return {"dest": dest if copied else None, "copied": copied}
+
+# ====== [B] 診断（UTF-8 強制 + 表の行数） ======
+def enforce_utf8(t: str) -> str:
+    t = RE_META_CHARSET.sub("", t)
+    if RE_HEAD.search(t):
+        return RE_HEAD.sub(r'<head\1>\n<meta charset="utf-8">', t, 1)
+    return '<meta charset="utf-8">' + t
+
+def rowcount(t: str):
+    """(最初の table の行数, bs4 を使ったか)"""
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        m = RE_TABLE.search(t)
+        return len(RE_TR.findall(m.group(1) if m else "")), False
+    tb = BeautifulSoup(t, "html.parser").find("table")
+    return (len(tb.find_all("tr")) if tb else 0), True
+
+def diagnose(k):
+    def run(inp):
+        try:
+            with open(target_path(k), "rb") as f:
+                b = f.read()
+        except OSError:
+            return {"verdict": "missing", "meta": None, "rows": None, "used_bs4": False}
+        t = enforce_utf8(unicodedata.normalize("NFKC", b.decode("utf-8", "ignore")))
+        rows, used = rowcount(t)
+        kng_runlog.ensure_dir(DIAG)
+        with open(os.path.join(DIAG, f"{k}_fixed.html"), "w", encoding="utf-8") as w:
+            w.write(t)
+        with open(os.path.join(DIAG, f"{k}_preview.html"), "w", encoding="utf-8") as w:
+            w.write(f"<!doctype html><meta charset='utf-8'><h1>{k}</h1><p>rows:{rows}</p>")
+        return {"verdict": "ok" if rows > 0 else "no-table", "meta": "utf-8", "rows": rows, "used_bs4": used}
+    return run
+
+def t_verify(inp):
+    ver = {k: inp[f"diagnose_{k}"] for k in TARGETS}
+    kng_runlog.ensure_dir(DIAG)
+    with open(os.path.join(DIAG, "verify_encoding.json"), "w", encoding="utf-8") as w:
+        json.dump(ver, w, ensure_ascii=False, indent=2)
+    return ver
+
+# ====== [C] プレビュー複製 ======
+def copy_preview(k):
+    def run(inp):
+        src = os.path.join(DIAG, f"{k}_preview.html")
+        if not os.path.exists(src):
+            return {"copied": None}
+        dst = os.path.join(DL, f"{k}_preview.html")
+        shutil.copyfile(src, dst)
+        if os.environ.get("AUTO_OPEN", "0") == "1":
+            import subprocess
+            subprocess.run(["termux-open", dst], stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, check=False)
+        return {"copied": dst}
+    return run
+
+# ====== [D] 反映（3つとも rows>0 の場合のみ） ======
+def t_reflect(inp):
+    ver = inp["verify"]
+    if not all((ver[k].get("rows") or 0) > 0 for k in TARGETS):
+        return {"reflect": "HOLD", "hold": [k for k in TARGETS if not (ver[k].get("rows") or 0) > 0]}
+    for k in TARGETS:
+        p = target_path(k)
+        shutil.copyfile(os.path.join(DIAG, f"{k}_fixed.html"), p)
+        if os.path.exists(p + ".gz"):
+            kng_assets.write_gzip_sibling(p)     # 併置の .gz も反映後の内容に揃える
+    return {"reflect": "PASS"}
+
+# ====== [E] 監査 ======
+def t_audit(inp):
+    tasks = inp["_tasks"]
+    def res(n):
+        return (tasks.get(n) or {}).get("result") or {}
+    failed = kng_dag.failed(tasks)
+    skipped = [n for n, r in tasks.items() if r["status"] == kng_dag.SKIPPED]
+    reflect = res("reflect").get("reflect", "-")
+    rules = [f for f in RULE_FILES if os.path.exists(os.path.join(BASE, f))]
+    copied = [k for k in TARGETS if res(f"copy_{k}").get("copied")]
+    bs4_used = [k for k in TARGETS if res(f"diagnose_{k}").get("used_bs4")]
+    overall = "FAIL" if failed else ("PASS" if reflect == "PASS" else "HOLD")
+
+    lines = [f"[KNG go Audit] {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"]
+    for n, r in tasks.items():
+        note = r.get("error") or json.dumps(r.get("result"), ensure_ascii=False, default=str)
+        lines.append(f"- {n}: {r['status'].upper()} {r.get('sec', 0):.3f}s  {note[:160]}")
+    lines += [
+        f"- RULE file: {'PASS' if rules else 'FAIL'} ({', '.join(rules) or 'なし'})",
+        f"- バックアップ: {', '.join(res('backup').get('copied', [])) or '対象なし'}",
+        f"- DLへコピー: {len(copied)}/{len(TARGETS)}",
+        f"- 自動オープン: {os.environ.get('AUTO_OPEN', '0')}",
+        f"- bs4使用: {', '.join(bs4_used) or 'なし'}（診断タスクのみ）",
+        f"- 反映: {reflect}",
+        "",
+        "== OVERALL ==",
+        overall,
+        f"failed={','.join(failed)}",
+        f"skipped={','.join(skipped)}",
+        f"has_preview_copy={int(bool(copied))}",
+        f"rule_file={int(bool(rules))}",
+    ]
+    kng_runlog.ensure_dir(os.path.dirname(AUDIT))
+    with open(AUDIT, "w", encoding="utf-8") as w:
+        w.write("\n".join(lines) + "\n")
+    return {"overall": overall, "audit": AUDIT}
+
+# ====== グラフ ======
+def build_dag(workers=WORKERS) -> kng_dag.DAG:
+    g = kng_dag.DAG(STATE, workers=workers)
+    g.add("fetch", t_fetch)
+    g.add("parse", t_parse, ["fetch"])
+    # 集計内の照合（kng_reconcile）も kng_snapshots の状態を使う → 取り込みは parse で1回済ませておく
+    g.add("aggregate", t_aggregate, ["parse"])
+    # kng_full_pipeline_v1 の掃除は BASE 直下を動かすので、描画はその後
+    g.add("render", t_render, ["aggregate"])
+    g.add("backup", t_backup, ["aggregate", "render"])
+    for k in TARGETS:
+        g.add(f"diagnose_{k}", diagnose(k), ["backup"])
+        g.add(f"copy_{k}", copy_preview(k), [f"diagnose_{k}"])
+    g.add("verify", t_verify, [f"diagnose_{k}" for k in TARGETS])
+    g.add("reflect", t_reflect, ["verify", "backup"])
+    g.add("audit", t_audit, [n for n in g.tasks], always=True)
+    return g
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    workers = int(argv[argv.index("--workers") + 1]) if "--workers" in argv else WORKERS
+    results = build_dag(workers).run(resume="--fresh" not in argv)
+
+    kng_runlog.record_run(
+        BASE, SCRIPT,
+        timings={n: r.get("sec", 0.0) for n, r in results.items()},
+        counts={s: sum(1 for r in results.values() if r["status"] == s)
+                for s in (kng_dag.OK, kng_dag.FAILED, kng_dag.SKIPPED, kng_dag.REUSED)},
+        extra={"overall": (results["audit"].get("result") or {}).get("overall")},
+    )
+    icons = {kng_dag.OK: "✅", kng_dag.FAILED: "❌", kng_dag.SKIPPED: "⏭️", kng_dag.REUSED: "🔁"}
+    for n, r in results.items():
+        print(f"{icons[r['status']]} {n}: {r.get('sec', 0):.3f}s", r.get("error", ""))
+    print("🗂️ 監査:", AUDIT)
+    return 1 if kng_dag.failed(results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 回帰ハーネス（アーカイブ済みの出力 ⇔ 現行パイプラインの再実行）
+- _archive/<TS>_preFinalNN/ 等に残っている過去の出力（U15RANK_*.html / team_players_* /
+  team_totals_*）を「既知の出力」、同じ時点以前の _archive/raw/<TS>/ を「その入力」とみなす
+- 入力スナップショットを一時ディレクトリで現行の kng_leagues.run_league に通し、
+  出力 HTML と過去の出力 HTML の両方から表を取り出して意味で比較
+  （見出しの列名で 選手 / チーム / 得点 を判別し、名前・チームは kng_core の照合キー、
+    順位・生成時刻・タグや class の違いは見ない）
+- 過去の版の既知の違い（当時の不具合）は、人が見て accept したものだけ _fixtures/golden.json の
+  「承認済みの差分」に入る。build は承認を作らない（既に accept 済みで今も出る差分だけ残す）。
+  check では承認されていない差分を失敗にする（消えた差分は「解消」として表示）
+- 段ごと（parse / aggregate / render）の時間も golden.json の基準値と比べ、
+  基準 × (1 + SLOWDOWN) かつ 基準 + SLOWDOWN_MIN_MS を超えたら失敗
+  （時間の基準は端末（host()）ごとに保存。その端末で build するまで、その端末での時間の判定は省略）
+- 使い方: python kng_golden.py build  [BASE]             … ケースとこの端末の時間の基準を作り直す
+          python kng_golden.py check  [BASE]             … 差分・時間を基準と比べる（失敗なら終了コード 1）
+          python kng_golden.py accept <ケース> <キー> [BASE] … 確認した差分 1 件を承認（現行の値で記録）
+- 依存: 標準ライブラリのみ
+"""
+import os, re, sys, json, shutil, platform, tempfile
+
+import kng_core, kng_runlog, kng_scan
+
+GOLDEN_FILE = os.path.join("_fixtures", "golden.json")
+ARCHIVE_DIR = "_archive"
+RAW_DIR = os.path.join(ARCHIVE_DIR, "raw")
+STAGES = ("parse", "aggregate", "render")
+REPEAT = 3                  # 時間は REPEAT 回の最小値
+SLOWDOWN = 0.5              # 基準より 50% 以上遅くなったら失敗
+SLOWDOWN_MIN_MS = 20        # ただし差が 20ms 未満なら揺らぎとして見ない
+SCRIPT = "kng_golden"
+
+RE_TS = re.compile(r"\d{8}_\d{6}")
+RE_OUTPUT = re.compile(r"(U15RANK_(ALL|KANTO\d+)|team_players|team_totals)_final\d+\.html", re.I)
+RE_TABLE = re.compile(r"(?is)<(h[1-4])[^>]*>(.*?)</\1>|<table\b.*?</table>")
+RE_TR = re.compile(r"(?is)<tr[^>]*>(.*?)</tr>")
+RE_CELL = re.compile(r"(?is)<(t[hd])[^>]*>(.*?)</t[hd]>")
+COLUMNS = {"順位": "rank", "選手": "player", "選手名": "player", "チーム": "team",
+           "得点": "goals", "総得点": "goals", "合計": "goals"}
+ALL_SECTION = "総合"
+TEAM_SECTION = "チーム合計"      # kng_leagues のチーム合計の見出し
+
+# ====== 表の取り出し（意味だけ） ======
+def tables(html: str) -> list:
+    """[(直前の見出し, [{"player","team","goals"}])]。列は見出しの名前で判別"""
+    out, heading = [], ""
+    for m in RE_TABLE.finditer(html):
+        if m.group(1):
+            heading = kng_core.strip_tags(m.group(2))
+            continue
+        cols, rows = None, []
+        for tr in RE_TR.findall(m.group(0)):
+            cells = RE_CELL.findall(tr)
+            if cells and all(t.lower() == "th" for t, _ in cells):
+                cols = [COLUMNS.get(kng_core.strip_tags(c)) for _, c in cells]
+                continue
+            if not cols or len(cells) != len(cols):
+                continue
+            row = {k: kng_core.strip_tags(c) for k, (_, c) in zip(cols, cells) if k}
+            g = kng_core.first_int(row.get("goals", ""))
+            if g is None:
+                continue
+            row["goals"] = g
+            rows.append(row)
+        if rows:
+            out.append((heading, rows))
+    return out
+
+def semantic(tabs, kind: str) -> dict:
+    """kind="players": {"名前キー|チームキー": 得点}（チーム列が無ければ見出しをチームとする）
+       kind="teams":   {"チームキー": 得点}"""
+    out = {}
+    for heading, rows in tabs:
+        for r in rows:
+            team = kng_core.normalize_team(r.get("team", heading))
+            if kind == "teams":
+                k = team
+            elif "player" in r:
+                k = kng_core.normalize_name(r["player"]) + "|" + team
+            else:
+                continue
+            out[k] = max(out.get(k, 0), r["goals"])
+    return out
+
+def section(tabs, title: str) -> list:
+    return [(h, rows) for h, rows in tabs if h == title]
+
+# ====== ケースの発見 ======
+def _archive_ts(name: str):
+    m = RE_TS.search(name)
+    return m.group(0) if m else None
+
+def snapshot_teams(base: str, snapshot: str) -> set:
+    """入力スナップショットの試合ページに出てくるチームの照合キー"""
+    import kng_match
+    out = set()
+    for p in kng_scan.match_pages(base, snapshot, source=RAW_DIR):
+        out.update(kng_core.normalize_team(t) for t in kng_match.parse_match(kng_core.read_text(p))["teams"])
+    return out
+
+def comparable(sem: dict, kind: str, teams: set) -> bool:
+    """表が空、またはチーム列が入力のどのチームとも合わない（列ずれ等、当時の失敗）出力は比べられない"""
+    keys = sem if kind == "teams" else (k.rsplit("|", 1)[1] for k in sem)
+    return any(k in teams for k in keys)
+
+def discover(base: str) -> list:
+    """過去の出力と、その時点以前で最新の入力スナップショットの組（comparable なものだけ）"""
+    snaps = kng_scan.snapshots(base, RAW_DIR)
+    if not snaps:
+        return []
+    sc = kng_scan.shared(base)
+    cases, teams = [], {}
+    for d in sc.subdirs(os.path.join(base, ARCHIVE_DIR)):
+        ts = _archive_ts(d)
+        src = [s for s in snaps if ts and s <= ts]
+        if d == "raw" or not src:
+            continue
+        for f in sc.listdir(os.path.join(base, ARCHIVE_DIR, d))[1]:
+            m = RE_OUTPUT.fullmatch(f)
+            if not m:
+                continue
+            rel = os.path.join(ARCHIVE_DIR, d, f)
+            if m.group(1).lower() == "team_totals":
+                kind, sec = "teams", TEAM_SECTION
+            else:
+                kind = "players"
+                div = (m.group(2) or "ALL").lower()
+                sec = ALL_SECTION if div == "all" else div
+            if src[-1] not in teams:
+                teams[src[-1]] = snapshot_teams(base, src[-1])
+            with open(os.path.join(base, rel), encoding="utf-8", errors="ignore") as fh:
+                if not comparable(semantic(tables(fh.read()), kind), kind, teams[src[-1]]):
+                    continue
+            cases.append({"name": f"{d}/{f}", "expected": rel, "snapshot": src[-1],
+                          "kind": kind, "section": sec})
+    return cases
+
+# ====== 再実行 ======
+def replay(base: str, snapshot: str) -> dict:
+    """スナップショットを一時ディレクトリで run_league に通す。戻り値: {"tables", "timings"}"""
+    import kng_leagues
+    src = os.path.abspath(os.path.join(base, RAW_DIR, snapshot))
+    divs = kng_scan.shared(base).subdirs(src)
+    lg = {"id": "golden", "name": "golden", "source": RAW_DIR, "output_prefix": "golden",
+          "divisions": [{"id": d, "label": d} for d in divs]}
+    root = tempfile.mkdtemp(prefix="kng_golden_")
+    try:
+        dst = os.path.join(root, RAW_DIR, snapshot)
+        kng_runlog.ensure_dir(os.path.dirname(dst))
+        try:
+            os.symlink(src, dst)
+        except OSError:
+            shutil.copytree(src, dst)
+        res = kng_leagues.run_league(root, lg, kng_leagues.SharedCaches(kng_leagues.load_aliases(base)))
+        with open(os.path.join(root, "golden_ranking.html"), encoding="utf-8") as f:
+            tabs = tables(f.read())
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return {"tables": tabs, "timings": res["timings"]}
+
+def diff(expected: dict, got: dict) -> list:
+    """[[キー, 過去の値, 現行の値]]（片側に無ければ None）"""
+    return [[k, expected.get(k), got.get(k)]
+            for k in sorted(expected.keys() | got.keys()) if expected.get(k) != got.get(k)]
+
+def run_cases(base: str, cases: list, repeat=REPEAT) -> dict:
+    """ケースごとの差分と、スナップショットごとの段別時間（repeat 回の最小, ms）"""
+    by_snap, timings = {}, {}
+    for snap in sorted({c["snapshot"] for c in cases}):
+        best = {}
+        for _ in range(repeat):
+            r = replay(base, snap)
+            for st in STAGES:
+                ms = r["timings"].get(st, 0) * 1000
+                best[st] = min(best.get(st, ms), ms)
+        by_snap[snap] = r["tables"]
+        timings[snap] = {st: round(v, 1) for st, v in best.items()}
+    diffs = {}
+    for c in cases:
+        with open(os.path.join(base, c["expected"]), encoding="utf-8", errors="ignore") as f:
+            expected = semantic(tables(f.read()), c["kind"])
+        got = semantic(section(by_snap[c["snapshot"]], c["section"]), c["kind"])
+        diffs[c["name"]] = diff(expected, got)
+    return {"diffs": diffs, "timings": timings}
+
+# ====== 基準 ======
+def golden_path(base: str) -> str:
+    return os.path.join(base, GOLDEN_FILE)
+
+def host() -> str:
+    return f"{platform.node()}/{platform.machine()}"
+
+def load(base: str) -> dict:
+    """golden.json（無ければ空）。時間は {host: {スナップショット: {段: ms}}}"""
+    try:
+        with open(golden_path(base), encoding="utf-8") as f:
+            golden = json.load(f)
+    except (OSError, ValueError):
+        return {"cases": [], "accepted": {}, "timings": {}}
+    if "host" in golden:        # 旧形式（端末 1 台分の時間）
+        golden["timings"] = {golden.pop("host"): golden["timings"]}
+    return golden
+
+def save(base: str, golden: dict):
+    path = golden_path(base)
+    kng_runlog.ensure_dir(os.path.dirname(path))
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as w:
+        json.dump(golden, w, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+def _kept(accepted: list, diffs: list) -> list:
+    now = {json.dumps(x, ensure_ascii=False) for x in diffs}
+    return [x for x in accepted if json.dumps(x, ensure_ascii=False) in now]
+
+def build(base: str) -> dict:
+    """ケースを発見し直し、この端末の時間を取り直す。承認済みの差分は今も出るものだけ残す（増やさない）"""
+    old = load(base)
+    cases = discover(base)
+    res = run_cases(base, cases)
+    accepted = {c["name"]: _kept(old["accepted"].get(c["name"], []), res["diffs"][c["name"]]) for c in cases}
+    golden = {"cases": cases, "accepted": {k: v for k, v in accepted.items() if v},
+              "timings": dict(old["timings"], **{host(): res["timings"]})}
+    save(base, golden)
+    return dict(golden, diffs=res["diffs"])
+
+def accept(base: str, name: str, key: str) -> list:
+    """ケース name の差分 key（"名前キー|チームキー" / "チームキー"）を現行の値で承認。戻り値: 承認した差分"""
+    golden = load(base)
+    case = next((c for c in golden["cases"] if c["name"] == name), None)
+    if case is None:
+        raise KeyError(f"ケースがありません: {name}")
+    d = [x for x in run_cases(base, [case], repeat=1)["diffs"][name] if x[0] == key]
+    if not d:
+        raise KeyError(f"差分がありません: {name} {key}")
+    acc = [x for x in golden["accepted"].get(name, []) if x[0] != key]
+    golden["accepted"][name] = sorted(acc + d)
+    save(base, golden)
+    return d[0]
+
+def check(base: str, slowdown=SLOWDOWN, min_ms=SLOWDOWN_MIN_MS) -> dict:
+    golden = load(base)
+    res = run_cases(base, golden["cases"])
+    new, resolved, slow = {}, {}, []
+    for name, d in res["diffs"].items():
+        ok = {json.dumps(x, ensure_ascii=False) for x in golden["accepted"].get(name, [])}
+        now = {json.dumps(x, ensure_ascii=False) for x in d}
+        if now - ok:
+            new[name] = [json.loads(x) for x in sorted(now - ok)]
+        if ok - now:
+            resolved[name] = len(ok - now)
+    base_t = golden["timings"].get(host())
+    same_host = base_t is not None
+    for snap, t in (res["timings"] if same_host else {}).items():
+        ref = base_t.get(snap, {})
+        for st, ms in t.items():
+            r = ref.get(st)
+            if r is not None and ms > r * (1 + slowdown) and ms - r >= min_ms:
+                slow.append([snap, st, r, ms])
+    return {"cases": len(golden["cases"]), "new": new, "resolved": resolved, "slow": slow,
+            "timings": res["timings"], "timing_checked": same_host, "ok": not (new or slow)}
+
+def main(argv):
+    if not argv or argv[0] not in ("build", "check", "accept") or (argv[0] == "accept" and len(argv) < 3):
+        print(__doc__)
+        return 2
+    rest = argv[3:] if argv[0] == "accept" else argv[1:]
+    base = rest[0] if rest else os.path.dirname(os.path.abspath(__file__))
+    if argv[0] == "build":
+        g = build(base)
+        n = sum(len(d) for d in g["accepted"].values())
+        print(f"✅ 基準を保存: {golden_path(base)}（{len(g['cases'])}ケース / 承認済み差分 {n} / "
+              f"時間 {host()} {g['timings'][host()]}）")
+        for name, d in g["diffs"].items():
+            todo = [x for x in d if x not in g["accepted"].get(name, [])]
+            if todo:
+                print(f"  ⚠️ {name}: 未承認の差分 {len(todo)}（確認して accept）")
+        return 0
+    if argv[0] == "accept":
+        try:
+            k, old, now = accept(base, argv[1], argv[2])
+        except KeyError as e:
+            print(f"❌ {e.args[0]}")
+            return 1
+        print(f"✅ 承認: {argv[1]} {k}: 過去 {old} → 現行 {now}")
+        return 0
+    res = check(base)
+    print(f"📄 ケース: {res['cases']} / 時間 {res['timings']}")
+    if not res["timing_checked"]:
+        print(f"  ⚠️ この端末（{host()}）の時間の基準が無い: 時間の判定は省略（build で追加）")
+    for name, d in res["new"].items():
+        print(f"  ❌ {name}: 新しい差分 {len(d)}")
+        for k, old, now in d[:5]:
+            print(f"     {k}: 過去 {old} → 現行 {now}")
+    for name, n in res["resolved"].items():
+        print(f"  ✨ {name}: 承認済み差分のうち {n} 件が解消（build で基準を更新）")
+    for snap, st, ref, ms in res["slow"]:
+        print(f"  🐢 {snap} {st}: {ref}ms → {ms}ms")
+    kng_runlog.record_run(base, SCRIPT, counts={"cases": res["cases"], "new": len(res["new"]),
+                                                "slow": len(res["slow"])},
+                          extra={"golden": {"timings": res["timings"], "slow": res["slow"]}})
+    print("✅ PASS" if res["ok"] else "❌ FAIL")
+    return 0 if res["ok"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+KNG リーグ登録簿と、リーグ単位パイプラインの並行実行
+- leagues.json に リーグID / 名前 / シーズン / 部（ID・表示名・取得元 URL）/
+  試合ページの置き場（source）/ 出力名の接頭辞 を並べる
+  → BASE・出力名・kanto1/kanto2 の URL をスクリプトに直書きしない
+- 各リーグの parse → aggregate → render をワーカープールで同時に実行
+  * 試合ページは <source>/<最新ts>/<部ID>/m*.html（kng_match.parse_pages の解析キャッシュはリーグ別）
+  * チーム別名（team_aliases.json）とファイルの文字コード判定は全リーグで共有（SharedCaches）
+  * 共有スタイルシート（kng_assets）はワーカーを起こす前に1回だけ書き、各リーグには href を渡す
+- 同じ解析結果から部別の順位表（kng_standings: 勝/分/敗・得失点・勝点）も作る
+- 節ごとの得点推移（kng_progress）は状態を _logs に持ち、変化した試合の分だけ更新。
+  選手はランキングと同じ ID で持ち、最終節の累積がランキングと一致するかを確認（counts の progress_mismatch）
+- 選手 ID（kng_players）は取り込み時に振り、集計は ID で結合する（表記ゆれは同じ ID に合算）
+  * 全リーグの parse を並行 → 得点イベントの (名前, チーム) に登録簿の順で ID を採番 →
+    aggregate / render を並行、の3段。採番は1か所なので並行実行の順序に左右されない
+  * シーズン・リーグ別の得点を登録簿の履歴に残す
+- 出力: <接頭辞>_ranking.html（総合 + 部別 + チーム合計 + 順位表）/ <接頭辞>_ranking.json
+        <接頭辞>_progress.html（節ごとの推移・第N節終了時点ランキング）/ <接頭辞>_progress.json
+        leagues_manifest.json（全リーグの出力・件数・時間をまとめた1ファイル）
+- 使い方: python kng_leagues.py [BASE] [--workers N] [--processes]
+  （--processes はプロセスプール。共有キャッシュはプロセスごとになる）
+- 依存: 標準ライブラリのみ
+"""
+import os, sys, json, time, threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime
+import html as pyhtml
+
+import kng_assets, kng_core, kng_match, kng_players, kng_progress, kng_render, kng_runlog, kng_scan, kng_standings
+
+# ====== 設定 ======
+BASE = "/sdcard/Download/sakana-no-osama.github.io"
+REGISTRY = "leagues.json"
+ALIASES = "team_aliases.json"        # {別名: 正式名}（任意）
+MANIFEST = "leagues_manifest.json"
+WORKERS = 4
+SCRIPT = "kng_leagues"
+
+DEFAULT_REGISTRY = {"leagues": [{
+    "id": "kanto_u15w_2025", "name": "関東 U-15女子リーグ", "season": 2025,
+    "source": "_archive/raw", "output_prefix": "kanto_u15w_2025",
+    "divisions": [
+        {"id": "kanto1", "label": "1部", "url": "https://www.jfa.jp/match_47fa/103_kanto/u15_womens_league_2025/kanto1/"},
+        {"id": "kanto2", "label": "2部", "url": "https://www.jfa.jp/match_47fa/103_kanto/u15_womens_league_2025/kanto2/"},
+    ],
+}]}
+
+# ====== 登録簿 ======
+def load_registry(base: str) -> list:
+    try:
+        with open(os.path.join(base, REGISTRY), encoding="utf-8") as f:
+            reg = json.load(f)
+    except FileNotFoundError:
+        reg = DEFAULT_REGISTRY
+    leagues = reg.get("leagues", [])
+    seen = set()
+    for lg in leagues:
+        for k in ("id", "divisions"):
+            if k not in lg:
+                raise ValueError(f"{REGISTRY}: {lg.get('id', '?')} に {k} がありません")
+        if lg["id"] in seen:
+            raise ValueError(f"{REGISTRY}: リーグID が重複: {lg['id']}")
+        seen.add(lg["id"])
+        lg.setdefault("name", lg["id"])
+        lg.setdefault("source", "_archive/raw")
+        lg.setdefault("output_prefix", lg["id"])
+    return leagues
+
+def load_aliases(base: str) -> dict:
+    try:
+        with open(os.path.join(base, ALIASES), encoding="utf-8") as f:
+            raw = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {kng_core.normalize_team(k): v for k, v in raw.items()}
+
+# ====== 共有キャッシュ ======
+class SharedCaches:
+    """
+    全リーグで共有するキャッシュ（スレッド安全）
+    - team(): チーム表記 → 別名解決済みの表示名
+    - read() / decode(): ディレクトリごとに前回成功した文字コードを先に試す
+    """
+    def __init__(self, aliases=None):
+        self.aliases = aliases or {}
+        self._teams = {}
+        self._enc = {}
+        self._lock = threading.Lock()
+        self.stats = {"team_hits": 0, "team_misses": 0, "enc_hits": 0, "enc_misses": 0}
+
+    def _count(self, k):
+        with self._lock:
+            self.stats[k] += 1
+
+    def team(self, name: str) -> str:
+        t = self._teams.get(name)
+        if t is not None:
+            self._count("team_hits")
+            return t
+        t = kng_core.norm_txt(name or "")
+        t = self.aliases.get(kng_core.normalize_team(t), t)
+        with self._lock:
+            self._teams[name] = t
+            self.stats["team_misses"] += 1
+        return t
+
+    def read(self, path: str) -> str:
+        with open(path, "rb") as f:
+            return self.decode(path, f.read())
+
+    def decode(self, path: str, b: bytes) -> str:
+        d = os.path.dirname(path)
+        hint = self._enc.get(d)
+        if hint:
+            try:
+                s = b.decode(hint)
+                self._count("enc_hits")
+                return s
+            except UnicodeDecodeError:
+                pass
+        for enc in kng_core.ENCODINGS:
+            try:
+                s = b.decode(enc)
+            except UnicodeDecodeError:
+                continue
+            with self._lock:
+                self._enc[d] = enc
+                self.stats["enc_misses"] += 1
+            return s
+        return b.decode("utf-8", errors="ignore")
+
+# ====== リーグ単位パイプライン ======
+def latest_snapshot(base: str, source: str):
+    snaps = kng_scan.snapshots(base, source)
+    return snaps[-1] if snaps else None
+
+def _entries(totals: dict, names: dict) -> list:
+    """{ID: 得点} → 描画用の (表示名, チーム, 得点, 並べ替えキー)。names: {ID: (表示名, チーム)}"""
+    ents = [(*names[pid], g, names[pid][0]) for pid, g in totals.items()]
+    ents.sort(key=lambda x: (-x[2], x[3]))
+    return ents
+
+def id_totals(matches, ids: dict) -> dict:
+    """{選手 ID: 得点}（OG は除外）。kng_match.scorer_totals の ID 版。ids: {(名前, チーム): ID}"""
+    tot = {}
+    for m in matches:
+        for side, name, minute, added in m["goals"]:
+            if kng_match.is_own_goal(name):
+                continue
+            pid = ids[(name, kng_match.scorer_team(m, side))]
+            tot[pid] = tot.get(pid, 0) + 1
+    return tot
+
+def _table(title, rows, team_col=True) -> str:
+    head = ("<tr><th class='ranknum'>順位</th><th>選手名</th><th class='team'>チーム</th><th class='goal'>得点</th></tr>"
+            if team_col else
+            "<tr><th class='ranknum'>順位</th><th class='team'>チーム</th><th class='goal'>合計</th></tr>")
+    return (f"<section><h2>{pyhtml.escape(title)}</h2><table><thead>{head}</thead><tbody>\n"
+            + "\n".join(rows) + "\n</tbody></table></section>")
+
+def parse_league(base: str, lg: dict, caches: SharedCaches) -> dict:
+    """1リーグ分の試合ページを解析。戻り値 {"snapshot", "per_div": {部: {相対パス: 試合}}, "stats", "timings"}"""
+    timings = {}
+    snap = latest_snapshot(base, lg["source"])
+
+    with kng_runlog.timer(timings, "parse"):
+        per_div, stats = {}, {"pages": 0, "cache_hits": 0, "parsed": 0, "errors": 0}
+        for div in lg["divisions"]:
+            paths = kng_scan.match_pages(base, snap, [div["id"]], lg["source"]) if snap else []
+            matches, st = kng_match.parse_pages(
+                base, paths,
+                cache_path=os.path.join(kng_runlog.log_dir_for(base), f"match_cache_{lg['id']}_{div['id']}.json"),
+                decode=caches.decode)
+            for k in stats:
+                stats[k] += st[k]
+            for m in matches.values():
+                m["teams"] = [caches.team(t) for t in m["teams"]]
+            per_div[div["id"]] = matches
+    return {"snapshot": snap, "per_div": per_div, "stats": stats, "timings": timings}
+
+def register_scorers(reg, parsed: dict) -> dict:
+    """得点イベントの (名前, チーム) に選手 ID を振る（部・試合ページの順）。戻り値 {(名前, チーム): ID}"""
+    ids = {}
+    for ms in parsed["per_div"].values():
+        for m in ms.values():
+            for side, name, minute, added in m["goals"]:
+                if kng_match.is_own_goal(name):
+                    continue
+                k = (name, kng_match.scorer_team(m, side))
+                if k not in ids:
+                    ids[k] = reg.id_for(*k)
+    return ids
+
+def finish_league(base: str, lg: dict, parsed: dict, ids: dict, names: dict, href=None) -> dict:
+    """
+    aggregate（ID で結合）→ render。戻り値はマニフェストの1要素
+    ids: {(名前, チーム): ID} / names: {ID: (表示名, チーム)}（登録簿から）
+    href: 共有スタイルシート（run_all がプールの前に1回だけ書く）。None ならここで書く（単独実行用）
+    """
+    snap, per_div, stats = parsed["snapshot"], parsed["per_div"], parsed["stats"]
+    timings = dict(parsed["timings"])
+
+    with kng_runlog.timer(timings, "aggregate"):
+        div_totals = {d: id_totals(ms.values(), ids) for d, ms in per_div.items()}
+        overall = {}
+        for tot in div_totals.values():
+            for k, g in tot.items():
+                overall[k] = overall.get(k, 0) + g
+        standings = {}
+        for d, ms in per_div.items():
+            st = standings[d] = kng_standings.Standings()
+            st.ingest_all(ms)
+        prog = kng_progress.load(base, lg["id"])
+        prog_matches = prog.ingest_all({kng_progress.match_key(f"{lg['id']}/{d}", rel, m): m
+                                        for d, ms in per_div.items() for rel, m in ms.items()}, ids, names)
+        prog_changed = prog.changed
+        # 最終節の累積はランキングと同じはず（節の取れない試合があればずれる）
+        ranked, cum = {str(pid): g for pid, g in overall.items()}, prog.totals()
+        prog_mismatch = sorted(k for k in ranked.keys() | cum.keys() if ranked.get(k) != cum.get(k))
+        if prog_matches:
+            kng_progress.save(base, lg["id"], prog)
+
+    with kng_runlog.timer(timings, "render"):
+        if href is None:
+            href = kng_assets.write_stylesheet(base)
+        all_main, _, all_totals, all_js = kng_render.render_pass(_entries(overall, names), kng_render.standard_sinks())
+        sections = [_table("総合", all_main.rows)]
+        for div in lg["divisions"]:
+            m = kng_render.render_pass(_entries(div_totals[div["id"]], names), (kng_render.MainSink(),))[0]
+            sections.append(_table(div.get("label", div["id"]), m.rows))
+        sections.append(_table("チーム合計", all_totals.rows(), team_col=False))
+        for div in lg["divisions"]:
+            sections.append(kng_standings.render_section(
+                f"順位表（{div.get('label', div['id'])}）", standings[div["id"]]))
+        title = f"{lg['name']} {lg.get('season', '')} 得点ランキング".strip()
+        page = "\n".join([
+            "<!doctype html><html><head><meta charset='utf-8'>",
+            f"<title>{pyhtml.escape(title)}</title>", kng_assets.link_tag(href),
+            "</head><body>", f"<h1>{pyhtml.escape(title)}</h1>",
+            *sections,
+            f"<p><small>試合ページ: {pyhtml.escape(snap or 'なし')} / OGは除外</small></p>",
+            "</body></html>",
+        ])
+        out_html = os.path.join(base, f"{lg['output_prefix']}_ranking.html")
+        out_json = os.path.join(base, f"{lg['output_prefix']}_ranking.json")
+        kng_assets.write_output(out_html, page)
+        with open(out_json, "w", encoding="utf-8") as w:
+            json.dump({"league": lg["id"], "season": lg.get("season"), "snapshot": snap,
+                       "players": all_js.items,
+                       "standings": {d: st.to_json() for d, st in standings.items()}},
+                      w, ensure_ascii=False, separators=(",", ":"))
+
+        ptitle = f"{lg['name']} {lg.get('season', '')} 節ごとの得点推移".strip()
+        out_phtml = os.path.join(base, f"{lg['output_prefix']}_progress.html")
+        out_pjson = os.path.join(base, f"{lg['output_prefix']}_progress.json")
+        kng_assets.write_output(out_phtml, "\n".join([
+            "<!doctype html><html><head><meta charset='utf-8'>",
+            f"<title>{pyhtml.escape(ptitle)}</title>", kng_assets.link_tag(href),
+            "</head><body>", f"<h1>{pyhtml.escape(ptitle)}</h1>",
+            *kng_progress.render_sections(prog),
+            "</body></html>",
+        ]))
+        days = prog.matchdays()
+        with open(out_pjson, "w", encoding="utf-8") as w:
+            json.dump({"league": lg["id"], "matchdays": days,
+                       "players": {k: [s.days, s.cum] for k, s in prog.players.items() if s.days},
+                       "names": {k: prog.names[k] for k, s in prog.players.items() if s.days},
+                       "teams": {k: [s.days, s.cum] for k, s in prog.teams.items() if s.days}},
+                      w, ensure_ascii=False, separators=(",", ":"))
+
+    return {
+        "id": lg["id"], "name": lg["name"], "season": lg.get("season"), "snapshot": snap,
+        "divisions": [{"id": d["id"], "label": d.get("label"), "url": d.get("url"),
+                       "matches": len(per_div[d["id"]]),
+                       "results": len(standings[d["id"]].results)} for d in lg["divisions"]],
+        "outputs": {os.path.basename(p): kng_runlog.digest_file(p)
+                    for p in (out_html, out_json, out_phtml, out_pjson)},
+        "counts": {"players": len(all_js.items), **stats,
+                   "progress_matches": prog_matches, "progress_changed": prog_changed,
+                   "progress_mismatch": len(prog_mismatch)},
+        "timings": timings,
+        "_by_id": overall,
+    }
+
+def run_league(base: str, lg: dict, caches: SharedCaches, href=None, reg=None) -> dict:
+    """
+    1リーグだけの parse → ID 採番 → aggregate → render（kng_golden など単独実行用）
+    reg を渡さなければメモリ上だけの登録簿（player_registry.json には書かない）
+    """
+    reg = reg or kng_players.PlayerRegistry(caches.aliases)
+    parsed = parse_league(base, lg, caches)
+    t0 = time.perf_counter()
+    ids = register_scorers(reg, parsed)
+    parsed["timings"]["ids"] = round(time.perf_counter() - t0, 4)
+    return finish_league(base, lg, parsed, ids, {pid: reg.display(pid) for pid in set(ids.values())}, href)
+
+def _parse_league_proc(base, lg, aliases):
+    # プロセスプール用（キャッシュはプロセス内で共有）
+    return parse_league(base, lg, SharedCaches(aliases))
+
+# ====== 全リーグ ======
+def run_all(base=BASE, workers=WORKERS, processes=False) -> dict:
+    leagues = load_registry(base)
+    aliases = load_aliases(base)
+    caches = SharedCaches(aliases)
+    # スタイルシートは全リーグ共通なので、ワーカーを起こす前に1回だけ書く（書き込み・掃除を競合させない）
+    href = kng_assets.write_stylesheet(base)
+    reg = kng_players.load(base, aliases)
+    for dup in reg.duplicates:
+        print(f"⚠️ {kng_players.REGISTRY_FILE}: 同じキーの選手 ID {dup['ids']}（{dup['key']}）→ {dup['ids'][0]} を使用")
+    parsed, results, errors = {}, {}, {}
+    t0 = datetime.now()
+
+    def collect(futs, out):
+        for fut, lid in futs.items():
+            try:
+                out[lid] = fut.result()
+            except Exception as e:
+                errors[lid] = f"{type(e).__name__}: {e}"
+
+    pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool(max_workers=max(1, min(workers, len(leagues) or 1))) as ex:
+        # 1) parse（並行）
+        if processes:
+            collect({ex.submit(_parse_league_proc, base, lg, aliases): lg["id"] for lg in leagues}, parsed)
+        else:
+            collect({ex.submit(parse_league, base, lg, caches): lg["id"] for lg in leagues}, parsed)
+        # 2) 選手 ID: 登録簿の順に採番（スレッド/プロセスの完了順に依存しない）
+        ids = {}
+        for lg in leagues:
+            if lg["id"] in parsed:
+                t1 = time.perf_counter()
+                ids[lg["id"]] = register_scorers(reg, parsed[lg["id"]])
+                parsed[lg["id"]]["timings"]["ids"] = round(time.perf_counter() - t1, 4)
+        # 3) aggregate / render（並行。ID → 表示名は採番がすべて済んでから引く）
+        futs = {}
+        for lg in leagues:
+            if lg["id"] not in parsed:
+                continue
+            names = {pid: reg.display(pid) for pid in set(ids[lg["id"]].values())}
+            futs[ex.submit(finish_league, base, lg, parsed.pop(lg["id"]), ids[lg["id"]], names, href)] = lg["id"]
+        collect(futs, results)
+
+    season_ids = {}
+    for lg in leagues:
+        r = results.get(lg["id"])
+        if r is None:
+            continue
+        by_id = r.pop("_by_id")
+        if r["counts"]["progress_mismatch"]:
+            print(f"⚠️ {lg['id']}: 得点推移の最終節の累積がランキングと {r['counts']['progress_mismatch']} 人ずれています")
+        for pid, g in by_id.items():
+            reg.record(pid, lg.get("season"), lg["id"], g)
+        r["counts"]["player_ids"] = len(by_id)
+        season_ids.setdefault(str(lg.get("season")), set()).update(by_id)
+    kng_players.save(base, reg)
+    wall = round((datetime.now() - t0).total_seconds(), 3)
+
+    manifest = {
+        "generated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "wall_sec": wall,
+        "leagues": [results[lg["id"]] for lg in leagues if lg["id"] in results],
+        "errors": errors,
+        "shared_cache": caches.stats if not processes else None,
+        "players": {"registered": len(reg.players), "new": reg.added, "duplicates": reg.duplicates,
+                    "by_season": {s: len(ids) for s, ids in sorted(season_ids.items())}},
+    }
+    path = os.path.join(base, MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as w:
+        json.dump(manifest, w, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+    kng_runlog.record_run(
+        base, SCRIPT,
+        timings={"wall": wall, **{lid: sum(r["timings"].values()) for lid, r in results.items()}},
+        counts={"leagues": len(leagues), "errors": len(errors),
+                "players": sum(r["counts"]["players"] for r in results.values())},
+        outputs=[path],
+    )
+    return manifest
+
+def main(argv):
+    base = argv[0] if argv and not argv[0].startswith("--") else BASE
+    workers = int(argv[argv.index("--workers") + 1]) if "--workers" in argv else WORKERS
+    m = run_all(base, workers, processes="--processes" in argv)
+    for lg in m["leagues"]:
+        c = lg["counts"]
+        print(f"✅ {lg['id']}: 選手 {c['players']} / 試合 {c['pages']}（キャッシュ {c['cache_hits']}）"
+              f" / {sum(lg['timings'].values()):.3f}s")
+    for lid, e in m["errors"].items():
+        print(f"❌ {lid}: {e}")
+    print(f"⏱️ 全体 {m['wall_sec']}s / 🗂️ {os.path.join(base, MANIFEST)}")
+    return 1 if m["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+複数リーグ・1シーズン分の負荷試験（1コア固定 / 実時間・ピークRSS の予算付き）
+- JFA 試合ページと同じ構造（text-schedule / score-board / scorerLeft・Right、
+  前後にページ装飾）の合成ページを リーグ数 × ページ数 だけ生成（計測外）し、
+  fetch 代わり（_archive/raw/<ts>/ への複製と leagues.json）→ 本番の kng_leagues.run_all
+  （parse → 選手 ID → aggregate → render）→ 出力（ranking.json / ranking.html の総合）を正解値と照合
+- os.sched_setaffinity で1コアに固定（Termux の実機に近い条件。非対応 OS では固定なし）。
+  終わったら元の affinity に戻す（kng bench は同じプロセスで続ける）
+- fetch〜verify の実時間が「この端末・この構成の基準 × (1 + MARGIN) + SLACK_SEC」を、
+  ピーク RSS（resource.getrusage）が BUDGET_MB を超えたら終了コード 1 → 変更で遅く/重くなったら落ちる
+  （基準は record で _fixtures/loadtest_baseline.json に端末ごとに記録。無い端末は BUDGET_SEC）
+- 使い方:
+    python kng_loadtest.py [record] [--leagues 10] [--pages 200] [--pad-kb 100]
+                           [--budget-sec S] [--budget-mb 128] [--cpu 0] [--out DIR] [--keep]
+- 依存: 標準ライブラリのみ
+"""
+import os, sys, json, time, random, shutil, statistics, tempfile
+
+import kng_runlog
+
+# ====== 設定 ======
+LEAGUES = 10
+PAGES_PER_LEAGUE = 200
+DIVISIONS = 2
+TEAMS_PER_DIVISION = 10
+PAD_KB = 100                 # 実ページは 100〜120KB 前後（大半は装飾）
+BUDGET_SEC = 30.0           # 基準が無い端末での上限（実機 Termux の余裕込み）
+BUDGET_MB = 128
+BASELINE_FILE = os.path.join("_fixtures", "loadtest_baseline.json")   # {端末: {構成: {"wall_sec"}}}
+MARGIN = 0.5                # 実時間の予算 = 基準 × (1 + MARGIN) + SLACK_SEC
+SLACK_SEC = 0.5
+RECORD_RUNS = 3             # record は中央値を基準にする
+HERE = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT = "20250101_000000"
+SEED = 15
+
+SURNAMES = "佐藤 鈴木 高橋 田中 伊藤 渡辺 山本 中村 小林 加藤 吉田 山田 佐々木 松田 新田 徳生 牧野 武井 柴田".split()
+GIVEN = "美優 千紗 千穂 花音 菜々 ふうこ 美雨 結月 陽菜 凛 葵 結衣 芽依 さくら 心春 美咲".split()
+
+# ====== 合成ページ ======
+_CHROME = (
+    '<li><a href="/match/u15_womens_league_2025/{r}/">{r}</a>'
+    '<script src="https://d.line-scdn.net/r/web/social-plugin/js/loader.min.js" async="async"></script></li>\n'
+)
+
+def _chrome(nbytes: int, rnd) -> str:
+    parts, size = [], 0
+    while size < nbytes:
+        s = _CHROME.format(r=rnd.randrange(10 ** 6))
+        parts.append(s); size += len(s.encode("utf-8"))
+    return "".join(parts)
+
+def _scorer_text(name, minute, rnd) -> str:
+    """実ページの表記ゆれ（全角数字・追加時間・半角＋）を混ぜる"""
+    k = rnd.random()
+    if minute >= 90 or (minute == 45 and k < 0.5):
+        return f"{name}　{minute}分＋{rnd.randint(1, 4)}分"
+    if k < 0.15:
+        return f"{name}　{str(minute).translate(str.maketrans('0123456789', '０１２３４５６７８９'))}分"
+    return f"{name}　{minute}分"
+
+def make_page(no, section, date, home, away, goals, rnd, pad_bytes) -> str:
+    """goals: [(side, 名前, 分)]"""
+    h = sum(1 for g in goals if g[0] == 0)
+    a = len(goals) - h
+    h1 = sum(1 for g in goals if g[0] == 0 and g[2] <= 45)
+    a1 = sum(1 for g in goals if g[0] == 1 and g[2] <= 45)
+    sides = ["", ""]
+    for side, name, minute in sorted(goals, key=lambda g: g[2]):
+        sides[side] += _scorer_text(name, minute, rnd) + "<br />"
+    y, m, d = date
+    region = (
+        '<div id="inner-header-score" class="clearfix">\n'
+        f'<div class="text-schedule">［{no}］第{section}節　{y}年{m:02d}月{d:02d}日　14:00 KickOff</div>\n'
+        '<div class="full-time">＜試合終了＞</div></div>\n'
+        '<div id="score-board" class="clearfix"><div id="score-board-header">\n'
+        f'<div class="team_name">{home}</div>\n<div class="total-score">{h}</div>\n'
+        '<div class="score-detail"><ul class="inner-score">\n'
+        f'<li>\n<span>{h1}</span>\n<span>前半</span>\n<span>{a1}</span>\n</li>\n'
+        f'<li>\n<span>{h - h1}</span>\n<span>後半</span>\n<span>{a - a1}</span>\n</li>\n'
+        '</ul></div>\n'
+        f'<div class="total-score">{a}</div>\n<div class="team_name">{away}</div>\n</div>\n'
+        '<div id="game-content-wrap">\n'
+        f'<div class="scorerLeft">{sides[0]}</div>\n<div class="title-scorer">得点者</div>\n'
+        f'<div class="scorerRight">{sides[1]}</div>\n</div></div>\n'
+    )
+    head = _chrome(pad_bytes * 2 // 3, rnd)
+    tail = _chrome(pad_bytes // 3, rnd)
+    return (f"<!DOCTYPE html><html lang='ja'><head><meta charset='utf-8'><title>試合詳細</title></head>"
+            f"<body>{head}{region}{tail}</body></html>")
+
+def generate(root, leagues=LEAGUES, pages=PAGES_PER_LEAGUE, pad_kb=PAD_KB, seed=SEED) -> dict:
+    """
+    root/<リーグ>_d<部>/m<n>.html を生成。
+    戻り値: 正解値 {"pages", "goals"（OG 除く）, "own_goals", "leagues": {リーグ: [部ディレクトリ]}}
+    """
+    rnd = random.Random(seed)
+    truth = {"pages": 0, "goals": 0, "own_goals": 0, "leagues": {}}
+    per_div = max(1, pages // DIVISIONS)
+    for li in range(1, leagues + 1):
+        league = f"L{li:02d}"
+        truth["leagues"][league] = []
+        for div in range(1, DIVISIONS + 1):
+            ddir = f"{league}_d{div}"
+            d = os.path.join(root, ddir)
+            os.makedirs(d, exist_ok=True)
+            truth["leagues"][league].append(ddir)
+            teams = [f"{league}FC{div}{t:02d}レディース" for t in range(TEAMS_PER_DIVISION)]
+            squads = {t: [f"{rnd.choice(SURNAMES)}{rnd.choice(GIVEN)}" for _ in range(18)] for t in teams}
+            for no in range(1, per_div + 1):
+                home, away = rnd.sample(teams, 2)
+                goals = []
+                for side, team in ((0, home), (1, away)):
+                    for _ in range(min(6, int(rnd.expovariate(0.8)))):
+                        if rnd.random() < 0.04:
+                            goals.append((side, "オウンゴール", rnd.randint(1, 90)))
+                            truth["own_goals"] += 1
+                        else:
+                            goals.append((side, rnd.choice(squads[team]), rnd.randint(1, 90)))
+                            truth["goals"] += 1
+                date = (2025, 4 + (no - 1) // 20, 1 + (no - 1) % 28)
+                html = make_page(no, 1 + (no - 1) // (TEAMS_PER_DIVISION // 2), date,
+                                 home, away, goals, rnd, pad_kb * 1024)
+                with open(os.path.join(d, f"m{no}.html"), "w", encoding="utf-8") as w:
+                    w.write(html)
+                truth["pages"] += 1
+    return truth
+
+# ====== パイプライン ======
+def registry(truth) -> dict:
+    """生成したリーグの leagues.json（部 = 生成ディレクトリ。試合ページは _archive/raw/<ts>/<部>/）"""
+    return {"leagues": [{"id": lg, "name": lg, "season": 2025, "source": "_archive/raw", "output_prefix": lg,
+                         "divisions": [{"id": dd, "label": dd} for dd in ddirs]}
+                        for lg, ddirs in truth["leagues"].items()]}
+
+def run_pipeline(root, src, truth) -> dict:
+    """
+    fetch 代わり（_archive/raw/<ts>/ へ複製）→ 本番の kng_leagues.run_all
+    （parse → 選手 ID → aggregate → render・ページ組み立て・マニフェスト）→ 出力を正解値と照合
+    """
+    import kng_golden, kng_leagues
+    timings, problems = {}, []
+    with kng_runlog.timer(timings, "fetch_standin"):
+        shutil.copytree(src, os.path.join(root, "_archive", "raw", SNAPSHOT))
+        with open(os.path.join(root, kng_leagues.REGISTRY), "w", encoding="utf-8") as w:
+            json.dump(registry(truth), w, ensure_ascii=False)
+
+    with kng_runlog.timer(timings, "leagues"):
+        manifest = kng_leagues.run_all(root)
+    for lg in manifest["leagues"]:          # 段ごとの時間はリーグの合計（プール内で重なる）
+        for st, sec in lg["timings"].items():
+            timings[st] = round(timings.get(st, 0) + sec, 4)
+
+    with kng_runlog.timer(timings, "verify"):
+        for lid, e in manifest["errors"].items():
+            problems.append(f"{lid}: {e}")
+        pages = sum(lg["counts"]["pages"] for lg in manifest["leagues"])
+        if pages != truth["pages"]:
+            problems.append(f"ページ数 {pages} != {truth['pages']}")
+        goals = 0
+        for lg in manifest["leagues"]:
+            if lg["counts"]["progress_mismatch"]:
+                problems.append(f"{lg['id']}: 得点推移とランキングのずれ {lg['counts']['progress_mismatch']}")
+            prefix = os.path.join(root, lg["id"])
+            with open(prefix + "_ranking.json", encoding="utf-8") as f:
+                items = json.load(f)["players"]
+            goals += sum(x["goals"] for x in items)
+            with open(prefix + "_ranking.html", encoding="utf-8") as f:
+                rows = sum(len(r) for _, r in kng_golden.section(kng_golden.tables(f.read()), "総合"))
+            if rows != len(items):
+                problems.append(f"{lg['id']}: 総合の行数 {rows} != {len(items)}")
+        if goals != truth["goals"]:
+            problems.append(f"得点合計 {goals} != {truth['goals']}")
+    return {"timings": timings, "problems": problems,
+            "players": sum(lg["counts"]["players"] for lg in manifest["leagues"])}
+
+# ====== 計測 ======
+def pin_cpu(cpu: int):
+    """cpu に固定。戻り値: (固定後の CPU 一覧, 元の affinity)。非対応なら (None, None)"""
+    if not hasattr(os, "sched_setaffinity"):
+        return None, None
+    try:
+        orig = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, {cpu})
+    except OSError:
+        return None, None
+    return sorted(os.sched_getaffinity(0)), orig
+
+def unpin_cpu(orig):
+    if orig:
+        try:
+            os.sched_setaffinity(0, orig)
+        except OSError:
+            pass
+
+# ====== 基準 ======
+def config_key(leagues, pages, pad_kb) -> str:
+    return f"{leagues}x{pages}x{pad_kb}"
+
+def load_baseline(base: str) -> dict:
+    try:
+        with open(os.path.join(base, BASELINE_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def record_baseline(base: str, res: dict, wall_sec: float):
+    """この端末・この構成の実時間（RECORD_RUNS 回の中央値）を基準として保存"""
+    import kng_golden
+    data = load_baseline(base)
+    key = config_key(res["leagues"], res["pages_per_league"], res["pad_kb"])
+    data.setdefault(kng_golden.host(), {})[key] = {"wall_sec": wall_sec, "runs": RECORD_RUNS}
+    path = os.path.join(base, BASELINE_FILE)
+    kng_runlog.ensure_dir(os.path.dirname(path))
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as w:
+        json.dump(data, w, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def time_budget(base: str, leagues, pages, pad_kb):
+    """(予算の秒, 基準の秒 or None)。基準 × (1 + MARGIN) + SLACK_SEC。基準が無ければ BUDGET_SEC"""
+    import kng_golden
+    ref = load_baseline(base).get(kng_golden.host(), {}).get(config_key(leagues, pages, pad_kb))
+    if not ref:
+        return BUDGET_SEC, None
+    return round(ref["wall_sec"] * (1 + MARGIN) + SLACK_SEC, 2), ref["wall_sec"]
+
+def peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux/Android は KB、macOS は byte
+    return round(r / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def run(leagues=LEAGUES, pages=PAGES_PER_LEAGUE, pad_kb=PAD_KB, budget_sec=None,
+        budget_mb=BUDGET_MB, cpu=0, out=None, keep=False, base=HERE) -> dict:
+    """budget_sec を省くと base の基準（record で記録）から決める"""
+    baseline = None
+    if budget_sec is None:
+        budget_sec, baseline = time_budget(base, leagues, pages, pad_kb)
+    pinned, orig = pin_cpu(cpu)
+    root = out or tempfile.mkdtemp(prefix="kng_load_")
+    try:
+        t0 = time.perf_counter()
+        src = os.path.join(root, "_gen")
+        truth = generate(src, leagues, pages, pad_kb)
+        gen_sec = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        res = run_pipeline(root, src, truth)
+        wall = time.perf_counter() - t0
+    finally:
+        unpin_cpu(orig)         # kng bench は同じプロセスで続きを走らせる
+        if not keep and not out:
+            shutil.rmtree(root, ignore_errors=True)
+    timings = res["timings"]
+    rss = peak_rss_mb()
+    over = []
+    if wall > budget_sec:
+        over.append(f"実時間 {wall:.2f}s > {budget_sec}s")
+    if budget_mb and rss > budget_mb:
+        over.append(f"ピークRSS {rss}MB > {budget_mb}MB")
+    return {
+        "leagues": leagues, "pages_per_league": pages, "pages": truth["pages"], "goals": truth["goals"],
+        "players": res["players"], "pad_kb": pad_kb, "pinned_cpus": pinned,
+        "generate_sec": round(gen_sec, 2), "wall_sec": round(wall, 2), "peak_rss_mb": rss, "timings": timings,
+        "budget": {"sec": budget_sec, "mb": budget_mb, "baseline_sec": baseline},
+        "problems": res["problems"], "over_budget": over,
+        "ok": not (res["problems"] or over),
+    }
+
+def _opt(argv, name, cast, default):
+    return cast(argv[argv.index(name) + 1]) if name in argv else default
+
+def main(argv):
+    recording = bool(argv) and argv[0] == "record"
+    walls = []
+    for _ in range(RECORD_RUNS if recording else 1):
+        res = run(
+            leagues=_opt(argv, "--leagues", int, LEAGUES),
+            pages=_opt(argv, "--pages", int, PAGES_PER_LEAGUE),
+            pad_kb=_opt(argv, "--pad-kb", int, PAD_KB),
+            budget_sec=_opt(argv, "--budget-sec", float, None),
+            budget_mb=_opt(argv, "--budget-mb", float, BUDGET_MB),
+            cpu=_opt(argv, "--cpu", int, 0),
+            out=_opt(argv, "--out", str, None),
+            keep="--keep" in argv,
+        )
+        walls.append(res["wall_sec"])
+    print(f"📄 {res['leagues']}リーグ × {res['pages'] // max(1, res['leagues'])}ページ = {res['pages']}ページ"
+          f" / 得点 {res['goals']} / 選手 {res['players']}")
+    print(f"🧷 CPU固定: {res['pinned_cpus'] if res['pinned_cpus'] is not None else 'なし（非対応）'}")
+    print(f"🏭 ページ生成 {res['generate_sec']}s（計測外）")
+    b = res["budget"]
+    ref = f"基準 {b['baseline_sec']}s から" if b["baseline_sec"] else "基準なし: record で記録"
+    print(f"⏱️ 実時間 {res['wall_sec']}s（予算 {b['sec']}s、{ref}）/ 段別 {res['timings']}")
+    print(f"🧠 ピークRSS {res['peak_rss_mb']}MB（予算 {res['budget']['mb']}MB）")
+    for p in res["problems"] + res["over_budget"]:
+        print("  ❌", p)
+    if recording:
+        if res["problems"]:
+            print("❌ 検証に失敗したので基準は記録しません")
+            return 1
+        wall = statistics.median(walls)
+        record_baseline(HERE, res, wall)
+        print(f"✅ 基準を記録: {os.path.join(HERE, BASELINE_FILE)}（{walls} の中央値 {wall}s）")
+        return 0
+    print("✅ PASS" if res["ok"] else "❌ FAIL")
+    return 0 if res["ok"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+JFA 試合ページ（_archive/raw/<ts>/<div>/m*.html）の解析
+- ページ全体に正規表現をかけず、str.find で score-board 付近だけ切り出してから解析
+  （123KB 級のページでも走査は数KB、バックトラックの余地を作らない。後ろの SNS・サイトマップは含めない）
+- 取り出すもの:
+    試合番号 / 節 / 日付 / 状態（試合終了・試合前）
+    両チーム名 / total-score / inner-score（前半・後半）
+    得点者（scorerLeft / scorerRight → 名前・分・追加時間）
+- parse_pages: (サイズ, mtime, PARSER_VERSION) が前回と同じページは _logs/match_cache.json の解析結果を再利用。
+  読み直すページは kng_prefetch で先読み（FUSE の読み待ちと解析を重ねる）
+- 依存: 標準ライブラリのみ
+"""
+import os, re, json, unicodedata
+
+import kng_core, kng_runlog
+
+# ====== 設定 ======
+REGION_MAX = 16 * 1024     # score-board から先に見る最大文字数
+# score-board の後に続く本文・SNS ボタン・サイトマップ（取得ごとに変わりうる外側）の始まり
+REGION_END = ('<div class="section-block"', 'id="fb-root"')
+CACHE_NAME = "match_cache.json"
+PARSER_VERSION = 2         # parse_match の結果が変わる修正で上げる（古い解析キャッシュを使わない）
+
+_RE_SCHEDULE = re.compile(r'<div class="text-schedule">([^<]{0,200})</div>')
+_RE_SCHEDULE_PARTS = re.compile(r"\[(\d{1,4})\]\s*第(\d{1,3})節\s*(\d{4})年(\d{1,2})月(\d{1,2})日")
+_RE_FULLTIME = re.compile(r'<div class="full-time">([^<]{0,40})</div>')
+_RE_TEAM = re.compile(r'<div class="team_name">([^<]{0,120})</div>')
+_RE_TOTAL = re.compile(r'<div class="total-score">\s*(\d{0,3})\s*</div>')
+_RE_INNER_LI = re.compile(r"<li>\s*<span>(\d{0,3})</span>\s*<span>([^<]{0,10})</span>\s*<span>(\d{0,3})</span>\s*</li>")
+_RE_SCORER = re.compile(r'<div class="scorer(Left|Right)">([^<]{0,400}(?:<br\s*/?>[^<]{0,400}){0,40})</div>')
+_RE_BR = re.compile(r"<br\s*/?>")
+# 「中村美優 33分」「OG 40分+1分」「山田 80+2分」「徳生 花音 23分、35分」（NFKC 後）
+_MINUTE = r"(\d{1,3})\s*分?\s*(?:\+\s*(\d{1,2})\s*分?)?"
+_RE_GOAL = re.compile(rf"^(.{{1,40}}?)\s*({_MINUTE}(?:\s*[、,]\s*{_MINUTE}){{0,9}})\s*[、,]?\s*$")
+_RE_MINUTE = re.compile(_MINUTE)
+
+OG_NAMES = {"OG", "オウンゴール"}
+
+# ====== 解析 ======
+def score_region(html: str) -> str:
+    """
+    text-schedule 〜 score-board 付近だけを切り出す（見つからなければ空）。
+    REGION_END があればそこまで（解析に使うのはこの範囲だけなので、kng_snapshots はこれをハッシュする）
+    """
+    i = html.find('id="inner-header-score"')
+    if i < 0:
+        i = html.find('id="score-board"')
+        if i < 0:
+            return ""
+    region = html[i:i + REGION_MAX]
+    for end in REGION_END:
+        j = region.find(end)
+        if j >= 0:
+            region = region[:j]
+    return region
+
+def parse_scorer_line(s: str):
+    """
+    1人分の表記 → [(名前, 分, 追加時間), ...]（1行に複数得点あり）/ 解析不能なら []
+    「花村 莉子（PK） 85分」の (PK) などの注記は kng_core.RE_NOTE_PAREN で外す（norm_txt と同じ）
+    """
+    t = kng_core.RE_NOTE_PAREN.sub("", unicodedata.normalize("NFKC", s)).strip()
+    if not t:
+        return []
+    m = _RE_GOAL.match(t)
+    if not m:
+        return []
+    name = re.sub(r"\s+", " ", m.group(1)).strip()
+    if not name or name.isdigit():
+        return []
+    return [(name, int(a), int(b or 0)) for a, b in _RE_MINUTE.findall(m.group(2))]
+
+def parse_match(html: str) -> dict:
+    """
+    戻り値:
+      {"no", "section", "date", "status", "teams": [home, away],
+       "score": [h, a] or None, "halves": [[h, label, a], ...],
+       "goals": [(side, 名前, 分, 追加), ...]}   side: 0=home 1=away
+    """
+    region = score_region(html)
+    out = {"no": None, "section": None, "date": None, "status": "",
+           "teams": [], "score": None, "halves": [], "goals": []}
+    if not region:
+        return out
+
+    m = _RE_SCHEDULE.search(region)
+    if m:
+        sched = unicodedata.normalize("NFKC", m.group(1))
+        p = _RE_SCHEDULE_PARTS.search(sched)
+        if p:
+            out["no"] = int(p.group(1))
+            out["section"] = int(p.group(2))
+            out["date"] = f"{p.group(3)}-{int(p.group(4)):02d}-{int(p.group(5)):02d}"
+    m = _RE_FULLTIME.search(region)
+    if m:
+        out["status"] = m.group(1).strip("＜＞<> ")
+
+    out["teams"] = [t.strip() for t in _RE_TEAM.findall(region)[:2]]
+    totals = [x for x in _RE_TOTAL.findall(region)[:2]]
+    if len(totals) == 2 and all(totals):
+        out["score"] = [int(totals[0]), int(totals[1])]
+    out["halves"] = [[int(a or 0), lab.strip(), int(b or 0)] for a, lab, b in _RE_INNER_LI.findall(region)]
+
+    for side, body in _RE_SCORER.findall(region):
+        s = 0 if side == "Left" else 1
+        for piece in _RE_BR.split(body):
+            for name, minute, added in parse_scorer_line(piece):
+                out["goals"].append((s, name, minute, added))
+    return out
+
+def is_own_goal(name: str) -> bool:
+    return unicodedata.normalize("NFKC", name).strip().upper() in OG_NAMES
+
+def scorer_team(match: dict, side: int) -> str:
+    """得点者 side の所属チーム（OG でも表記側のチームを返す）"""
+    teams = match.get("teams") or []
+    return teams[side] if side < len(teams) else ""
+
+# ====== 解析キャッシュ ======
+def _jsonable(m: dict) -> dict:
+    # キャッシュから読んだ結果と型を揃える（tuple → list）
+    m["goals"] = [list(g) for g in m["goals"]]
+    return m
+
+def parse_pages(base: str, paths, cache_path=None, decode=None, workers=None):
+    """
+    paths の試合ページを解析。戻り値: ({base からの相対パス: parse_match 結果}, 統計)
+    cache_path（既定 _logs/match_cache.json）に (サイズ, mtime_ns, PARSER_VERSION) と結果を保存し、
+    変化の無いページは読み込みも解析もしない。解析が要るページだけ kng_prefetch で先読みしながら読む
+    decode: (path, bytes) -> str（既定 kng_core.decode_bytes）/ workers: 先読みスレッド数（0 で逐次）
+    """
+    import kng_prefetch
+    cache_path = cache_path or os.path.join(kng_runlog.log_dir_for(base), CACHE_NAME)
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    out, new_cache = {}, {}
+    stats = {"pages": 0, "cache_hits": 0, "parsed": 0, "errors": 0}
+    todo = []
+    for p in paths:
+        rel = os.path.relpath(p, base)
+        stats["pages"] += 1
+        try:
+            st = os.stat(p)
+        except OSError:
+            stats["errors"] += 1
+            continue
+        sig = [st.st_size, st.st_mtime_ns, PARSER_VERSION]
+        ent = cache.get(rel)
+        if ent and ent["sig"] == sig:
+            stats["cache_hits"] += 1
+            out[rel] = ent["parsed"]
+            new_cache[rel] = ent
+        else:
+            todo.append((p, rel, sig))
+    if todo:
+        with kng_prefetch.Prefetcher([p for p, _, _ in todo], decode=decode,
+                                     workers=kng_prefetch.WORKERS if workers is None else workers) as pf:
+            for p, rel, sig in todo:
+                try:
+                    m = _jsonable(parse_match(pf.read_text(p)))
+                except OSError:
+                    stats["errors"] += 1
+                    continue
+                stats["parsed"] += 1
+                out[rel] = m
+                new_cache[rel] = {"sig": sig, "parsed": m}
+    out = {rel: out[rel] for rel in (os.path.relpath(p, base) for p in paths) if rel in out}
+    if new_cache != cache:
+        kng_runlog.ensure_dir(os.path.dirname(cache_path))
+        tmp = cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as w:
+            w.write(kng_runlog.compact_json(new_cache))
+        os.replace(tmp, cache_path)
+    return out, stats
+
+# ====== 集計 ======
+def scorer_totals(matches) -> dict:
+    """{(名前, チーム): 得点}（OG は除外）。matches は parse_match 結果の iterable"""
+    tot = {}
+    for m in matches:
+        for side, name, minute, added in m["goals"]:
+            if is_own_goal(name):
+                continue
+            key = (name, scorer_team(m, side))
+            tot[key] = tot.get(key, 0) + 1
+    return tot
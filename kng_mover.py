@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 退避の一括移動（計画 → ジャーナル → 実行 / 再開 / 巻き戻し）
+- 対象は先に全部列挙して計画（移動元 → 移動先）を作る。除外パターンは1本に連結して事前コンパイル
+  （ファイル名ごとにパターンの数だけ re.search しない）
+- 同じファイルシステム内は os.rename（メタデータ操作だけ）。別マウント（EXDEV）の分だけ
+  上限付きスレッドプールでコピー（.part に書いて os.replace → 元を消す）
+- 移動先に同名があれば上書きせず skip。失敗は握りつぶさず、理由つきで結果に残す
+- 計画と進捗は _logs/moves/<名前>_<TS>.ndjson（1行目が計画、以降1件1行の追記）
+  → 途中で止まっても、再スキャンせずに resume（残りだけ実行）/ rollback（済みを元に戻す）できる
+- 使い方: python kng_mover.py [BASE] list | resume [JOURNAL] | rollback [JOURNAL]
+- 依存: 標準ライブラリのみ
+"""
+import os, re, sys, json, errno, shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import kng_runlog
+
+BASE = "/sdcard/Download/sakana-no-osama.github.io"
+JOURNAL_DIRNAME = "moves"
+COPY_WORKERS = 4        # 別マウントへのコピーの同時数
+
+def combine(patterns, flags=re.I):
+    """複数パターンを1本の正規表現に（どれかに当たれば match）"""
+    return re.compile("|".join(f"(?:{p})" for p in patterns), flags)
+
+def journal_dir(base: str) -> str:
+    return os.path.join(kng_runlog.log_dir_for(base), JOURNAL_DIRNAME)
+
+# ====== 計画 ======
+def plan(pairs) -> list:
+    """[(移動元, 移動先)] → 計画。移動先に既にあるものは skip（上書きしない）"""
+    moves = []
+    for src, dst in pairs:
+        m = {"src": src, "dst": dst}
+        if os.path.lexists(dst):
+            m["skip"] = "exists"
+        moves.append(m)
+    return moves
+
+def _write_line(w, obj):
+    w.write(json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n")
+    w.flush()
+
+def _move_one(src, dst):
+    """rename を試し、別マウントなら "copy" を返す（呼び出し側でコピー）"""
+    try:
+        os.rename(src, dst)
+        return "rename"
+    except OSError as e:
+        if e.errno == errno.EXDEV:
+            return "copy"
+        raise
+
+def _copy_one(src, dst):
+    part = dst + ".part"
+    shutil.copy2(src, part)
+    os.replace(part, dst)
+    os.remove(src)
+
+# ====== 実行 ======
+def execute(moves: list, journal: str, workers=COPY_WORKERS, done=None) -> dict:
+    """
+    計画を実行し、1件ごとにジャーナルへ追記。done: 既に済んだ添字（resume 用）
+    戻り値: {"ok": [添字], "renamed","copied","skipped","failed": [[添字, 移動元, 理由]]}
+    """
+    done = done or set()
+    res = {"ok": [], "renamed": 0, "copied": 0, "skipped": 0, "failed": []}
+    cross = []
+    with open(journal, "a", encoding="utf-8") as w:
+        for i, m in enumerate(moves):
+            if i in done:
+                continue
+            if not os.path.lexists(m["src"]) and os.path.lexists(m["dst"]):
+                # 移動済みだがジャーナルに書く前に止まった
+                res["ok"].append(i)
+                _write_line(w, {"i": i, "ok": "found"})
+                continue
+            if m.get("skip") or os.path.lexists(m["dst"]):
+                res["skipped"] += 1
+                _write_line(w, {"i": i, "skip": m.get("skip", "exists")})
+                continue
+            try:
+                os.makedirs(os.path.dirname(m["dst"]), exist_ok=True)
+                how = _move_one(m["src"], m["dst"])
+            except OSError as e:
+                res["failed"].append([i, m["src"], str(e)])
+                _write_line(w, {"i": i, "error": str(e)})
+                continue
+            if how == "copy":
+                cross.append(i)
+            else:
+                res["renamed"] += 1
+                res["ok"].append(i)
+                _write_line(w, {"i": i, "ok": "rename"})
+        if cross:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+                futs = {i: ex.submit(_copy_one, moves[i]["src"], moves[i]["dst"]) for i in cross}
+                for i, f in futs.items():
+                    try:
+                        f.result()
+                    except OSError as e:
+                        res["failed"].append([i, moves[i]["src"], str(e)])
+                        _write_line(w, {"i": i, "error": str(e)})
+                        continue
+                    res["copied"] += 1
+                    res["ok"].append(i)
+                    _write_line(w, {"i": i, "ok": "copy"})
+        _write_line(w, {"end": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        "failed": len(res["failed"])})
+    return res
+
+def run(base: str, name: str, pairs, workers=COPY_WORKERS) -> dict:
+    """計画を作ってジャーナルを開き、実行。戻り値は execute の結果 + moves / journal"""
+    moves = plan(pairs)
+    if not moves:
+        return {"ok": [], "renamed": 0, "copied": 0, "skipped": 0, "failed": [], "moves": [], "journal": None}
+    d = journal_dir(base)
+    kng_runlog.ensure_dir(d)
+    journal = os.path.join(d, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.ndjson")
+    with open(journal, "w", encoding="utf-8") as w:
+        _write_line(w, {"name": name, "moves": moves})
+    res = execute(moves, journal, workers)
+    res["moves"] = moves
+    res["journal"] = journal
+    return res
+
+def evacuate(base: str, name: str, paths, tag=None) -> dict:
+    """生成物を消さずに _old_backup/<TS>_<tag>/ へ（base からの相対パスのまま）退避。戻り値は run と同じ"""
+    paths = [p for p in paths if os.path.lexists(p)]
+    dest = os.path.join(base, "_old_backup", f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{tag or name}")
+    return run(base, name, [(p, os.path.join(dest, os.path.relpath(p, base))) for p in paths])
+
+def moved(res: dict) -> list:
+    """移動できた計画項目（失敗・skip を除く）"""
+    return [res["moves"][i] for i in sorted(res["ok"])]
+
+# ====== ジャーナル ======
+def read_journal(path: str):
+    """(計画, {添字: 結果}, 完了したか)"""
+    with open(path, encoding="utf-8") as f:
+        head = json.loads(f.readline())
+        status, ended = {}, False
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                break        # 書きかけの最終行（中断）
+            if "end" in rec:
+                ended = True
+            else:
+                status[rec["i"]] = rec
+    return head["moves"], status, ended
+
+def journals(base: str) -> list:
+    try:
+        names = sorted(f for f in os.listdir(journal_dir(base)) if f.endswith(".ndjson"))
+    except OSError:
+        return []
+    return [os.path.join(journal_dir(base), f) for f in names]
+
+def unfinished(base: str) -> list:
+    return [p for p in journals(base) if not read_journal(p)[2]]
+
+def resume(path: str, workers=COPY_WORKERS) -> dict:
+    """中断したジャーナルの残り（結果の無い項目）だけ実行"""
+    moves, status, _ = read_journal(path)
+    return execute(moves, path, workers, done={i for i, r in status.items() if "ok" in r or "skip" in r})
+
+def rollback(path: str) -> dict:
+    """済んだ移動を逆順に元へ戻す（元の場所に何かあれば戻さない）"""
+    moves, status, _ = read_journal(path)
+    res = {"restored": 0, "failed": []}
+    for i in sorted((i for i, r in status.items() if "ok" in r), reverse=True):
+        m = moves[i]
+        if os.path.lexists(m["src"]) or not os.path.lexists(m["dst"]):
+            res["failed"].append([i, m["src"], "元の場所に既にある / 移動先に無い"])
+            continue
+        try:
+            if _move_one(m["dst"], m["src"]) == "copy":
+                _copy_one(m["dst"], m["src"])
+            res["restored"] += 1
+        except OSError as e:
+            res["failed"].append([i, m["src"], str(e)])
+    with open(path, "a", encoding="utf-8") as w:
+        _write_line(w, {"end": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "rolled_back": res["restored"]})
+    return res
+
+def main(argv):
+    base = BASE
+    if argv and argv[0] not in ("list", "resume", "rollback"):
+        base, argv = argv[0], argv[1:]
+    cmd = argv[0] if argv else "list"
+    if cmd == "list":
+        for p in journals(base):
+            moves, status, ended = read_journal(p)
+            ok = sum(1 for r in status.values() if "ok" in r)
+            print(f"{'✅' if ended else '⏸️'} {os.path.basename(p)}: {ok}/{len(moves)} 件済み")
+        return 0
+    if cmd not in ("resume", "rollback"):
+        print(__doc__)
+        return 2
+    # 既定: resume は最後の未完了ジャーナル、rollback は最後のジャーナル
+    targets = argv[1:2] or (unfinished(base) if cmd == "resume" else journals(base))[-1:]
+    if not targets:
+        print("⏭️ 対象のジャーナルがありません")
+        return 0
+    path = targets[0]
+    res = resume(path) if cmd == "resume" else rollback(path)
+    print(("🔁 再開: " if cmd == "resume" else "↩️ 巻き戻し: ") + os.path.basename(path),
+          {k: (len(v) if isinstance(v, list) else v) for k, v in res.items()})
+    for i, src, err in res["failed"]:
+        print(f"  ❌ {src}: {err}")
+    return 1 if res["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
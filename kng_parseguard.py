@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 解析ガード（1ファイルごとの解析時間計測 / 予算超過の検出 / 線形走査ヘルパ）
+- ParseTimer: ファイル単位の解析時間を計測し、ヒストグラムと上位の遅いファイルを
+  実行ログ（kng_runlog）へ渡せる形でまとめる
+- 予算（budget 秒）を超えたファイルは flag（記録のみ）または quarantine
+  （_diagnose/quarantine/ へ退避 → 次回以降は入力に入らない）
+  ※ Python の re は途中で打ち切れないため、判定は解析後の事後判定
+- iter_blocks: <tr>…</tr> 等を str.find で切り出す（(.*?) + re.S の全ページ走査を避ける）
+- 依存: 標準ライブラリのみ
+"""
+import os, time, shutil
+
+# ====== 設定 ======
+BUDGET_SEC = 0.5                       # 1ファイルあたりの解析時間予算
+QUARANTINE_DIR = os.path.join("_diagnose", "quarantine")   # go.sh と同じ隔離先
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SLOWEST_N = 5
+
+# ====== 計測 ======
+class ParseTimer:
+    def __init__(self, budget=BUDGET_SEC, mode="flag", quarantine_dir=None):
+        """
+        mode: "flag"（記録のみ） / "quarantine"（予算超過ファイルを quarantine_dir へ移動）
+        """
+        self.budget = budget
+        self.mode = mode
+        self.quarantine_dir = quarantine_dir
+        self.times = {}          # path -> 秒
+        self.over = []           # 予算超過 path
+        self.quarantined = []
+
+    def run(self, path, fn, *args, **kw):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kw)
+        finally:
+            self.add(path, time.perf_counter() - t0)
+
+    def add(self, path, sec):
+        self.times[path] = sec
+        if self.budget is not None and sec > self.budget:
+            self.over.append(path)
+            if self.mode == "quarantine" and self.quarantine_dir:
+                self._quarantine(path)
+
+    def _quarantine(self, path):
+        if not os.path.isfile(path):
+            return
+        os.makedirs(self.quarantine_dir, exist_ok=True)
+        dst = os.path.join(self.quarantine_dir, os.path.basename(path))
+        try:
+            shutil.move(path, dst)
+            self.quarantined.append(os.path.basename(path))
+        except OSError:
+            pass
+
+    def histogram(self) -> dict:
+        """{"<=1ms": n, "<=2ms": n, ..., ">1000ms": n}（空のバケットは省略）"""
+        hist = {}
+        for sec in self.times.values():
+            ms = sec * 1000
+            for b in BUCKETS_MS:
+                if ms <= b:
+                    label = f"<={b}ms"
+                    break
+            else:
+                label = f">{BUCKETS_MS[-1]}ms"
+            hist[label] = hist.get(label, 0) + 1
+        order = [f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {k: hist[k] for k in order if k in hist}
+
+    def summary(self) -> dict:
+        vals = sorted(self.times.values())
+        n = len(vals)
+        def pct(p):
+            return round(vals[min(n - 1, int(p * n))] * 1000, 2) if n else 0
+        slow = sorted(self.times.items(), key=lambda x: -x[1])[:SLOWEST_N]
+        return {
+            "files": n,
+            "total_ms": round(sum(vals) * 1000, 2),
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": round(vals[-1] * 1000, 2) if n else 0,
+            "histogram": self.histogram(),
+            "slowest": [[os.path.basename(p), round(s * 1000, 2)] for p, s in slow],
+            "budget_ms": round(self.budget * 1000) if self.budget is not None else None,
+            "over_budget": [os.path.basename(p) for p in self.over],
+            "quarantined": self.quarantined,
+        }
+
+# ====== 線形走査ヘルパ ======
+def iter_blocks(html: str, tag: str):
+    """
+    <tag ...>中身</tag> の「中身」を順に返す（大文字小文字は区別しない）。
+    閉じタグが無い場合は次の開始タグまでを中身とみなす → 常に O(n)。
+    """
+    low = html.lower()
+    open_t, close_t = f"<{tag}", f"</{tag}>"
+    n = len(html)
+    i = low.find(open_t)
+    while i >= 0:
+        # <tr> と <track> 等を取り違えない
+        j = i + len(open_t)
+        if j < n and low[j] not in "> \t\r\n/":
+            i = low.find(open_t, j)
+            continue
+        gt = low.find(">", j)
+        if gt < 0:
+            return
+        end = low.find(close_t, gt + 1)
+        nxt = low.find(open_t, gt + 1)
+        if end < 0 or (0 <= nxt < end):
+            end = nxt if nxt >= 0 else n
+            yield html[gt + 1:end]
+            i = nxt
+        else:
+            yield html[gt + 1:end]
+            i = low.find(open_t, end + len(close_t))
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 選手登録簿（シーズンをまたいで変わらない整数 ID）
+- (正規化名, 正規化チーム名（別名解決後）) → 選手 ID を player_registry.json に永続化
+  → 2025 と 2026 の同じ選手が同じ ID になり、シーズンごとに別キーにならない
+- ID は取り込み時（試合ページの得点イベントごと）に id_for で振る。照合は dict 1回
+  （生の (名前, チーム) → ID も覚えるので、同じ表記は正規化もしない）
+- 集計は ID（int）で結合し（kng_leagues.id_totals）、選手の全シーズン履歴は history(ID) の1回の添字参照
+- 読み込み時、別の ID が同じキーになる（別名や正規化の変更で2人が1人に寄る）ものは黙って上書きせず、
+  小さい ID をキーに残して duplicates に記録（kng_leagues が警告・マニフェストに出す）
+- 依存: 標準ライブラリのみ
+"""
+import os, json, threading
+
+import kng_core
+
+REGISTRY_FILE = "player_registry.json"
+
+class PlayerRegistry:
+    def __init__(self, aliases=None):
+        self.aliases = aliases or {}     # 正規化チーム名 -> 正式名
+        self.ids = {}          # "正規化名|正規化チーム" -> ID
+        self.players = []      # ID -> {"name", "team", "history": {シーズン: {リーグ: 得点}}}
+        self._raw = {}         # (生の名前, 生のチーム) -> ID（実行中のみ）
+        self._lock = threading.Lock()
+        self.added = 0
+        self.dirty = False
+        self.duplicates = []   # [{"key", "ids": [残した ID, 重なった ID, ...]}]（読み込み時）
+
+    # ====== 照合 ======
+    def key(self, name: str, team: str) -> str:
+        t = kng_core.normalize_team(team or "")
+        t = kng_core.normalize_team(self.aliases.get(t, t))
+        return kng_core.normalize_name(name) + "|" + t
+
+    def id_for(self, name: str, team: str) -> int:
+        """(名前, チーム) の ID。未登録なら採番"""
+        pid = self._raw.get((name, team))
+        if pid is not None:
+            return pid
+        k = self.key(name, team)
+        with self._lock:
+            pid = self.ids.get(k)
+            if pid is None:
+                pid = self.ids[k] = len(self.players)
+                self.players.append({"name": name, "team": team, "history": {}})
+                self.added += 1
+                self.dirty = True
+            elif len(name) > len(self.players[pid]["name"]):
+                # 表示名はより長い方（空白入り・漢字表記）を採用
+                self.players[pid]["name"] = name
+                self.dirty = True
+            self._raw[(name, team)] = pid
+        return pid
+
+    def lookup(self, name: str, team: str):
+        """登録済みなら ID、無ければ None（採番しない）"""
+        pid = self._raw.get((name, team))
+        return pid if pid is not None else self.ids.get(self.key(name, team))
+
+    # ====== 履歴 ======
+    def record(self, pid: int, season, league: str, goals: int):
+        h = self.players[pid]["history"].setdefault(str(season), {})
+        if h.get(league) != goals:
+            with self._lock:
+                h[league] = goals
+                self.dirty = True
+
+    def history(self, pid: int) -> dict:
+        return self.players[pid]["history"]
+
+    def display(self, pid: int):
+        p = self.players[pid]
+        return p["name"], p["team"]
+
+    # ====== 保存 ======
+    def to_json(self) -> dict:
+        return {"players": [{"id": i, **p} for i, p in enumerate(self.players)]}
+
+    @classmethod
+    def from_json(cls, data: dict, aliases=None):
+        reg = cls(aliases)
+        for p in sorted(data.get("players", []), key=lambda x: x["id"]):
+            if p["id"] != len(reg.players):
+                raise ValueError(f"{REGISTRY_FILE}: ID が連番ではありません（{p['id']}）")
+            reg.players.append({"name": p["name"], "team": p["team"], "history": p.get("history", {})})
+            k = reg.key(p["name"], p["team"])
+            if k in reg.ids:
+                dup = next((d for d in reg.duplicates if d["key"] == k), None)
+                if dup is None:
+                    reg.duplicates.append({"key": k, "ids": [reg.ids[k], p["id"]]})
+                else:
+                    dup["ids"].append(p["id"])
+                continue
+            reg.ids[k] = p["id"]
+        return reg
+
+def load(base: str, aliases=None) -> PlayerRegistry:
+    try:
+        with open(os.path.join(base, REGISTRY_FILE), encoding="utf-8") as f:
+            return PlayerRegistry.from_json(json.load(f), aliases)
+    except FileNotFoundError:
+        return PlayerRegistry(aliases)
+
+def save(base: str, reg: PlayerRegistry):
+    if not reg.dirty:
+        return
+    path = os.path.join(base, REGISTRY_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as w:
+        json.dump(reg.to_json(), w, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    reg.dirty = False
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 先読みリーダー（上限つきスレッドプールでファイルを先に読み、解析は順番どおりに受け取る）
+- Android の /sdcard は FUSE 経由で open / read のたびに待ちが出る。1ファイルずつ同期で読むと
+  待っている間 CPU が遊ぶので、読む順番（paths）を先に渡し、解析している間に後ろのファイルを
+  WORKERS 本のスレッドで読んでおく
+- 先読みは「読み待ち DEPTH 件まで」かつ「読み終わって未消費のバイト数が MAX_BYTES 未満の間だけ」
+  → 巨大なファイルが並んでもメモリは上限付き
+- read_bytes(path) / read_text(path) は paths の順に呼ぶ前提。飛ばしたファイルの先読みは捨て、
+  paths に無い（または前に戻った）path は同期で読む。読めなかったときの OSError は呼び出し側に
+  そのまま送出（kng_core.read_text と同じ振る舞い）
+- read_text は kng_core.decode_bytes（utf-8 → cp932 → euc-jp）でデコード（decode で差し替え可）
+- workers=0 なら先読みせず、呼ばれた時に同期で読む（従来どおりの逐次読み）
+- MAX_BYTES は「これ以上は新しく投入しない」上限（投入済みの読みが終わった分だけ超えうる）
+- bench(): 同じファイル列を 逐次 / 先読み で読んで解析し、スループットを比較
+  （--latency-ms で1ファイルごとの待ちを足して FUSE を模擬できる）
+- 使い方: python kng_prefetch.py [DIR] [--workers N] [--latency-ms X] [--repeat N]
+  （DIR 以下の *.html を kng_scan で（退避ツリーは除外・深さ MAX_DEPTH まで）。
+    既定は _archive/raw/ の試合ページ + team_*.html）
+- 依存: 標準ライブラリのみ
+"""
+import os, sys, time, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import kng_core
+
+WORKERS = 4
+DEPTH = 16                       # 読み待ち（未完了）の最大件数
+MAX_BYTES = 8 * 1024 * 1024      # 読み終わって未消費のバイト数の上限
+
+def _read(path, latency=0.0):
+    if latency:
+        time.sleep(latency)      # FUSE の1ファイルごとの待ちの模擬（bench 用）
+    with open(path, "rb") as f:
+        return f.read()
+
+class Prefetcher:
+    def __init__(self, paths, workers=WORKERS, max_bytes=MAX_BYTES, depth=DEPTH, latency=0.0, decode=None):
+        self.paths = list(paths)
+        self.decode = decode        # (path, bytes) -> str。None なら kng_core.decode_bytes
+        self.pos = {}               # path -> paths 内の位置（最初の出現）
+        for i, p in enumerate(self.paths):
+            self.pos.setdefault(p, i)
+        self.next = 0               # 次に投入する位置
+        self.max_bytes = max_bytes
+        self.depth = max(1, depth)
+        self.latency = latency
+        self.pending = deque()      # [(位置, future)]（paths の順）
+        self.ready_bytes = 0        # 読み終わって未消費のバイト数
+        self._lock = threading.Lock()
+        self._ex = ThreadPoolExecutor(max_workers=workers) if workers > 0 else None
+        self.stats = {"files": 0, "bytes": 0, "hits": 0, "misses": 0, "skipped": 0,
+                      "peak_bytes": 0, "wait_sec": 0.0}
+        self._fill()
+
+    def _task(self, path):
+        data = _read(path, self.latency)
+        with self._lock:
+            self.ready_bytes += len(data)
+            if self.ready_bytes > self.stats["peak_bytes"]:
+                self.stats["peak_bytes"] = self.ready_bytes
+        return data
+
+    def _fill(self):
+        while self._ex and self.next < len(self.paths):
+            with self._lock:
+                full = self.ready_bytes >= self.max_bytes
+            running = sum(1 for _, f in self.pending if not f.done())
+            if full or running >= self.depth or len(self.pending) >= self.depth * 2:
+                return
+            self.pending.append((self.next, self._ex.submit(self._task, self.paths[self.next])))
+            self.next += 1
+
+    def _release(self, fut):
+        # 捨てた先読み分のバイト数を戻す（実行中なら読み終わった時に）
+        if not fut.cancelled() and fut.exception() is None:
+            with self._lock:
+                self.ready_bytes -= len(fut.result())
+
+    def _consume(self, fut):
+        t0 = time.perf_counter()
+        try:
+            data = fut.result()
+        finally:
+            self.stats["wait_sec"] += time.perf_counter() - t0
+        with self._lock:
+            self.ready_bytes -= len(data)
+        return data
+
+    def read_bytes(self, path: str) -> bytes:
+        i = self.pos.get(path)
+        if i is not None:
+            # 飛ばされた（i より前の）先読みは捨て、まだ投入していなければ i まで進める
+            while self.pending and self.pending[0][0] < i:
+                _, fut = self.pending.popleft()
+                self.stats["skipped"] += 1
+                if not fut.cancel():
+                    fut.add_done_callback(self._release)
+            if self.next < i:
+                self.stats["skipped"] += i - self.next
+                self.next = i
+            self._fill()
+        if i is not None and self.pending and self.pending[0][0] == i:
+            _, fut = self.pending.popleft()
+            try:
+                data = self._consume(fut)
+            finally:
+                self._fill()
+            self.stats["hits"] += 1
+        else:
+            data = _read(path, self.latency)
+            self.stats["misses"] += 1
+        self.stats["files"] += 1
+        self.stats["bytes"] += len(data)
+        return data
+
+    def read_text(self, path: str) -> str:
+        b = self.read_bytes(path)
+        return self.decode(path, b) if self.decode else kng_core.decode_bytes(b)
+
+    def close(self):
+        for _, fut in self.pending:
+            fut.cancel()
+        self.pending.clear()
+        if self._ex:
+            self._ex.shutdown(wait=True)
+        self.stats["wait_sec"] = round(self.stats["wait_sec"], 4)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ====== 計測 ======
+def default_paths(base: str) -> list:
+    import kng_scan
+    pages = [p for s in kng_scan.snapshots(base) for p in kng_scan.match_pages(base, s)]
+    return pages + [os.path.join(base, f) for f in kng_scan.shared(base).list_html(base) if f.startswith("team_")]
+
+def _parse(text: str):
+    # 読み込み後の処理の代わり（試合ページは score-board、表は tr の走査）
+    import kng_match
+    from kng_parseguard import iter_blocks
+    return kng_match.parse_match(text) if 'id="score-board"' in text else sum(1 for _ in iter_blocks(text, "tr"))
+
+def bench(paths, workers=WORKERS, latency=0.0, repeat=3) -> dict:
+    """逐次（read → 解析 を1件ずつ）と先読みの実時間（repeat 回の最小）"""
+    def sequential():
+        out = []
+        for p in paths:
+            out.append(_parse(kng_core.decode_bytes(_read(p, latency))))
+        return out
+    def prefetched():
+        out = []
+        with Prefetcher(paths, workers=workers, latency=latency) as pf:
+            for p in paths:
+                out.append(_parse(pf.read_text(p)))
+        return out, pf.stats
+    if sequential() != prefetched()[0]:
+        raise AssertionError("先読みの結果が逐次読みと一致しない")
+    seq = pre = None
+    stats = {}
+    for _ in range(repeat):
+        t0 = time.perf_counter(); sequential(); t = time.perf_counter() - t0
+        seq = t if seq is None else min(seq, t)
+        t0 = time.perf_counter(); _, stats = prefetched(); t = time.perf_counter() - t0
+        pre = t if pre is None else min(pre, t)
+    mb = sum(os.path.getsize(p) for p in paths) / 1e6
+    return {
+        "files": len(paths), "mb": round(mb, 2), "workers": workers, "latency_ms": latency * 1000,
+        "sequential_ms": round(seq * 1000, 1), "prefetch_ms": round(pre * 1000, 1),
+        "sequential_files_s": round(len(paths) / seq, 1) if seq else None,
+        "prefetch_files_s": round(len(paths) / pre, 1) if pre else None,
+        "speedup": round(seq / pre, 2) if pre else None,
+        "peak_kb": stats.get("peak_bytes", 0) // 1024, "wait_sec": stats.get("wait_sec"),
+    }
+
+def main(argv):
+    def opt(name, cast, default):
+        return cast(argv[argv.index(name) + 1]) if name in argv else default
+    target = argv[0] if argv and not argv[0].startswith("--") else os.path.dirname(os.path.abspath(__file__))
+    if os.path.isdir(os.path.join(target, "_archive")):
+        paths = default_paths(target)
+    else:
+        import kng_scan
+        paths = kng_scan.Scanner().find([target], lambda f: f.lower().endswith(".html"))
+    if not paths:
+        print(f"⚠️ 対象のファイルがありません: {target}")
+        return 1
+    r = bench(paths, opt("--workers", int, WORKERS), opt("--latency-ms", float, 0.0) / 1000, opt("--repeat", int, 3))
+    print(f"📂 {r['files']}ファイル / {r['mb']}MB（待ち {r['latency_ms']}ms/ファイル）")
+    print(f"⏱️ 逐次 {r['sequential_ms']}ms（{r['sequential_files_s']}件/s）/ 先読み {r['prefetch_ms']}ms"
+          f"（{r['prefetch_files_s']}件/s, {r['workers']}スレッド）→ ×{r['speedup']} / 未消費ピーク {r['peak_kb']}KB")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
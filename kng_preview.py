@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+KNG ローカルプレビュー（ThreadingHTTPServer・メモリ上の配信・ETag / 304・gzip・ビルド後の差し替え）
+- 生成物（BASE 直下の *.html / *.css / *.json / *.js と teams_final23/ 等）を読み込んでメモリに置き、
+  リクエストごとにディスクを読まない
+- ETag は内容ハッシュの強い ETag（gzip 版は別の ETag）。If-None-Match が一致すれば 304
+  Cache-Control: no-cache なので、ブラウザは毎回確認し、変わっていなければ本文を受け取らない
+- Accept-Encoding: gzip なら圧縮版を返す（kng_assets の .gz 併置があればそれを、無ければ圧縮して保持）
+- 実行ログ（_logs/runs.ndjson）の更新 = ビルド完了を POLL 秒ごとに確認し、サイト全体を読み直して
+  1回の代入で差し替え（配信中のリクエストは古い版を最後まで返す）。
+  (サイズ, mtime) が前回と同じファイルは読み直さない
+- file:// で開くためのコピー（go.sh の *_preview.html → Download）をしなくても、スマホのブラウザで
+  http://127.0.0.1:<PORT>/ を開けばすぐ最新のビルドが見られる
+- 使い方: python kng_preview.py [BASE] [--port N] [--host H] [--poll 秒] [--max 回数] [--open]
+          （python -m kng preview でも同じ。--open は termux-open で開く）
+- 依存: 標準ライブラリのみ
+"""
+import os, sys, time, gzip, hashlib, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote, urlsplit
+
+import kng_runlog
+
+BASE = "/sdcard/Download/sakana-no-osama.github.io"
+HOST = "127.0.0.1"
+PORT = 8765
+POLL = 2.0                                # ビルド完了の確認間隔（秒）
+SUBDIRS = ("teams_final23",)               # 直下以外に配信するディレクトリ
+INDEX_PAGES = ("index.html", "index_kngsafe_final23.html", "index_kngsafe_final.html")
+CTYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".json": "application/json; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+}
+
+def _etag(data: bytes, suffix="") -> str:
+    return '"' + hashlib.sha1(data).hexdigest()[:20] + suffix + '"'
+
+# ====== サイト（メモリ上の版） ======
+class Site:
+    """{URL パス: 配信内容}。作ったら変更しない（差し替えは Site ごと）"""
+    def __init__(self, base: str, prev=None):
+        self.base = base
+        self.files = {}     # "/name.html" -> {"sig", "body", "gz", "etag", "gz_etag", "ctype"}
+        self.loaded = self.reused = 0
+        old = prev.files if prev else {}
+        for rel in self._list():
+            path = os.path.join(base, rel)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            url = "/" + rel.replace(os.sep, "/")
+            sig = (st.st_size, st.st_mtime_ns)
+            ent = old.get(url)
+            if ent and ent["sig"] == sig:
+                self.files[url] = ent
+                self.reused += 1
+                continue
+            ent = self._load(path, sig)
+            if ent:
+                self.files[url] = ent
+                self.loaded += 1
+        self.index = next(("/" + p for p in INDEX_PAGES if "/" + p in self.files), None)
+
+    def _list(self):
+        for d in ("",) + SUBDIRS:
+            try:
+                names = sorted(os.listdir(os.path.join(self.base, d)))
+            except OSError:
+                continue
+            for f in names:
+                if os.path.splitext(f)[1].lower() in CTYPES:
+                    yield os.path.join(d, f) if d else f
+
+    @staticmethod
+    def _load(path: str, sig) -> dict:
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        gz = None
+        try:
+            # kng_assets が置いた .gz（元より新しいものだけ）
+            if os.stat(path + ".gz").st_mtime_ns >= sig[1]:
+                with open(path + ".gz", "rb") as f:
+                    gz = f.read()
+                if gzip.decompress(gz) != body:
+                    gz = None
+        except (OSError, EOFError, gzip.BadGzipFile):
+            gz = None
+        if gz is None:
+            gz = gzip.compress(body, compresslevel=6, mtime=0)
+        return {"sig": sig, "body": body, "gz": gz, "etag": _etag(body), "gz_etag": _etag(body, "-gz"),
+                "ctype": CTYPES[os.path.splitext(path)[1].lower()]}
+
+    def get(self, url: str):
+        if url == "/":
+            url = self.index or url
+        return self.files.get(url)
+
+# ====== HTTP ======
+class Handler(BaseHTTPRequestHandler):
+    server_version = "KNGPreview/1"
+
+    def do_GET(self):
+        self._send(head=False)
+
+    def do_HEAD(self):
+        self._send(head=True)
+
+    def _send(self, head):
+        srv = self.server
+        site = srv.site          # 差し替えられても、このリクエストは同じ版で返す
+        ent = site.get(unquote(urlsplit(self.path).path))
+        srv.count("requests")
+        if ent is None:
+            srv.count("not_found")
+            self.send_error(404)
+            return
+        use_gz = "gzip" in self.headers.get("Accept-Encoding", "") and len(ent["gz"]) < len(ent["body"])
+        etag = ent["gz_etag"] if use_gz else ent["etag"]
+        inm = self.headers.get("If-None-Match")
+        if inm and (inm.strip() == "*" or etag in [t.strip() for t in inm.split(",")]):
+            srv.count("not_modified")
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+        body = ent["gz"] if use_gz else ent["body"]
+        if use_gz:
+            srv.count("gzip")
+        self.send_response(200)
+        self.send_header("Content-Type", ent["ctype"])
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if use_gz:
+            self.send_header("Content-Encoding", "gzip")
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass        # 1リクエスト1行は出さない（件数は stats に）
+
+class PreviewServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, base: str):
+        super().__init__(addr, Handler)
+        self.base = base
+        self.site = Site(base)
+        self.swaps = 0
+        self.stats = {"requests": 0, "not_modified": 0, "gzip": 0, "not_found": 0}
+        self._lock = threading.Lock()
+
+    def count(self, k):
+        with self._lock:
+            self.stats[k] += 1
+
+    def reload(self) -> Site:
+        """読み直して差し替え（変化の無いファイルは前の版を使い回す）"""
+        site = Site(self.base, self.site)
+        self.site = site
+        self.swaps += 1
+        return site
+
+def build_signature(base: str):
+    """ビルド完了の目印: 実行ログの (サイズ, mtime)"""
+    try:
+        st = os.stat(os.path.join(kng_runlog.log_dir_for(base), kng_runlog.RUN_LOG))
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+def serve(base=BASE, host=HOST, port=PORT, poll=POLL, open_browser=False, max_polls=0):
+    srv = PreviewServer((host, port), base)
+    url = f"http://{host}:{srv.server_address[1]}/"
+    print(f"🌐 プレビュー: {url}（{len(srv.site.files)}ファイルをメモリに / 既定ページ {srv.site.index}）")
+    th = threading.Thread(target=srv.serve_forever, daemon=True)
+    th.start()
+    if open_browser:
+        import subprocess
+        try:
+            subprocess.run(["termux-open", url], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError:
+            print("⚠️ termux-open が見つかりません: ブラウザで", url, "を開いてください")
+    sig, n = build_signature(base), 0
+    try:
+        while not max_polls or n < max_polls:
+            time.sleep(poll)
+            n += 1
+            cur = build_signature(base)
+            if cur == sig:
+                continue
+            sig = cur
+            t0 = time.perf_counter()
+            site = srv.reload()
+            print(f"🔁 ビルド完了を検知 → 差し替え（読み直し {site.loaded} / 使い回し {site.reused}"
+                  f" / {time.perf_counter() - t0:.2f}s）", srv.stats)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.shutdown()
+        srv.server_close()
+    return srv
+
+def _opt(argv, name, cast, default):
+    return cast(argv[argv.index(name) + 1]) if name in argv else default
+
+def main(argv):
+    base = argv[0] if argv and not argv[0].startswith("--") else BASE
+    if not os.path.isdir(base):
+        print(f"❌ BASE が見つかりません: {base}")
+        return 1
+    serve(base, _opt(argv, "--host", str, HOST), _opt(argv, "--port", int, PORT),
+          _opt(argv, "--poll", float, POLL), "--open" in argv, _opt(argv, "--max", int, 0))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
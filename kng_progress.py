@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 節ごとの得点推移（選手・チームの累積得点の時系列）
+- 試合ページの得点者（名前・分）を「節」（text-schedule の第N節）単位の得点イベントとして記録
+- 選手・チームごとに「得点が動いた節」と「その節終了時点の累積得点」（前方累積和）を
+  疎な配列で保持。節 N 時点の値は二分探索で O(log 節数)
+- 選手は kng_players の選手 ID（文字列）で持つ（ランキングと同じ結合。表記ゆれは同じ系列）。
+  表示名・チームは names（ID → [表示名, チーム]）で引き、チームの系列はその表示チームで集計
+- ingest(match_id, match) は試合ごとの寄与を覚えておき、差分だけ反映
+  * match_id は match_key（リーグ/部/試合番号）。スナップショットの TS を含まないので、
+    取り直した同じ試合は同じ ID になり二重に数えない
+  * ingest_all は今回の全試合を渡す前提で、今回無い ID の寄与は取り消す（累積 = ランキングの合計）
+  * 新しい節の追加は、その節で得点した選手・チームの数だけの処理（シーズン頭から作り直さない）
+  * 延期試合（過去の節）や訂正は、該当選手の後続点に差分を足すだけ
+- 状態は _logs/progress_<名前>.json に保存し、次回は変化した試合だけ効く
+- 依存: 標準ライブラリのみ
+"""
+import os, json
+from bisect import bisect_left, bisect_right
+import html as pyhtml
+
+import kng_match, kng_runlog
+
+def match_key(prefix: str, rel: str, match: dict) -> str:
+    """試合の ID: "<prefix>/<試合番号>"（番号が取れなければファイル名 m123）"""
+    no = match.get("no")
+    return f"{prefix}/{no if no is not None else os.path.splitext(os.path.basename(rel))[0]}"
+
+class Series:
+    """疎な累積系列: days[i] 節終了時点の累積が cum[i]"""
+    __slots__ = ("days", "cum")
+
+    def __init__(self, days=None, cum=None):
+        self.days = days or []
+        self.cum = cum or []
+
+    def add(self, day: int, delta: int):
+        i = bisect_left(self.days, day)
+        if i == len(self.days) or self.days[i] != day:
+            base = self.cum[i - 1] if i else 0
+            self.days.insert(i, day)
+            self.cum.insert(i, base)
+        for j in range(i, len(self.cum)):
+            self.cum[j] += delta
+        # 差し引きで同じ値が続いた点は落とす
+        if self.cum[i] == (self.cum[i - 1] if i else 0):
+            del self.days[i], self.cum[i]
+
+    def at(self, day: int) -> int:
+        i = bisect_right(self.days, day)
+        return self.cum[i - 1] if i else 0
+
+    def last(self) -> int:
+        return self.cum[-1] if self.cum else 0
+
+class Progression:
+    def __init__(self):
+        self.players = {}    # 選手 ID（文字列） -> Series
+        self.teams = {}      # チーム -> Series
+        self.names = {}      # 選手 ID -> [表示名, チーム]（取り消し用に、今回出てこない ID も残す）
+        self.matches = {}    # match_id -> [節, {選手 ID: 得点}]
+        self.changed = 0     # 直近の ingest で系列が動いた選手・チーム数
+
+    # ====== 取り込み ======
+    @staticmethod
+    def contribution(match: dict, ids: dict) -> dict:
+        """{選手 ID（文字列）: 得点}（OG は除外）。ids: {(名前, チーム): 選手 ID}"""
+        goals = {}
+        for side, name, minute, added in match.get("goals") or []:
+            if kng_match.is_own_goal(name):
+                continue
+            k = str(ids[(name, kng_match.scorer_team(match, side))])
+            goals[k] = goals.get(k, 0) + 1
+        return goals
+
+    def _apply(self, day, goals, sign):
+        teams = {}
+        for k, n in goals.items():
+            self.players.setdefault(k, Series()).add(day, sign * n)
+            t = self.names[k][1]
+            teams[t] = teams.get(t, 0) + n
+        for t, n in teams.items():
+            self.teams.setdefault(t, Series()).add(day, sign * n)
+        self.changed += len(goals) + len(teams)
+
+    def ingest(self, match_id, match: dict, ids=None) -> bool:
+        """1試合の得点を節 match["section"] に記録。前回と同じなら何もしない（ids は contribution と同じ）"""
+        day = match.get("section")
+        new = [day, self.contribution(match, ids)] if day is not None and match.get("goals") else None
+        old = self.matches.get(match_id)
+        if old == new:
+            return False
+        if old:
+            self._apply(old[0], old[1], -1)
+            del self.matches[match_id]
+        if new:
+            self._apply(new[0], new[1], 1)
+            self.matches[match_id] = new
+        return True
+
+    def ingest_all(self, matches: dict, ids: dict, names: dict) -> int:
+        """
+        matches = 今回の全試合 {match_key: 解析結果}。含まれない試合の寄与は取り消す
+        ids: {(名前, チーム): 選手 ID} / names: {選手 ID: (表示名, チーム)}
+        """
+        self.changed = 0
+        self.names.update({str(pid): list(v) for pid, v in names.items()})
+        n = sum(1 for mid, m in matches.items() if self.ingest(mid, m, ids))
+        for mid in [k for k in self.matches if k not in matches]:
+            self.ingest(mid, {})
+            n += 1
+        return n
+
+    # ====== 参照 ======
+    def matchdays(self) -> list:
+        return sorted({d for d, _ in self.matches.values()})
+
+    def ranking_at(self, day: int, limit=None) -> list:
+        """節 day 終了時点の [(順位, 選手 ID, 名前, チーム, 累積)]（並びはランキングと同じ 得点↓・名前）"""
+        rows = [(k, s.at(day)) for k, s in self.players.items()]
+        rows = sorted(((k, g) for k, g in rows if g > 0), key=lambda x: (-x[1], *self.names[x[0]]))
+        out, last, rank = [], None, 0
+        for place, (k, g) in enumerate(rows, 1):
+            if g != last:
+                rank, last = place, g
+            out.append((rank, k, *self.names[k], g))
+        return out[:limit] if limit else out
+
+    def totals(self) -> dict:
+        """最終節終了時点の {選手 ID（文字列）: 累積}（ランキングの合計と一致するはず）"""
+        return {k: s.last() for k, s in self.players.items() if s.last()}
+
+    def series(self, key: str, days=None) -> list:
+        s = self.players.get(key) or self.teams.get(key) or Series()
+        return [(d, s.at(d)) for d in (days or self.matchdays())]
+
+    # ====== 保存 ======
+    def to_state(self) -> dict:
+        return {
+            "matches": self.matches,
+            "names": {k: self.names[k] for k in sorted({k for _, g in self.matches.values() for k in g})},
+            "players": {k: [s.days, s.cum] for k, s in self.players.items() if s.days},
+            "teams": {k: [s.days, s.cum] for k, s in self.teams.items() if s.days},
+        }
+
+    @classmethod
+    def from_state(cls, st: dict):
+        p = cls()
+        if "names" not in st:     # 旧形式（"名前\tチーム" キー）は作り直す
+            return p
+        p.names = st["names"]
+        p.matches = st.get("matches", {})
+        p.players = {k: Series(*v) for k, v in st.get("players", {}).items()}
+        p.teams = {k: Series(*v) for k, v in st.get("teams", {}).items()}
+        return p
+
+def state_path(base: str, name: str) -> str:
+    return os.path.join(kng_runlog.log_dir_for(base), f"progress_{name}.json")
+
+def load(base: str, name: str) -> Progression:
+    try:
+        with open(state_path(base, name), encoding="utf-8") as f:
+            return Progression.from_state(json.load(f))
+    except (OSError, ValueError):
+        return Progression()
+
+def save(base: str, name: str, prog: Progression):
+    path = state_path(base, name)
+    kng_runlog.ensure_dir(os.path.dirname(path))
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as w:
+        w.write(kng_runlog.compact_json(prog.to_state()))
+    os.replace(tmp, path)
+
+# ====== HTML ======
+CHART_W, CHART_H = 160, 32
+
+def sparkline(points, top: int) -> str:
+    """累積得点の折れ線（inline SVG）"""
+    if not points:
+        return ""
+    n = max(1, len(points) - 1)
+    xy = " ".join(f"{i * CHART_W / n:.1f},{CHART_H - (g * CHART_H / max(1, top)):.1f}"
+                  for i, (_, g) in enumerate(points))
+    return (f"<svg width='{CHART_W}' height='{CHART_H}' viewBox='0 0 {CHART_W} {CHART_H}'>"
+            f"<polyline fill='none' stroke='currentColor' stroke-width='1.5' points='{xy}'/></svg>")
+
+def render_sections(prog: Progression, top=20, per_day=10) -> list:
+    """推移（上位 top 人の累積 + 折れ線）と、各節終了時点のランキング（<details>）"""
+    days = prog.matchdays()
+    if not days:
+        return []
+    last = days[-1]
+    leaders = prog.ranking_at(last, top)
+    peak = leaders[0][4] if leaders else 1
+    head = "".join(f"<th>{d}</th>" for d in days)
+    rows = []
+    for rank, k, name, team, g in leaders:
+        pts = prog.series(k, days)
+        cells = "".join(f"<td>{v}</td>" for _, v in pts)
+        rows.append(f"<tr><td class='ranknum'>{rank}</td><td>{pyhtml.escape(name)}</td>"
+                    f"<td class='team'>{pyhtml.escape(team)}</td>{cells}<td>{sparkline(pts, peak)}</td></tr>")
+    out = [f"<section><h2>節ごとの得点推移（上位{top}人）</h2><table><thead><tr>"
+           f"<th class='ranknum'>順位</th><th>選手名</th><th class='team'>チーム</th>{head}<th>推移</th>"
+           "</tr></thead><tbody>\n" + "\n".join(rows) + "\n</tbody></table></section>"]
+    for d in reversed(days):
+        items = "".join(
+            f"<tr><td class='ranknum'>{r}</td><td>{pyhtml.escape(n)}</td>"
+            f"<td class='team'>{pyhtml.escape(t)}</td><td class='goal'>{g}</td></tr>"
+            for r, _, n, t, g in prog.ranking_at(d, per_day))
+        out.append(f"<details><summary>第{d}節終了時点</summary><table><tbody>{items}</tbody></table></details>")
+    return out
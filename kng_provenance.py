@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 出典索引（選手 → どの表の行・どの試合の何分の得点から来た数字か）
+- 集計の途中で1件ずつ積む（後から全ファイルを読み直さない）
+    表の行     … (team_*.html, None, None, 表の得点)
+    得点イベント … (試合ページの相対パス, 試合番号, "33" / "80+2", 1)
+- 選手 ID は「正規化名|チームキー（別名解決後）」。kng_reconcile の照合キーと同じ
+- 保存は索引つきの1ファイル（_logs/provenance_<name>.idx）
+    1行目: {"index": {ID: [オフセット, 長さ]}, "names": {正規化名: [ID, ...]}}
+    2行目以降: 選手ごとの JSON 1行（ID 順）。オフセットは2行目の先頭からのバイト数
+  → 引くときは1行目を読んで seek するだけ（本体は必要な選手の行しか読まない）
+- 使い方: python kng_provenance.py [BASE] <選手名> [--name kng_full_pipeline_v1]
+  （「なぜ6点？」→ 表に出てくる行と、試合ページの得点イベントを並べて表示）
+- 依存: 標準ライブラリのみ
+"""
+import os, sys, json
+
+import kng_core, kng_match, kng_runlog
+
+DEFAULT_NAME = "kng_full_pipeline_v1"
+
+def index_path(base: str, name: str) -> str:
+    return os.path.join(kng_runlog.log_dir_for(base), f"provenance_{name}.idx")
+
+def _minute(minute, added) -> str:
+    return f"{minute}+{added}" if added else str(minute)
+
+# ====== 収集 ======
+class Provenance:
+    def __init__(self, team_key=None):
+        self.team_key = team_key or kng_core.normalize_team
+        self.players = {}    # ID -> {"name", "team", "sources": [[出典, 試合, 分, 得点]]}
+        self.count = 0
+
+    def player_id(self, name, team) -> str:
+        return kng_core.normalize_name(name) + "|" + self.team_key(team)
+
+    def add(self, name, team, src, match=None, minute=None, goals=1):
+        pid = self.player_id(name, team)
+        p = self.players.get(pid)
+        if p is None:
+            p = self.players[pid] = {"name": name, "team": team, "sources": []}
+        elif len(name) > len(p["name"]):
+            p["name"] = name
+        p["sources"].append([src, match, minute, goals])
+        self.count += 1
+
+    def add_matches(self, matches: dict):
+        """kng_match.parse_pages の {相対パス: 解析結果} から得点イベントを積む（OG 除外）"""
+        for rel, m in matches.items():
+            match_id = m.get("no") if m.get("no") is not None else os.path.splitext(os.path.basename(rel))[0]
+            for side, name, minute, added in m["goals"]:
+                if kng_match.is_own_goal(name):
+                    continue
+                self.add(name, kng_match.scorer_team(m, side), rel, match_id, _minute(minute, added))
+
+    # ====== 保存 ======
+    def save(self, base: str, name: str) -> dict:
+        path = index_path(base, name)
+        kng_runlog.ensure_dir(os.path.dirname(path))
+        index, names, body = {}, {}, []
+        off = 0
+        for pid in sorted(self.players):
+            line = (json.dumps({"id": pid, **self.players[pid]}, ensure_ascii=False,
+                               separators=(",", ":")) + "\n").encode("utf-8")
+            index[pid] = [off, len(line)]
+            names.setdefault(pid.split("|", 1)[0], []).append(pid)
+            body.append(line)
+            off += len(line)
+        head = (json.dumps({"index": index, "names": names}, ensure_ascii=False,
+                           separators=(",", ":")) + "\n").encode("utf-8")
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as w:
+            w.write(head)
+            w.writelines(body)
+        os.replace(tmp, path)
+        return {"players": len(self.players), "sources": self.count, "bytes": len(head) + off}
+
+# ====== 参照 ======
+class Index:
+    def __init__(self, path: str):
+        self.f = open(path, "rb")
+        head = json.loads(self.f.readline())
+        self.start = self.f.tell()
+        self.index = head["index"]
+        self.names = head["names"]
+
+    def get(self, pid: str):
+        loc = self.index.get(pid)
+        if loc is None:
+            return None
+        self.f.seek(self.start + loc[0])
+        return json.loads(self.f.read(loc[1]))
+
+    def find(self, query: str) -> list:
+        """選手名（表記ゆれ可）→ 該当する全チームの記録。完全一致が無ければ部分一致"""
+        key = kng_core.normalize_name(query)
+        ids = self.names.get(key)
+        if ids is None:
+            ids = [pid for n, pids in self.names.items() if key in n for pid in pids]
+        return [self.get(pid) for pid in ids]
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def print_record(rec: dict):
+    table = [s for s in rec["sources"] if s[1] is None]
+    events = [s for s in rec["sources"] if s[1] is not None]
+    print(f"👤 {rec['name']}（{rec['team']}）: 表 {max((s[3] for s in table), default='-')} 点"
+          f" / 試合の得点イベント {len(events)} 件")
+    for src, _, _, g in table:
+        print(f"   📄 {src}: {g} 点")
+    # 部ごと・試合番号順（同じ試合の中は得点順のまま）
+    events.sort(key=lambda s: (os.path.dirname(s[0]), s[1] if isinstance(s[1], int) else 0, s[0]))
+    for src, match, minute, _ in events:
+        print(f"   ⚽ {src}（試合 {match}）{minute}分")
+
+def main(argv):
+    name = argv[argv.index("--name") + 1] if "--name" in argv else DEFAULT_NAME
+    args = [a for i, a in enumerate(argv) if a != "--name" and (i == 0 or argv[i - 1] != "--name")]
+    if not args:
+        print(__doc__)
+        return 2
+    if len(args) > 1:
+        base, query = args[0], args[1]
+    else:
+        import kng_full_pipeline_v1
+        base, query = kng_full_pipeline_v1.BASE, args[0]
+    path = index_path(base, name)
+    if not os.path.exists(path):
+        print(f"⚠️ 出典索引がありません: {path}（先に集計を実行）")
+        return 1
+    with Index(path) as idx:
+        recs = idx.find(query)
+    if not recs:
+        print(f"⏭️ 該当なし: {query}")
+        return 1
+    for rec in recs:
+        print_record(rec)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 照合（team_*.html の選手別得点 ⇔ 試合ページの得点者イベント）
+- 両側を (正規化名, 正規化チーム名（別名解決後）) をキーにした dict に畳み、dict 引きで結合
+  （ハッシュ結合: 表の行数 + 得点イベント数 + 選手数 に比例。ソートや総当たりはしない）
+- 不一致は種類ごとに、チーム → 選手 の単位で件数付きで報告（重複出現のたびに1件、にはしない）
+  goals          … 両方にいるが得点が違う（表は最大値採用の値、試合は得点イベント数）
+  table_only     … 表にだけいる（試合ページに得点者として出てこない。行の混入・表記ゆれ）
+  events_only    … 試合ページにだけいる（表の取りこぼし）
+  table_conflict … 同じ選手が表の中で違う得点で複数回出てくる（出現回数つき）
+- gate(report, limit) で「不一致が limit 件以下なら通す」判定。ビルドのたびに実行できる軽さ
+- 試合ページは _archive/raw/ の最新スナップショット。取り込みは kng_snapshots
+  （score-board 部分のハッシュが前のスナップショットと同じ試合は解析せず、得点集計も差分だけ更新）
+- 使い方: python kng_reconcile.py [BASE]
+- 依存: 標準ライブラリのみ
+"""
+import os, sys
+
+import kng_core, kng_runlog, kng_snapshots
+
+KINDS = ("goals", "table_only", "events_only", "table_conflict")
+RAW_DIR = kng_snapshots.RAW_DIR
+SHOW_N = 5
+SCRIPT = "kng_reconcile"
+
+def team_key_fn(aliases=None):
+    """チーム表記 → 照合キー（別名解決あり）"""
+    aliases = aliases or {}
+    memo = {}
+    def key(team):
+        k = memo.get(team)
+        if k is None:
+            k = kng_core.normalize_team(team)
+            k = memo[team] = kng_core.normalize_team(aliases.get(k, k))
+        return k
+    return key
+
+# ====== 両側の集約 ======
+class TableSide:
+    """team_*.html の行を選手単位に畳む。同じ選手の重複出現は得点ごとの回数で持つ"""
+    def __init__(self, team_key=None):
+        self.team_key = team_key or team_key_fn()
+        self.players = {}    # キー -> [表示名, 表示チーム, 最大得点, {得点: 出現回数}]
+        self.rows = 0
+
+    def add(self, name, team, goals):
+        self.rows += 1
+        k = (kng_core.normalize_name(name), self.team_key(team))
+        p = self.players.get(k)
+        if p is None:
+            self.players[k] = [name, team, goals, {goals: 1}]
+            return
+        if len(name) > len(p[0]):
+            p[0] = name
+        if goals > p[2]:
+            p[2] = goals
+        p[3][goals] = p[3].get(goals, 0) + 1
+
+def event_side(totals: dict, team_key) -> dict:
+    """kng_match.scorer_totals の {(名前, チーム): 得点} → {キー: [表示名, 表示チーム, 得点]}"""
+    out = {}
+    for (name, team), g in totals.items():
+        k = (kng_core.normalize_name(name), team_key(team))
+        p = out.get(k)
+        if p is None:
+            out[k] = [name, team, g]
+        else:
+            p[2] += g
+    return out
+
+# ====== 結合 ======
+def reconcile(tables: TableSide, events: dict) -> dict:
+    teams = {}       # チームキー -> {"team", "ok", 種類: [...]}
+    counts = dict.fromkeys(KINDS, 0)
+    ok = 0
+
+    def bucket(tk, display):
+        b = teams.get(tk)
+        if b is None:
+            b = teams[tk] = {"team": display, "ok": 0, **{kind: [] for kind in KINDS}}
+        return b
+
+    for k, (name, team, g, seen) in tables.players.items():
+        ev = events.get(k)
+        b = bucket(k[1], ev[1] if ev else team)
+        if len(seen) > 1:
+            b["table_conflict"].append([name, sorted(seen.items())])
+            counts["table_conflict"] += 1
+        if ev is None:
+            b["table_only"].append([name, g, sum(seen.values())])
+            counts["table_only"] += 1
+        elif ev[2] != g:
+            b["goals"].append([name, g, ev[2]])
+            counts["goals"] += 1
+        else:
+            b["ok"] += 1
+            ok += 1
+    for k, (name, team, g) in events.items():
+        if k not in tables.players:
+            bucket(k[1], team)["events_only"].append([name, g])
+            counts["events_only"] += 1
+
+    return {
+        "players": len(tables.players.keys() | events.keys()),
+        "rows": tables.rows,
+        "ok": ok,
+        "counts": counts,
+        "mismatches": counts["goals"] + counts["table_only"] + counts["events_only"] + counts["table_conflict"],
+        "teams": {b["team"]: b for b in teams.values() if any(b[kind] for kind in KINDS)},
+    }
+
+def gate(report: dict, limit=0) -> bool:
+    return report["mismatches"] <= limit
+
+# ====== 入力 ======
+def load_aliases(base: str) -> dict:
+    # team_aliases.json の読み方は kng_leagues と共通
+    import kng_leagues
+    return kng_leagues.load_aliases(base)
+
+def run(base: str, tables: TableSide, prov=None):
+    """
+    最新スナップショットの得点イベントと tables を照合。スナップショットが無ければ None
+    prov（kng_provenance.Provenance）を渡すと、取り込んだ試合の得点イベントをそこにも積む
+    """
+    state, snaps = kng_snapshots.update(base)
+    if not state or not state["pages"]:
+        return None
+    if prov is not None:
+        prov.add_matches(kng_snapshots.matches(state))
+    events = event_side(state["totals"], tables.team_key)
+    report = reconcile(tables, events)
+    report["snapshot"] = state["snapshot"]
+    report["snapshots"] = snaps       # スナップショットごとの 変化 / 新規 / 消えた / 同一
+    return report
+
+# ====== 表示 ======
+def summary(report: dict) -> str:
+    c = report["counts"]
+    return (f"一致 {report['ok']} / 得点差 {c['goals']} / 表のみ {c['table_only']} / "
+            f"試合のみ {c['events_only']} / 表内不一致 {c['table_conflict']}")
+
+def print_report(report: dict, n=SHOW_N):
+    for rep in report["snapshots"]:
+        print("📸", kng_snapshots.summary(rep))
+    print(f"🧮 照合（{report['snapshot']}）: {summary(report)}")
+    worst = sorted(report["teams"].values(), key=lambda b: -sum(len(b[k]) for k in KINDS))
+    for b in worst[:n]:
+        parts = [f"{k} {len(b[k])}" for k in KINDS if b[k]]
+        print(f"   ⚠️ {b['team']}: " + " / ".join(parts))
+        for name, tg, eg in b["goals"][:n]:
+            print(f"      {name}: 表 {tg} ≠ 試合 {eg}")
+
+def main(argv):
+    # 表の行の読み方は kng_full_pipeline_v1 と同じ（parse_team_rows / is_team_file）
+    import kng_full_pipeline_v1 as full
+    base = argv[0] if argv else full.BASE
+    tables = TableSide(team_key_fn(load_aliases(base)))
+    for f in kng_core.list_html(base):
+        if full.is_team_file(f):
+            for name, team, g in full.extract_table(os.path.join(base, f)):
+                tables.add(name, team, g)
+    report = run(base, tables)
+    if report is None:
+        print(f"⚠️ 試合ページのスナップショットがありません: {os.path.join(base, RAW_DIR)}")
+        return 1
+    print_report(report)
+    kng_runlog.record_run(base, SCRIPT, counts={"players": report["players"], "ok": report["ok"],
+                                                **report["counts"]},
+                          extra={"snapshot": report["snapshot"], "snapshots": report["snapshots"]},
+                          details={"reconcile": report["teams"]})
+    return 0 if gate(report) else 1
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
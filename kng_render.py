@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 1パス・複数出力レンダリング
+- 順位付け済みのエントリ列 (name, team, goals, display) を1回だけ走査し、
+  同時に複数の出力先（sink）へ流す
+    MainSink        … 統合ランキングの <tr> 列
+    TeamPlayersSink … チーム別 <tr> 列 + (表示名, 得点) 列（指紋用）
+    TeamTotalsSink  … チーム合計（走査中に加算、最後に1回だけ並べ替え）
+    JsonSink        … JSON 用の dict 列
+  旧 build_data の by_team / team_tot 用の追加ループと dict-of-lists の作り直しが不要
+- 順位（1,2,2,4 方式）は走査側で1回だけ計算し、全 sink が共有
+- bench(): 合成リーグで旧3パス方式と比較（python kng_render.py [選手数] [チーム数] [回数]）
+- 依存: 標準ライブラリのみ
+"""
+import sys, time, random, statistics, tracemalloc
+import html as pyhtml
+
+UNKNOWN_TEAM = "（チーム不明）"
+
+# ====== sink ======
+# feed(rank, team, g, disp, esc_disp, esc_team) を1エントリにつき1回受ける。
+# team は未設定なら UNKNOWN_TEAM、esc_* はエスケープ済み（走査側で1回だけ計算）。
+class MainSink:
+    def __init__(self):
+        self.rows = []
+        self._add = self.rows.append
+
+    def feed(self, rank, team, g, disp, esc_disp, esc_team):
+        self._add(
+            f"<tr><td class='ranknum'>{rank}</td><td>{esc_disp}</td>"
+            f"<td class='team'>{'' if team is UNKNOWN_TEAM else esc_team}</td>"
+            f"<td class='goal'>{g}</td></tr>"
+        )
+
+class TeamPlayersSink:
+    def __init__(self):
+        self.rows = {}     # team -> [<tr>...]
+        self.plain = {}    # team -> [(disp, g)]
+
+    def feed(self, rank, team, g, disp, esc_disp, esc_team):
+        rows = self.rows.get(team)
+        if rows is None:
+            rows = self.rows[team] = []
+            self.plain[team] = []
+        rows.append(f"<tr><td class='ranknum'>{len(rows) + 1}</td><td>{esc_disp}</td><td class='goal'>{g}</td></tr>")
+        self.plain[team].append((disp, g))
+
+class TeamTotalsSink:
+    def __init__(self):
+        self.totals = {}
+
+    def feed(self, rank, team, g, disp, esc_disp, esc_team):
+        self.totals[team] = self.totals.get(team, 0) + g
+
+    def ranked(self):
+        return sorted(self.totals.items(), key=lambda x: (-x[1], x[0]))
+
+    def rows(self):
+        return [
+            f"<tr><td class='ranknum'>{i}</td><td class='team'>{pyhtml.escape(team)}</td><td class='goal'>{total}</td></tr>"
+            for i, (team, total) in enumerate(self.ranked(), 1)
+        ]
+
+class JsonSink:
+    def __init__(self):
+        self.items = []
+        self._add = self.items.append
+
+    def feed(self, rank, team, g, disp, esc_disp, esc_team):
+        self._add({"rank": rank, "player": disp, "team": "" if team is UNKNOWN_TEAM else team, "goals": g})
+
+# ====== 走査 ======
+def render_pass(entries, sinks):
+    """
+    entries: (name, team, goals, display) を得点降順・表示名順に並べたもの
+    順位とエスケープは1エントリにつき1回だけ計算し、全 sink に渡す。
+    チーム名のエスケープはチームごとに1回（同じチーム名が何十回も来る）。
+    """
+    last_g, rank = None, 0
+    esc = pyhtml.escape
+    team_esc = {}
+    feeds = [s.feed for s in sinks]
+    for place, (name, team, g, disp) in enumerate(entries, 1):
+        if g != last_g:
+            rank, last_g = place, g
+        team = team or UNKNOWN_TEAM
+        esc_team = team_esc.get(team)
+        if esc_team is None:
+            esc_team = team_esc[team] = esc(team)
+        esc_disp = esc(disp)
+        for feed in feeds:
+            feed(rank, team, g, disp, esc_disp, esc_team)
+    return sinks
+
+def standard_sinks():
+    return MainSink(), TeamPlayersSink(), TeamTotalsSink(), JsonSink()
+
+# ====== 計測 ======
+def synthetic_entries(n_players=20000, n_teams=200, seed=1):
+    rnd = random.Random(seed)
+    teams = [f"チーム{i:03d}FC" for i in range(n_teams)]
+    ents = []
+    for i in range(n_players):
+        g = max(1, int(rnd.expovariate(0.5)))
+        name = f"選手{i:05d}"
+        ents.append((name, teams[rnd.randrange(n_teams)], g, name))
+    ents.sort(key=lambda x: (-x[2], x[3]))
+    return ents
+
+def _legacy_multi_pass(entries):
+    """旧 vFinal22 相当: by_team / team_tot を別ループで作り、描画・JSON も別々に走査"""
+    esc = pyhtml.escape
+    by_team = {}
+    for name, team, g, disp in entries:
+        by_team.setdefault(team or UNKNOWN_TEAM, []).append((disp, g))
+    for t in by_team:
+        by_team[t].sort(key=lambda x: (-x[1], x[0]))
+    team_tot = {}
+    for name, team, g, disp in entries:
+        t = team or UNKNOWN_TEAM
+        team_tot[t] = team_tot.get(t, 0) + g
+    team_rank = sorted(team_tot.items(), key=lambda x: (-x[1], x[0]))
+
+    rows, last_g, rank = [], None, 0
+    for place, (name, team, g, disp) in enumerate(entries, 1):
+        if g != last_g:
+            rank, last_g = place, g
+        rows.append(f"<tr><td class='ranknum'>{rank}</td><td>{esc(disp)}</td>"
+                    f"<td class='team'>{esc(team or '')}</td><td class='goal'>{g}</td></tr>")
+    tp = []
+    for t in sorted(by_team):
+        for i, (disp, g) in enumerate(by_team[t], 1):
+            tp.append(f"<tr><td class='ranknum'>{i}</td><td>{esc(disp)}</td><td class='goal'>{g}</td></tr>")
+    tt = [f"<tr><td class='ranknum'>{i}</td><td class='team'>{esc(t)}</td><td class='goal'>{n}</td></tr>"
+          for i, (t, n) in enumerate(team_rank, 1)]
+    js, last_g, rank = [], None, 0
+    for place, (name, team, g, disp) in enumerate(entries, 1):
+        if g != last_g:
+            rank, last_g = place, g
+        js.append({"rank": rank, "player": disp, "team": team or "", "goals": g})
+    return rows, tp, tt, js
+
+def _one_pass(entries):
+    main, tp, tt, js = render_pass(entries, standard_sinks())
+    return main.rows, [r for t in sorted(tp.rows) for r in tp.rows[t]], tt.rows(), js.items
+
+def bench(n_players=20000, n_teams=200, repeat=5) -> dict:
+    """
+    同じ4出力（統合/チーム別/チーム合計/JSON）を作る時間（repeat 回の中央値）とピークメモリを比較
+    ratio = 旧 / 1パス（1 未満なら1パスの方が遅い）
+    """
+    ents = synthetic_entries(n_players, n_teams)
+    if _legacy_multi_pass(ents) != _one_pass(ents):
+        raise AssertionError("1パス出力が旧方式と一致しない")
+    def median(fn):
+        ts = []
+        for _ in range(repeat):
+            t0 = time.perf_counter(); fn(ents); ts.append(time.perf_counter() - t0)
+        return statistics.median(ts)
+    def peak(fn):
+        tracemalloc.start()
+        fn(ents)
+        p = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return p
+    legacy, one = median(_legacy_multi_pass), median(_one_pass)
+    return {
+        "players": n_players, "teams": n_teams,
+        "legacy_ms": round(legacy * 1000, 2),
+        "one_pass_ms": round(one * 1000, 2),
+        "ratio": round(legacy / one, 2) if one else None,
+        "legacy_peak_kb": peak(_legacy_multi_pass) // 1024,
+        "one_pass_peak_kb": peak(_one_pass) // 1024,
+    }
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    print(bench(*args))
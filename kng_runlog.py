@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 実行ログ（NDJSON・ローテーション付き）
+- 1回の実行 = 1行の compact JSON を _logs/runs.ndjson に追記
+  （所要時間 / 件数 / 出力ファイルのハッシュ）
+- 大きな詳細データ（per_file_counts / conflicts 等）は内容ハッシュで
+  _logs/detail/<名前>_<hash>.json.gz に保存し、前回と同じなら書かない
+- runs.ndjson がサイズ上限を超えたら runs_<TS>.ndjson.gz に圧縮ローテーション
+  古い世代（日数 / 世代数超過）と参照されなくなった detail は掃除
+- 旧形式の ranking_log_*.json / kng_result_*.json は NDJSON に取り込み、
+  原本は _old_backup/<TS>_runlog/ へ退避（削除はしない）
+- 依存: 標準ライブラリのみ
+"""
+import os, re, json, gzip, hashlib, shutil, time
+from contextlib import contextmanager
+from datetime import datetime
+
+# ====== 設定 ======
+LOG_DIRNAME = "_logs"
+RUN_LOG = "runs.ndjson"
+DETAIL_DIRNAME = "detail"
+
+MAX_LOG_BYTES = 256 * 1024      # これを超えたらローテーション
+MAX_AGE_DAYS = 30               # ローテーション済み世代の保持日数
+KEEP_ROTATED = 8                # ローテーション済み世代の最大数
+
+LEGACY_PATTERNS = re.compile(r"^(ranking_log_.*|kng_result_.*)\.json$")
+
+# ====== ユーティリティ ======
+def ensure_dir(d):
+    os.makedirs(d, exist_ok=True)
+
+def log_dir_for(base):
+    return os.path.join(base, LOG_DIRNAME)
+
+def compact_json(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+def digest_obj(obj) -> str:
+    return hashlib.sha1(compact_json(obj).encode("utf-8")).hexdigest()[:16]
+
+def digest_file(path: str):
+    h = hashlib.sha1()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(65536), b""):
+                h.update(chunk)
+    except OSError:
+        return None
+    return h.hexdigest()[:16]
+
+@contextmanager
+def timer(timings: dict, name: str):
+    """with timer(timings, "aggregate"): ... → timings["aggregate"] に秒数"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = round(time.perf_counter() - t0, 4)
+
+# ====== 詳細データ（変化時のみ保存） ======
+def store_detail(log_dir: str, name: str, payload) -> dict:
+    """
+    payload を内容ハッシュ付きで保存。同じ内容が既にあれば書かない。
+    戻り値: {"hash": ..., "file": ..., "new": bool}
+    """
+    d = os.path.join(log_dir, DETAIL_DIRNAME)
+    ensure_dir(d)
+    h = digest_obj(payload)
+    fname = f"{name}_{h}.json.gz"
+    path = os.path.join(d, fname)
+    if os.path.exists(path):
+        return {"hash": h, "file": fname, "new": False}
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as w:
+        w.write(compact_json(payload))
+    os.replace(tmp, path)
+    return {"hash": h, "file": fname, "new": True}
+
+def load_detail(log_dir: str, fname: str):
+    with gzip.open(os.path.join(log_dir, DETAIL_DIRNAME, fname), "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+# ====== 追記 / 読み出し ======
+def append_record(log_dir: str, record: dict):
+    ensure_dir(log_dir)
+    line = compact_json(record) + "\n"
+    with open(os.path.join(log_dir, RUN_LOG), "a", encoding="utf-8") as w:
+        w.write(line)
+
+def iter_records(log_dir: str, include_rotated=False):
+    """新しい順ではなく書かれた順に返す（ローテーション済みは古いものから）"""
+    paths = []
+    if include_rotated:
+        paths += [os.path.join(log_dir, f) for f in sorted(rotated_logs(log_dir))]
+    cur = os.path.join(log_dir, RUN_LOG)
+    if os.path.exists(cur):
+        paths.append(cur)
+    for p in paths:
+        opener = gzip.open if p.endswith(".gz") else open
+        with opener(p, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+def last_record(log_dir: str, script=None):
+    last = None
+    for rec in iter_records(log_dir):
+        if script is None or rec.get("script") == script:
+            last = rec
+    return last
+
+def record_run(base: str, script: str, timings=None, counts=None,
+               outputs=None, details=None, extra=None) -> dict:
+    """
+    1回分の実行記録を作って追記し、必要ならローテーションする。
+    outputs: 出力ファイルパスの list → ハッシュ化して記録
+    details: {名前: 大きな payload} → 変化時のみ detail/ に保存し参照だけ残す
+    """
+    log_dir = log_dir_for(base)
+    rec = {
+        "at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "script": script,
+        "timings": timings or {},
+        "counts": counts or {},
+        "outputs": {os.path.basename(p): digest_file(p) for p in (outputs or [])},
+    }
+    if details:
+        rec["details"] = {}
+        for name, payload in details.items():
+            info = store_detail(log_dir, name, payload)
+            rec["details"][name] = info["file"]
+    if extra:
+        rec.update(extra)
+    append_record(log_dir, rec)
+    rotate(log_dir)
+    return rec
+
+# ====== ローテーション / 掃除 ======
+def rotated_logs(log_dir: str):
+    try:
+        return [f for f in os.listdir(log_dir) if re.fullmatch(r"runs_\d{8}_\d{6}\.ndjson\.gz", f)]
+    except OSError:
+        return []
+
+def rotate(log_dir: str, max_bytes=MAX_LOG_BYTES, max_age_days=MAX_AGE_DAYS, keep=KEEP_ROTATED) -> dict:
+    cur = os.path.join(log_dir, RUN_LOG)
+    rotated = None
+    if os.path.exists(cur) and os.path.getsize(cur) > max_bytes:
+        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+        rotated = os.path.join(log_dir, f"runs_{ts}.ndjson.gz")
+        with open(cur, "rb") as r, gzip.open(rotated, "wb") as w:
+            shutil.copyfileobj(r, w)
+        os.remove(cur)
+
+    # 古い世代の削除（日数 → 世代数の順）
+    now = time.time()
+    olds = sorted(rotated_logs(log_dir))
+    removed = []
+    for f in list(olds):
+        p = os.path.join(log_dir, f)
+        if now - os.path.getmtime(p) > max_age_days * 86400:
+            os.remove(p); olds.remove(f); removed.append(f)
+    while len(olds) > keep:
+        f = olds.pop(0)
+        os.remove(os.path.join(log_dir, f)); removed.append(f)
+
+    pruned = prune_details(log_dir) if (rotated or removed) else 0
+    return {"rotated": rotated, "removed": removed, "pruned_details": pruned}
+
+def prune_details(log_dir: str) -> int:
+    """どのログ行からも参照されていない detail を消す"""
+    d = os.path.join(log_dir, DETAIL_DIRNAME)
+    if not os.path.isdir(d):
+        return 0
+    used = set()
+    for rec in iter_records(log_dir, include_rotated=True):
+        used.update((rec.get("details") or {}).values())
+    n = 0
+    for f in os.listdir(d):
+        if f not in used:
+            os.remove(os.path.join(d, f)); n += 1
+    return n
+
+# ====== 旧形式ログの取り込み ======
+def compact_legacy(base: str) -> dict:
+    """
+    base 直下の ranking_log_*.json / kng_result_*.json を NDJSON に取り込み、
+    原本を _old_backup/<TS>_runlog/ へ退避する。
+    """
+    log_dir = log_dir_for(base)
+    try:
+        targets = sorted(f for f in os.listdir(base) if LEGACY_PATTERNS.match(f))
+    except OSError:
+        return {"moved": []}
+    # ranking_log.json（最新の参照用）は残す
+    targets = [f for f in targets if f != "ranking_log.json"]
+    if not targets:
+        return {"moved": []}
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    dest = os.path.join(base, "_old_backup", f"{ts}_runlog")
+    ensure_dir(dest)
+    moved = []
+    for f in targets:
+        src = os.path.join(base, f)
+        try:
+            with open(src, encoding="utf-8") as r:
+                payload = json.load(r)
+        except (OSError, ValueError):
+            payload = None
+        rec = {
+            "at": datetime.fromtimestamp(os.path.getmtime(src)).strftime("%Y-%m-%d %H:%M:%S"),
+            "script": "legacy",
+            "source": f,
+        }
+        if payload is not None:
+            rec["details"] = {"legacy": store_detail(log_dir, "legacy", payload)["file"]}
+        append_record(log_dir, rec)
+        shutil.move(src, os.path.join(dest, f))
+        moved.append(f)
+    rotate(log_dir)
+    return {"moved": moved, "dest": dest}
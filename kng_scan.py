@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+KNG ファイル探索（os.scandir ベース / 退避ツリー除外 / 深さ制限 / 一覧キャッシュ）
+- 旧 vReconnect の os.walk(BASE)（_archive / _old_backup / backup_* まで全部なめる）と、
+  vFinal4/5 の固定6フォルダ走査を置き換える共通の探索層
+- 除外: _archive, _old_backup, _diagnose（quarantine 含む）, _logs, _fixtures, backup_*,
+  teams_backup_*, 隠しフォルダ 等 → バックアップが増えても探索時間は一定
+- ディレクトリ一覧は「ディレクトリの mtime」をキーに _logs/scan_cache.json へ保存
+  （中身の追加/削除/改名でしか mtime は変わらないので、変化の無い階層は stat 1回で済む）
+- 入力の探索はすべてここを通す: shared(base) が BASE ごとに1つの Scanner（スレッド共有・終了時に保存）、
+  snapshots() / match_pages() が _archive/raw/<TS>/<部>/m*.html の一覧
+  （kng_leagues / kng_snapshots / kng_go / kng_golden / kng_fixtures / kng_prefetch / kng_extsort）
+- 依存: 標準ライブラリのみ
+"""
+import os, re, json, atexit, tempfile, threading
+
+import kng_runlog
+
+# ====== 設定 ======
+EXCLUDE_DIRS = re.compile(
+    r"^(?:_archive|_old_backup|_diagnose|_logs|_fixtures|_clean_logs|quarantine|"
+    r"backup_.*|backup|teams_backup_.*|unnecessary_html.*|__pycache__|\..*)$", re.I)
+MAX_DEPTH = 2
+CACHE_NAME = "scan_cache.json"
+RAW_DIR = os.path.join("_archive", "raw")
+RE_SNAPSHOT = re.compile(r"\d{8}_\d{6}")
+
+# ====== 探索 ======
+class Scanner:
+    def __init__(self, cache_path=None, exclude=EXCLUDE_DIRS, max_depth=MAX_DEPTH):
+        self.cache_path = cache_path
+        self.exclude = exclude
+        self.max_depth = max_depth
+        self.cache = self._load()
+        self.stats = {"dirs": 0, "cache_hits": 0, "scandir": 0}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_base(cls, base: str, **kw):
+        return cls(os.path.join(kng_runlog.log_dir_for(base), CACHE_NAME), **kw)
+
+    def _load(self) -> dict:
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        with self._lock:
+            if not (self.cache_path and self._dirty):
+                return
+            d = os.path.dirname(self.cache_path)
+            kng_runlog.ensure_dir(d)
+            # 一意な一時ファイル（--processes のワーカーなど、同じ BASE を複数が保存しうる）
+            fd, tmp = tempfile.mkstemp(prefix=CACHE_NAME + ".", suffix=".tmp", dir=d)
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as w:
+                    w.write(kng_runlog.compact_json(self.cache))
+                os.replace(tmp, self.cache_path)
+            except OSError:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+                raise
+            self._dirty = False
+
+    def listdir(self, d: str):
+        """(サブディレクトリ名 list, ファイル名 list)。存在しなければ ([], [])"""
+        self.stats["dirs"] += 1
+        try:
+            mt = os.stat(d).st_mtime_ns
+        except OSError:
+            return [], []
+        ent = self.cache.get(d)
+        if ent and ent["mtime_ns"] == mt:
+            self.stats["cache_hits"] += 1
+            return ent["dirs"], ent["files"]
+        dirs, files = [], []
+        self.stats["scandir"] += 1
+        try:
+            with os.scandir(d) as it:
+                for e in it:
+                    try:
+                        if e.is_dir():      # リンク先のディレクトリも（glob と同じ。深さ制限で止まる）
+                            dirs.append(e.name)
+                        elif e.is_file():
+                            files.append(e.name)
+                    except OSError:
+                        continue
+        except OSError:
+            return [], []
+        dirs.sort(); files.sort()
+        with self._lock:
+            self.cache[d] = {"mtime_ns": mt, "dirs": dirs, "files": files}
+            self._dirty = True
+        return dirs, files
+
+    def subdirs(self, d: str, pattern=None):
+        """d 直下のサブディレクトリ名（pattern があれば fullmatch するものだけ）"""
+        return [n for n in self.listdir(d)[0] if pattern is None or pattern.fullmatch(n)]
+
+    def walk(self, root: str, max_depth=None):
+        """(dirpath, files) を返す。除外ディレクトリには入らない。root は深さ 0"""
+        limit = self.max_depth if max_depth is None else max_depth
+        stack = [(root, 0)]
+        while stack:
+            d, depth = stack.pop()
+            dirs, files = self.listdir(d)
+            yield d, files
+            if depth >= limit:
+                continue
+            for name in reversed(dirs):
+                if not self.exclude.match(name):
+                    stack.append((os.path.join(d, name), depth + 1))
+
+    def find(self, roots, pred, max_depth=None):
+        """roots 以下で pred(ファイル名) が真のファイルパス（重複除去・順序安定）"""
+        seen, out = set(), []
+        for r in roots:
+            for d, files in self.walk(r, max_depth):
+                for f in files:
+                    if pred(f):
+                        p = os.path.join(d, f)
+                        if p not in seen:
+                            seen.add(p); out.append(p)
+        return out
+
+    def list_html(self, d: str):
+        """d 直下の *.html（kng_core.list_html のキャッシュ版）"""
+        return [f for f in self.listdir(d)[1] if f.lower().endswith(".html")]
+
+# ====== 共有 ======
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+def shared(base: str) -> Scanner:
+    """base ごとに1つの Scanner（一覧キャッシュは base/_logs。プロセス終了時に保存）"""
+    key = os.path.abspath(base)
+    with _SHARED_LOCK:
+        sc = _SHARED.get(key)
+        if sc is None:
+            sc = _SHARED[key] = Scanner.for_base(base)
+    return sc
+
+@atexit.register
+def _save_shared():
+    # 消えた base（kng_golden の一時ディレクトリなど）には書かない
+    for key, sc in list(_SHARED.items()):
+        if os.path.isdir(key):
+            try:
+                sc.save()
+            except OSError:
+                pass
+
+def snapshots(base: str, source=RAW_DIR) -> list:
+    """base/source 直下のスナップショット（YYYYMMDD_HHMMSS）を古い順。無ければ []"""
+    return shared(base).subdirs(os.path.join(base, source), RE_SNAPSHOT)
+
+def match_pages(base: str, snap: str, divs=None, source=RAW_DIR) -> list:
+    """base/source/snap/<部>/m*.html のパス（部 → ファイル名の順）。divs を省くと全部の部"""
+    sc = shared(base)
+    root = os.path.join(base, source, snap)
+    out = []
+    for div in (sc.subdirs(root) if divs is None else divs):
+        d = os.path.join(root, div)
+        out += [os.path.join(d, f) for f in sc.list_html(d) if f.startswith("m")]
+    return out
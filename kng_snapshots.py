@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+KNG スナップショット取り込み（_archive/raw/<TS>/ の差分だけを解析・集計へ流す）
+- 各スナップショットは全試合ページの取り直しで、終わった試合のページは広告や生成時刻などの
+  外側が変わるだけ。そこで試合ページごとに score-board 付近（kng_match.score_region）だけを
+  ハッシュし（kng_match.PARSER_VERSION も混ぜる）、前のスナップショットの同じページのハッシュと比べる
+    同じ   … 前の解析結果をそのまま引き継ぐ（解析しない）
+    違う / 新規 … そのページだけ kng_match.parse_match
+    消えた … 前の結果を集計から外す
+- 得点者の集計（kng_match.scorer_totals と同じ {(名前, チーム): 得点}）も、変わった試合の分だけ
+  引いて足す → シーズン全体の再処理コストは実際に更新された試合数に比例
+- 状態は _logs/snapshot_state.json（最後に取り込んだ TS、ページごとの (サイズ, mtime)・ハッシュ・
+  解析結果、集計）。未取り込みのスナップショットは TS 順に1つずつ取り込み、
+  スナップショットごとの 変化 / 新規 / 消えた / 同一 の試合数を返す（実行ログへ）
+  同じ TS の再実行は (サイズ, mtime) が同じページを読みもしない。読むページは kng_prefetch で先読み
+- update は _LOCK で直列化（kng_go の parse と aggregate 内の kng_reconcile が同じ状態を読み書きする）。
+  保存は同じディレクトリの一意な一時ファイル（tempfile.mkstemp）→ os.replace
+- 使い方: python kng_snapshots.py [BASE] [--verify]
+  （--verify で、全ページを解析し直した集計と一致するか確認）
+- 依存: 標準ライブラリのみ
+"""
+import os, sys, json, hashlib, tempfile, threading
+
+import kng_core, kng_match, kng_runlog, kng_scan
+
+RAW_DIR = os.path.join("_archive", "raw")
+STATE_NAME = "snapshot_state.json"
+SCRIPT = "kng_snapshots"
+_LOCK = threading.Lock()
+
+def region_digest(html: str) -> str:
+    # 解析器の版も混ぜる（PARSER_VERSION が上がったら同じ領域でも解析し直す）
+    return hashlib.sha1(f"{kng_match.PARSER_VERSION}:{kng_match.score_region(html)}".encode("utf-8")).hexdigest()[:20]
+
+def snapshots(base: str) -> list:
+    return kng_scan.snapshots(base, RAW_DIR)
+
+def _pages(base: str, snap: str) -> list:
+    """スナップショット内の相対パス（<部>/m*.html）"""
+    root = os.path.join(base, RAW_DIR, snap)
+    return [os.path.relpath(p, root) for p in kng_scan.match_pages(base, snap, source=RAW_DIR)]
+
+# ====== 状態 ======
+def state_path(base: str) -> str:
+    return os.path.join(kng_runlog.log_dir_for(base), STATE_NAME)
+
+def load_state(base: str) -> dict:
+    try:
+        with open(state_path(base), encoding="utf-8") as f:
+            st = json.load(f)
+        st["totals"] = {(n, t): g for n, t, g in st["totals"]}
+        return st
+    except (OSError, ValueError, KeyError):
+        return {"snapshot": None, "pages": {}, "totals": {}}
+
+def save_state(base: str, state: dict):
+    path = state_path(base)
+    kng_runlog.ensure_dir(os.path.dirname(path))
+    data = dict(state, totals=[[n, t, g] for (n, t), g in sorted(state["totals"].items())])
+    fd, tmp = tempfile.mkstemp(prefix=STATE_NAME + ".", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as w:
+            w.write(kng_runlog.compact_json(data))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+def _apply(totals: dict, match: dict, sign: int):
+    for k, n in kng_match.scorer_totals([match]).items():
+        v = totals.get(k, 0) + sign * n
+        if v:
+            totals[k] = v
+        else:
+            totals.pop(k, None)
+
+# ====== 取り込み ======
+def ingest(base: str, snap: str, state: dict, decode=None) -> dict:
+    """
+    snap を state に取り込む（state を更新）。戻り値: スナップショット単位の件数
+    {"snapshot", "prev", "pages", "changed", "added", "removed", "unchanged", "read", "parsed"}
+    読むページは kng_prefetch で先読み。decode: (path, bytes) -> str（既定 kng_core.decode_bytes）
+    """
+    import kng_prefetch
+    same_snap = state["snapshot"] == snap
+    old = state["pages"]
+    new = {}
+    rep = {"snapshot": snap, "prev": state["snapshot"], "pages": 0, "changed": 0, "added": 0,
+           "removed": 0, "unchanged": 0, "read": 0, "parsed": 0}
+    root = os.path.join(base, RAW_DIR, snap)
+    todo = []
+    for rel in _pages(base, snap):
+        path = os.path.join(root, rel)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        rep["pages"] += 1
+        sig = [st.st_size, st.st_mtime_ns, kng_match.PARSER_VERSION]
+        prev = old.get(rel)
+        if same_snap and prev and prev["sig"] == sig:
+            new[rel] = prev
+            rep["unchanged"] += 1
+        else:
+            todo.append((rel, path, sig))
+    with kng_prefetch.Prefetcher([path for _, path, _ in todo], decode=decode) as pf:
+        for rel, path, sig in todo:
+            try:
+                html = pf.read_text(path)
+            except OSError:
+                continue
+            rep["read"] += 1
+            prev = old.get(rel)
+            digest = region_digest(html)
+            if prev and prev["digest"] == digest:
+                new[rel] = dict(prev, sig=sig)
+                rep["unchanged"] += 1
+                continue
+            m = kng_match.parse_match(html)
+            m["goals"] = [list(g) for g in m["goals"]]     # 状態ファイルから読んだ結果と型を揃える
+            rep["parsed"] += 1
+            rep["changed" if prev else "added"] += 1
+            if prev:
+                _apply(state["totals"], prev["parsed"], -1)
+            _apply(state["totals"], m, +1)
+            new[rel] = {"sig": sig, "digest": digest, "parsed": m}
+    for rel in old.keys() - new.keys():
+        _apply(state["totals"], old[rel]["parsed"], -1)
+        rep["removed"] += 1
+    state["snapshot"], state["pages"] = snap, dict(sorted(new.items()))
+    return rep
+
+def update(base: str):
+    """
+    未取り込みのスナップショット（と最新 TS の再確認）を TS 順に取り込んで保存（_LOCK で直列）。
+    戻り値: (state, [スナップショットごとの件数])。スナップショットが無ければ (None, [])
+    """
+    snaps = snapshots(base)
+    if not snaps:
+        return None, []
+    with _LOCK:
+        state = load_state(base)
+        todo = [s for s in snaps if state["snapshot"] is None or s >= state["snapshot"]]
+        reports = [ingest(base, s, state) for s in todo]
+        if any(r["read"] or r["removed"] for r in reports):
+            save_state(base, state)
+    return state, reports
+
+def matches(state: dict) -> dict:
+    """{base からの相対パス: 解析結果}（kng_match.parse_pages と同じ形）"""
+    return {os.path.join(RAW_DIR, state["snapshot"], rel): p["parsed"] for rel, p in state["pages"].items()}
+
+def summary(rep: dict) -> str:
+    return (f"{rep['snapshot']}: 変化 {rep['changed']} / 新規 {rep['added']} / 消えた {rep['removed']}"
+            f" / 同一 {rep['unchanged']}（読込 {rep['read']} / 解析 {rep['parsed']}）")
+
+def main(argv):
+    base = argv[0] if argv and not argv[0].startswith("--") else os.path.dirname(os.path.abspath(__file__))
+    state, reports = update(base)
+    if state is None:
+        print(f"⚠️ スナップショットがありません: {os.path.join(base, RAW_DIR)}")
+        return 1
+    for rep in reports:
+        print("📸", summary(rep))
+    kng_runlog.record_run(base, SCRIPT,
+                          counts={"snapshots": len(reports), "changed": sum(r["changed"] + r["added"] for r in reports),
+                                  "parsed": sum(r["parsed"] for r in reports)},
+                          extra={"snapshots": reports})
+    if "--verify" in argv:
+        full = kng_match.scorer_totals(kng_match.parse_match(kng_core.read_text(os.path.join(base, p)))
+                                       for p in matches(state))
+        ok = full == state["totals"]
+        print("✅ 全ページ解析の集計と一致" if ok else "❌ 全ページ解析の集計と不一致")
+        return 0 if ok else 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+KNG 順位表エンジン（試合ページの total-score から 勝/分/敗・得失点・勝点）
+- kng_match.parse_match の結果（score / teams）をそのまま取り込む
+  → 得点ランキングと同じ解析結果（parse_pages のキャッシュ）を使い、アーカイブを2度なめない
+- ingest(match_id, match) は1試合ずつ加算。同じ試合を再取り込みすると前回分を差し引いてから加算
+  （試合前 → 試合終了、スコア訂正 でも全体を作り直さない）
+- 試合前（score 無し）の試合は数えない
+- 並び: 勝点 → 得失点差 → 総得点 → チーム名
+- 依存: 標準ライブラリのみ
+"""
+import html as pyhtml
+
+WIN, DRAW, LOSS = 3, 1, 0     # 勝点
+
+class Standings:
+    def __init__(self):
+        self.table = {}      # team -> {"played","win","draw","loss","gf","ga","pts"}
+        self.results = {}    # match_id -> (home, away, hg, ag)
+
+    def _row(self, team):
+        r = self.table.get(team)
+        if r is None:
+            r = self.table[team] = {"played": 0, "win": 0, "draw": 0, "loss": 0, "gf": 0, "ga": 0, "pts": 0}
+        return r
+
+    def _apply(self, home, away, hg, ag, sign):
+        for team, f, a in ((home, hg, ag), (away, ag, hg)):
+            r = self._row(team)
+            r["played"] += sign
+            r["gf"] += sign * f
+            r["ga"] += sign * a
+            if f > a:
+                r["win"] += sign; r["pts"] += sign * WIN
+            elif f == a:
+                r["draw"] += sign; r["pts"] += sign * DRAW
+            else:
+                r["loss"] += sign; r["pts"] += sign * LOSS
+
+    def ingest(self, match_id, match: dict) -> bool:
+        """1試合を取り込む。順位表が変わったら True"""
+        teams, score = match.get("teams") or [], match.get("score")
+        new = (teams[0], teams[1], score[0], score[1]) if score and len(teams) == 2 else None
+        old = self.results.get(match_id)
+        if old == new:
+            return False
+        if old:
+            self._apply(*old, -1)
+            del self.results[match_id]
+        if new:
+            self._apply(*new, 1)
+            self.results[match_id] = new
+        return True
+
+    def ingest_all(self, matches: dict) -> int:
+        """{match_id: match} をまとめて取り込み、変化した試合数を返す"""
+        return sum(1 for mid, m in matches.items() if self.ingest(mid, m))
+
+    def ranked(self) -> list:
+        """[(順位, チーム, 行)]（勝点・得失点差・総得点が同じなら同順位）"""
+        items = sorted(self.table.items(),
+                       key=lambda x: (-x[1]["pts"], -(x[1]["gf"] - x[1]["ga"]), -x[1]["gf"], x[0]))
+        out, last, rank = [], None, 0
+        for place, (team, r) in enumerate(items, 1):
+            if r["played"] == 0:
+                continue
+            key = (r["pts"], r["gf"] - r["ga"], r["gf"])
+            if key != last:
+                rank, last = place, key
+            out.append((rank, team, r))
+        return out
+
+    def to_json(self) -> list:
+        return [{"rank": rank, "team": team, **r, "gd": r["gf"] - r["ga"]} for rank, team, r in self.ranked()]
+
+# ====== HTML ======
+HEAD = ("<tr><th class='ranknum'>順位</th><th class='team'>チーム</th><th>試合</th>"
+        "<th>勝</th><th>分</th><th>敗</th><th>得点</th><th>失点</th><th>得失差</th><th class='goal'>勝点</th></tr>")
+
+def render_rows(st: Standings) -> list:
+    return [
+        f"<tr><td class='ranknum'>{rank}</td><td class='team'>{pyhtml.escape(team)}</td>"
+        f"<td>{r['played']}</td><td>{r['win']}</td><td>{r['draw']}</td><td>{r['loss']}</td>"
+        f"<td>{r['gf']}</td><td>{r['ga']}</td><td>{r['gf'] - r['ga']:+d}</td>"
+        f"<td class='goal'>{r['pts']}</td></tr>"
+        for rank, team, r in st.ranked()
+    ]
+
+def render_section(title: str, st: Standings) -> str:
+    return (f"<section><h2>{pyhtml.escape(title)}</h2><table><thead>{HEAD}</thead><tbody>\n"
+            + "\n".join(render_rows(st)) + "\n</tbody></table></section>")
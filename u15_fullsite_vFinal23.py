@@ -1 +1,461 @@
+# -*- coding: utf-8 -*-
+"""
+U-15 関東 1部・2部 統合得点ランキング生成 (Final23)
+KNGルール対応:
+- 旧成果を _old_backup/<timestamp>/ に自動退避
+- team_*.html を厳密抽出して集計（OG/オウンゴール除外）
+- (name, team) 単位で集計 → 同姓同名は「最大得点のみ採用」
+  * 同点で複数チームにまたがる場合は両方残し、表示名に（チーム名）を付記
+- 出力:
+  index_kngsafe_final23.html     … 統合個人ランキング
+  team_players_final23.html      … チーム別（選手）ランキング
+  team_totals_final23.html       … チーム合計得点ランキング
+  teams_final23/<チーム>.html    … チーム単位ページ
+  ranking_data_final23.json      … 統合個人ランキング（JSON）
+  ※ 全ページの行は kng_render の1パス（統合/チーム別/チーム合計/JSON を同時生成）
+  ※ 依存グラフ（kng_buildgraph）で、変化したチームのページと集計ページだけ再生成
+  _logs/runs.ndjson             … 実行ログ（1実行1行, kng_runlog）
+  kng_site.<hash>.css           … 共通 CSS（各 HTML は minify + .gz 併置, kng_assets）
+  ranking_delta_u15_fullsite_vFinal23.html … 前回比較（差分なしなら描画・反映を省略, kng_delta）
+- ファイル別解析時間をヒストグラムで実行ログへ。予算超過は記録 or 隔離（kng_parseguard）
+- 正規化・読み込みは kng_core の共通実装（正規表現は事前コンパイル、正規化はメモ化）
+- ディレクトリ一覧は kng_scan（scandir + mtime キーのキャッシュ）。team_*.html は kng_prefetch で先読み
+- AGG_MODE = "external" なら (名前, チーム) の集計と最終の並べ替えを、保持件数が予算を超えた分だけ
+  一時ファイルの整列済みランに書いて heapq.merge（kng_extsort）。結果はメモリ上の集計と同じ
+- 依存: 標準ライブラリのみ（re, os, json, datetime, html）
+"""
+import os, re, json
+from itertools import groupby
+from datetime import datetime
+import html as pyhtml
 
+import kng_assets, kng_buildgraph, kng_core, kng_delta, kng_extsort, kng_mover, kng_prefetch, kng_render, kng_runlog, kng_scan
+from kng_core import ensure_dir, norm_txt, is_og, read_text, strip_tags
+from kng_parseguard import ParseTimer, iter_blocks, QUARANTINE_DIR
+
+BASE = "/sdcard/Download/sakana-no-osama.github.io"
+OUT_MAIN = os.path.join(BASE, "index_kngsafe_final23.html")
+OUT_TEAM_PLAYERS = os.path.join(BASE, "team_players_final23.html")
+OUT_TEAM_TOTALS = os.path.join(BASE, "team_totals_final23.html")
+OUT_JSON = os.path.join(BASE, "ranking_data_final23.json")
+TEAM_PAGE_DIR = "teams_final23"          # チーム単位ページ（変化したチームだけ再生成）
+LOG_DIR = kng_runlog.log_dir_for(BASE)
+
+# 1ファイルあたりの解析時間予算（超過は "flag"=記録のみ / "quarantine"=隔離）
+PARSE_BUDGET_SEC = 0.5
+PARSE_BUDGET_MODE = "flag"
+
+# 集計（"memory" / "external"=保持件数が AGG_BUDGET_ITEMS を超えたら一時ファイルへ）
+AGG_MODE = "memory"
+AGG_BUDGET_ITEMS = kng_extsort.BUDGET_ITEMS
+
+# ----------------------- 共通ユーティリティ -----------------------
+# 正規化・読み込みは kng_core（ZEN2HAN / norm_txt / is_og / read_text）を共用
+read_file = read_text
+RE_NUM = re.compile(r"\d{1,3}")
+RE_CELL = re.compile(r"<t[hd][^>]*>(.*?)</t[hd]>", re.I|re.S)
+RE_LI_GOAL = re.compile(r"(.+?)[\s\-]*\(?(\d{1,3})\)?$")
+RE_TEAM_NOISE = re.compile(r"(チーム別.*ランキング|U-?15|女子|ランキング|Final\d+)", re.I)
+RE_TEAM_FILE = re.compile(r"team_(.+?)\.html$", re.I)
+RE_OWN_OUTPUT = re.compile(r"team_(players|totals)_final\d*\.html", re.I)
+RE_UNSAFE_FNAME = re.compile(r"[\\/:*?\"<>|\s]+")
+
+# ----------------------- 旧成果の退避 -----------------------
+# 生成物だけ（u15_fullsite_vFinal*.py などのスクリプト本体は対象外。退避すると次の実行で import できない）
+OLD_OUTPUT_RE = kng_mover.combine([
+    r"index_kngsafe_final\d+\.html(?:\.gz)?",
+    r"team_players_final\d+\.html(?:\.gz)?",
+    r"team_totals_final\d+\.html(?:\.gz)?",
+    r"ranking_data_final\d+\.json",
+    r"ranking_log_vFinal\d+\.json",   # 旧形式ログ（現在は _logs/runs.ndjson）
+    r"x_kngsafe_final\d+\.html",  # 念のため
+])
+
+def backup_old_outputs(rebuild=()):
+    """
+    旧成果を _old_backup/<TS>/ へ。依存グラフが管理する現行の出力（OUT_*）は、
+    今回描画し直すもの（rebuild）だけ退避する（据え置くページを退避すると毎回全部作り直しになる）
+    """
+    managed = {os.path.basename(p) for p in (OUT_MAIN, OUT_TEAM_PLAYERS, OUT_TEAM_TOTALS, OUT_JSON)}
+    keep = managed - {os.path.basename(p) for p in rebuild}
+    targets = [f for f in os.listdir(BASE)
+               if OLD_OUTPUT_RE.fullmatch(f) and (f[:-3] if f.endswith(".gz") else f) not in keep]
+    if not targets: 
+        return {"moved": []}
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    dest = os.path.join(BASE, "_old_backup", ts)
+    res = kng_mover.run(BASE, "old_outputs", [(os.path.join(BASE, f), os.path.join(dest, f)) for f in targets])
+    moved = [os.path.basename(m["src"]) for m in kng_mover.moved(res)]
+    failed = [[os.path.basename(src), err] for _, src, err in res["failed"]]
+    # ログも残す
+    ensure_dir(dest)
+    with open(os.path.join(dest, "cleanup_log.json"), "w", encoding="utf-8") as w:
+        json.dump({"moved": moved, "failed": failed, "time": ts, "journal": res["journal"]},
+                  w, ensure_ascii=False, indent=2)
+    return {"moved": moved, "failed": failed, "dest": dest}
+
+# ----------------------- HTML 解析（寛容だが厳密） -----------------------
+def guess_team_name(html_text: str, filename: str) -> str:
+    # <h1> or <h2> or <title> からチーム名の候補を拾う
+    for tag in ("h1","h2","title"):
+        block = next(iter_blocks(html_text, tag), None)
+        if block is not None:
+            t = norm_txt(strip_tags(block))
+            # 明らかなノイズ除去
+            t = RE_TEAM_NOISE.sub("", t).strip(" -|")
+            if t:
+                return t
+    # ファイル名から推測 (team_xxx.html → xxx をそれっぽく)
+    base = os.path.basename(filename)
+    m = RE_TEAM_FILE.match(base)
+    if m:
+        t = norm_txt(m.group(1))
+        t = t.replace("_"," ").replace("-", " ").strip()
+        return t
+    return "（チーム名不明）"
+
+def parse_players_from_team(html_text: str):
+    """
+    代表的パターンを全て拾う:
+      A) <tr> [順位] <td>名前</td> [<td>チーム</td>] <td>得点</td>
+      B) <tr><td>名前</td><td>得点</td>
+      C) <li>名前 - 3</li> / <li>名前(3)</li>
+    """
+    players = []
+
+    # 表の各行（タグ除去しながら拾う）
+    for row in iter_blocks(html_text, "tr"):
+        # セルを抜く
+        tds = RE_CELL.findall(row)
+        cells = [c for c in (norm_txt(strip_tags(x)) for x in tds) if c]
+        if not cells:
+            continue
+
+        # A/B：セルの中に整数が1つだけあり、他が名前等
+        nums = [c for c in cells if RE_NUM.fullmatch(c)]
+        if nums:
+            goal = None
+            name = None
+            team = None
+
+            # 末尾が得点になりがち
+            if RE_NUM.fullmatch(cells[-1]):
+                goal = int(cells[-1])
+                # 名前は最初に「文字列だけのセル」を優先
+                cand = [c for c in cells[:-1] if not RE_NUM.fullmatch(c)]
+                if cand:
+                    name = cand[0]
+                    # チーム名が入っていそうなら2番目以降に
+                    if len(cand) >= 2:
+                        team = cand[1]
+                else:
+                    continue
+            # Aのバリエーション： [順位, 名前, チーム, 得点]
+            elif len(cells) >= 4 and RE_NUM.fullmatch(cells[0]) and RE_NUM.fullmatch(cells[-1]):
+                goal = int(cells[-1])
+                name = cells[1]
+                team = cells[2] if len(cells) >= 4 else None
+
+            # フィルタ
+            if name and goal is not None and not is_og(name):
+                players.append( (name, team, goal) )
+            continue
+
+    # C) <li>系
+    for li in iter_blocks(html_text, "li"):
+        s = norm_txt(strip_tags(li))
+        # "名前 (3)" or "名前 - 3"
+        m = RE_LI_GOAL.match(s)
+        if m:
+            name = norm_txt(m.group(1))
+            goal = int(m.group(2))
+            if not is_og(name):
+                players.append( (name, None, goal) )
+
+    return players
+
+# ----------------------- 集計ロジック -----------------------
+def _parse_team_file(txt: str, filename: str):
+    return guess_team_name(txt, filename), parse_players_from_team(txt)
+
+def _top_entries(by_name):
+    """[(name, [(team, g)])] → (name, team, g, display)（name単位で最大得点、同点複数チームはすべて残す）"""
+    for name, items in by_name:
+        max_g = max(g for _, g in items)
+        top = [(team, g) for team, g in items if g == max_g]
+        if len(top) == 1:
+            team, g = top[0]
+            display = name
+            yield (name, team, g, display)
+        else:
+            # 複数チーム同点 → 表示名に（チーム名）
+            for team, g in top:
+                display = f"{name}（{team}）" if team else name
+                yield (name, team, g, display)
+
+def _entry_order(x):
+    return (-x[2], x[3])
+
+def build_data():
+    used_files = []
+    per_name_team = {}  # key: (name, team) -> goals
+    external = AGG_MODE == "external"
+    if external:
+        per_name_team = kng_extsort.SpillDict(max, AGG_BUDGET_ITEMS)
+    issues = {"file_errors": [], "parse_empty": [], "files": 0}
+    timer = ParseTimer(budget=PARSE_BUDGET_SEC, mode=PARSE_BUDGET_MODE,
+                       quarantine_dir=os.path.join(BASE, QUARANTINE_DIR))
+
+    scanner = kng_scan.shared(BASE)
+    # 自分の出力（team_players_final*/team_totals_final*）は入力にしない
+    files = [f for f in scanner.listdir(BASE)[1]
+             if RE_TEAM_FILE.fullmatch(f) and not RE_OWN_OUTPUT.fullmatch(f)]
+    pf = kng_prefetch.Prefetcher([os.path.join(BASE, f) for f in files])
+    for f in files:
+        path = os.path.join(BASE, f)
+        try:
+            txt = pf.read_text(path)
+        except Exception as e:
+            print(f"⚠️ 読み込み失敗: {f} -> {e}")
+            issues["file_errors"].append(f)
+            continue
+
+        team_guess, players = timer.run(path, _parse_team_file, txt, f)
+        if not players:
+            issues["parse_empty"].append(f)
+            continue
+
+        for name, team_in_row, g in players:
+            team = norm_txt(team_in_row or team_guess or "")
+            key = (name, team)
+            if external:
+                per_name_team.add(key, int(g))
+            else:
+                per_name_team[key] = max(per_name_team.get(key, 0), int(g))
+
+        used_files.append(f)
+        issues["files"] += 1
+    pf.close()
+    scanner.save()
+
+    # name単位で最大得点採用（同点複数チームはすべて残す）
+    # 並べ替え（得点 desc, 表示名）
+    # チーム別・チーム合計は描画時に kng_render の1パスで同時に作る
+    agg_stats = {"mode": AGG_MODE}
+    if external:
+        # キー順に流れてくるので、同じ name は隣り合う
+        with per_name_team:
+            by_name = ((name, [(team, g) for (_, team), g in grp])
+                       for name, grp in groupby(per_name_team.items(), key=lambda kv: kv[0][0]))
+            final_entries = list(kng_extsort.external_sort(
+                _top_entries(by_name), _entry_order, AGG_BUDGET_ITEMS, stats=agg_stats))
+            agg_stats.update(per_name_team.stats)
+    else:
+        by_name = {}
+        for (name, team), g in per_name_team.items():
+            by_name.setdefault(name, []).append((team, g))
+        final_entries = list(_top_entries(by_name.items()))
+        final_entries.sort(key=_entry_order)
+
+    return {
+        "entries": final_entries,
+        "issues": issues,
+        "used_files": used_files,
+        "count_players": len(final_entries),
+        "parse_timing": timer.summary(),
+        "scan": dict(scanner.stats),
+        "prefetch": pf.stats,
+        "aggregate": agg_stats,
+    }
+
+# ----------------------- HTML 出力 -----------------------
+# 共通 CSS は kng_assets.SITE_CSS（内容ハッシュ付き外部ファイル）。
+# style 引数を省略した場合のみインライン出力。
+STYLE = f"<style>{kng_assets.minify_css(kng_assets.SITE_CSS)}</style>"
+
+def render_rows(entries):
+    """entries を1回だけ走査し、全ページ分の行（統合/チーム別/チーム合計/JSON）を作る"""
+    main, team_players, team_totals, js = kng_render.render_pass(entries, kng_render.standard_sinks())
+    return {
+        "main": main.rows,
+        "team_rows": team_players.rows,       # team -> [<tr>...]
+        "by_team": team_players.plain,        # team -> [(表示名, 得点)]（指紋用）
+        "totals": team_totals.rows(),
+        "json": js.items,
+    }
+
+def render_main(rows, style=STYLE):
+    """rows: render_rows()["main"]"""
+    html = [
+        "<!doctype html><html><head><meta charset='utf-8'>",
+        "<title>U-15 関東統合得点ランキング（Final23）</title>",
+        style,
+        "</head><body>",
+        "<h1>U-15 関東1部・2部 統合得点ランキング（Final23）</h1>",
+        "<p><small>同一選手名は最大得点採用。異チーム同名は（チーム名）表記。OGは除外。</small></p>",
+        "<table><thead><tr><th class='ranknum'>順位</th><th>選手名</th><th class='team'>チーム</th><th class='goal'>得点</th></tr></thead><tbody>",
+        "\n".join(rows),
+        "</tbody></table>",
+        "<p><small>自動生成: KNG SAFE Final23</small></p>",
+        "</body></html>"
+    ]
+    return "\n".join(html)
+
+def render_team_players(team_rows, style=STYLE):
+    """team_rows: render_rows()["team_rows"]"""
+    parts = [
+        "<!doctype html><html><head><meta charset='utf-8'>",
+        "<title>チーム別（選手）ランキング（Final23）</title>",
+        style, "</head><body>",
+        "<h1>チーム別（選手）ランキング（Final23）</h1>",
+        "<p><small>各チームの所属選手（同姓同名は最大得点・同点は併記）。</small></p>"
+    ]
+    for team in sorted(team_rows.keys()):
+        href = f"{TEAM_PAGE_DIR}/{team_page_name(team)}"
+        parts.append(f"<section><h2><a href='{pyhtml.escape(href)}'>{pyhtml.escape(team)}</a></h2>")
+        parts.append("<table><thead><tr><th>#</th><th>選手</th><th class='goal'>得点</th></tr></thead><tbody>")
+        parts.extend(team_rows[team])
+        parts.append("</tbody></table></section>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+def team_page_name(team: str) -> str:
+    return RE_UNSAFE_FNAME.sub("_", team).strip("_") + ".html"
+
+def render_team_page(team, rows, style=STYLE):
+    """1チーム分の選手ランキング（teams_final23/<チーム>.html）。rows は team_rows[team]"""
+    parts = [
+        "<!doctype html><html><head><meta charset='utf-8'>",
+        f"<title>{pyhtml.escape(team)}（Final23）</title>",
+        style, "</head><body>",
+        f"<h1>{pyhtml.escape(team)}</h1>",
+        "<p><small><a href='../team_players_final23.html'>チーム別一覧へ</a></small></p>",
+        "<table><thead><tr><th>#</th><th>選手</th><th class='goal'>得点</th></tr></thead><tbody>",
+    ]
+    parts.extend(rows)
+    parts.append("</tbody></table></body></html>")
+    return "\n".join(parts)
+
+def render_team_totals(rows, style=STYLE):
+    """rows: render_rows()["totals"]"""
+    html = [
+        "<!doctype html><html><head><meta charset='utf-8'>",
+        "<title>チーム合計得点ランキング（Final23）</title>",
+        style, "</head><body>",
+        "<h1>チーム合計得点ランキング（Final23）</h1>",
+        "<table><thead><tr><th class='ranknum'>順位</th><th class='team'>チーム</th><th class='goal'>合計</th></tr></thead><tbody>",
+        "\n".join(rows),
+        "</tbody></table></body></html>"
+    ]
+    return "\n".join(html)
+
+def write_json(path, items):
+    """統合ランキングの JSON 版（順位・表示名・チーム・得点）"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as w:
+        json.dump({"players": items}, w, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+# ----------------------- main -----------------------
+SCRIPT = "u15_fullsite_vFinal23"
+
+def render_all(data, before=None) -> dict:
+    """
+    依存グラフで描画。チームページは自チームの行だけに依存、
+    統合/チーム別/チーム合計ページ・JSON は全チームに依存する。
+    行は render_rows() の1パスで全ページ分を作ってから振り分ける。
+    before: 描画するパスの一覧を受け取り、描画の前に呼ばれる（旧成果の退避）
+    """
+    href = kng_assets.write_stylesheet(BASE)
+    style = kng_assets.link_tag(href)
+    sub_style = kng_assets.link_tag("../" + href)
+    out = render_rows(data["entries"])
+    by_team, team_rows = out["by_team"], out["team_rows"]
+
+    fps = {f"team:{t}": kng_buildgraph.fingerprint(rows) for t, rows in by_team.items()}
+    fps["asset:style"] = href
+    all_deps = list(fps)
+
+    graph = kng_buildgraph.BuildGraph(BASE, SCRIPT)
+    graph.add_output(OUT_MAIN, all_deps,
+                     lambda: kng_assets.write_output(OUT_MAIN, render_main(out["main"], style)))
+    graph.add_output(OUT_TEAM_PLAYERS, all_deps,
+                     lambda: kng_assets.write_output(OUT_TEAM_PLAYERS, render_team_players(team_rows, style)))
+    graph.add_output(OUT_TEAM_TOTALS, all_deps,
+                     lambda: kng_assets.write_output(OUT_TEAM_TOTALS, render_team_totals(out["totals"], style)))
+    graph.add_output(OUT_JSON, [d for d in all_deps if d != "asset:style"],
+                     lambda: write_json(OUT_JSON, out["json"]))
+    ensure_dir(os.path.join(BASE, TEAM_PAGE_DIR))
+    for team, rows in team_rows.items():
+        path = os.path.join(BASE, TEAM_PAGE_DIR, team_page_name(team))
+        graph.add_output(path, [f"team:{team}", "asset:style"],
+                         lambda p=path, t=team, r=rows: kng_assets.write_output(p, render_team_page(t, r, sub_style)))
+    return graph.build(fps, before)
+
+def main():
+    ensure_dir(BASE)
+    timings = {}
+    with kng_runlog.timer(timings, "build_data"):
+        data = build_data()
+
+    # 前回比較: 差分なし & 出力が揃っていれば退避・描画・反映を省略
+    with kng_runlog.timer(timings, "delta"):
+        delta, snap = kng_delta.run_delta(
+            BASE, SCRIPT, ((n, t, g) for n, t, g, _ in data["entries"]))
+    outputs = [OUT_MAIN, OUT_TEAM_PLAYERS, OUT_TEAM_TOTALS, OUT_JSON]
+    if kng_delta.is_empty(delta) and all(os.path.exists(p) for p in outputs):
+        kng_runlog.record_run(BASE, SCRIPT, timings=timings,
+                              counts={"players": data["count_players"], "skipped": 1},
+                              outputs=outputs)
+        print("⏭️ 前回から変化なし: 出力は据え置き")
+        return 0
+
+    backup_info = {"moved": []}
+    def backup(rebuild):
+        with kng_runlog.timer(timings, "backup"):
+            backup_info.update(backup_old_outputs(rebuild))
+
+    with kng_runlog.timer(timings, "render"):
+        build = render_all(data, backup)    # render の時間は退避を含む
+    kng_delta.save_snapshot(BASE, SCRIPT, snap)
+
+    kng_runlog.compact_legacy(BASE)
+    kng_runlog.record_run(
+        BASE, SCRIPT,
+        timings=timings,
+        counts={
+            "players": data["count_players"],
+            "files": data["issues"]["files"],
+            "parse_empty": len(data["issues"]["parse_empty"]),
+            "file_errors": len(data["issues"]["file_errors"]),
+            "backup_moved": len(backup_info.get("moved", [])),
+            "backup_failed": len(backup_info.get("failed", [])),
+        },
+        outputs=outputs,
+        extra={"delta": kng_delta.summary(delta), "parse": data["parse_timing"],
+               "build": {"rendered": len(build["rendered"]), "skipped": build["skipped"],
+                         "removed": len(build["removed"])},
+               "norm_cache": kng_core.cache_info(),
+               "scan": data["scan"], "prefetch": data["prefetch"], "aggregate": data["aggregate"]},
+        details={
+            "used_files": data["used_files"],
+            "issues": data["issues"],
+        },
+    )
+
+    print("✅ 出力:", OUT_MAIN)
+    print("✅ 出力:", OUT_TEAM_PLAYERS)
+    print("✅ 出力:", OUT_TEAM_TOTALS)
+    print("✅ 出力:", OUT_JSON)
+    print("🗂️ ログ:", os.path.join(LOG_DIR, kng_runlog.RUN_LOG))
+    print("🔁 前回比較:", kng_delta.summary(delta), "→", kng_delta.html_path(BASE, SCRIPT))
+    print(f"🧱 再生成: {len(build['rendered'])}ページ / 据え置き: {build['skipped']}ページ")
+    pt = data["parse_timing"]
+    print(f"⏱️ 解析: p95 {pt['p95_ms']}ms / max {pt['max_ms']}ms / 予算超過 {len(pt['over_budget'])}件")
+    if backup_info.get("moved"):
+        print("📦 旧成果物を退避:", backup_info["moved"])
+        print("🗃️ 保存先:", backup_info.get("dest",""))
+    return 0
+
+if __name__ == "__main__":
+    main()